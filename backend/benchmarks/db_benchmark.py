@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the parsed_appointments persistence layer.
+
+Measures single-row inserts (one transaction each, as POST /parse-pdf
+stores results), bulk inserts (as batch parses store them) and the latency
+of listing queries once the table holds --rows rows:
+
+    python benchmarks/db_benchmark.py                                # temporary SQLite file
+    python benchmarks/db_benchmark.py --database-url postgresql://... --rows 100000
+
+Rows are written to the given database; point it at a scratch database.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="Database to write to (temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in the table")
+    parser.add_argument("--single", type=int, default=500, help="Rows inserted one by one")
+    parser.add_argument("--queries", type=int, default=20, help="Runs of each list query")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["DATABASE_URL"] = args.database_url or (
+    f"sqlite:///{tempfile.mkdtemp(prefix='db-benchmark-')}/benchmark.sqlite3"
+)
+
+from sqlalchemy import select  # noqa: E402
+
+from controllers.appointments import save_appointment, save_appointments  # noqa: E402
+from services.database import ParsedAppointment, SessionLocal, engine, init_db  # noqa: E402
+
+
+def parse_result(index: int) -> dict:
+    return {
+        "original_filename": f"report-{index}.pdf",
+        "name": "Lipid Panel",
+        "date": date(2025, 1, 1 + index % 28).isoformat(),
+        "appointment_type": "Lab Work",
+        "summary": "Cholesterol levels are within the healthy range. " * 4,
+        "doctor": "Dr. Nowak",
+        "file_size": 250_000 + index,
+        "confidence_score": 90,
+    }
+
+
+def time_query(query) -> dict:
+    latencies = []
+    for _ in range(args.queries):
+        session = SessionLocal()
+        try:
+            started = time.perf_counter()
+            rows = session.execute(query).scalars().all()
+            latencies.append(time.perf_counter() - started)
+        finally:
+            session.close()
+    return {
+        "rows": len(rows),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+def main():
+    init_db()
+
+    started = time.perf_counter()
+    for index in range(args.single):
+        save_appointment(parse_result(index))
+    single_elapsed = time.perf_counter() - started
+
+    bulk_rows = max(0, args.rows - args.single)
+    started = time.perf_counter()
+    for start in range(0, bulk_rows, 10_000):
+        save_appointments(
+            [parse_result(index) for index in range(start, min(start + 10_000, bulk_rows))]
+        )
+    bulk_elapsed = time.perf_counter() - started
+
+    newest_first = select(ParsedAppointment).order_by(ParsedAppointment.created_at.desc())
+    results = {
+        "database": engine.url.get_backend_name(),
+        "rows": args.rows,
+        "single_inserts_per_s": round(args.single / single_elapsed, 1),
+        "bulk_inserts_per_s": round(bulk_rows / bulk_elapsed, 1) if bulk_rows else None,
+        "list_all": time_query(select(ParsedAppointment)),
+        "list_newest_50": time_query(newest_first.limit(50)),
+        "list_by_date_50": time_query(
+            select(ParsedAppointment)
+            .where(ParsedAppointment.date == date(2025, 1, 15))
+            .order_by(ParsedAppointment.created_at.desc())
+            .limit(50)
+        ),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
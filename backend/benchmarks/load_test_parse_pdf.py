@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Concurrent-upload load test for the /parse-pdf endpoint.
+
+Uploads the PDFs from `Test Data` to the app in-process (ASGI transport, no
+network) with a stubbed LLM that sleeps for a configurable latency, and reports
+throughput and latency percentiles. Run it on two commits to compare before and
+after numbers:
+
+    python benchmarks/load_test_parse_pdf.py --requests 32 --concurrency 8 --llm-latency 1.0
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DATA_DIR = BACKEND_DIR.parent / "Test Data"
+
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("OPENAI_API_KEY", "load-test")
+# Every upload must go through the full pipeline
+os.environ["PARSE_CACHE_ENABLED"] = "false"
+# Parsed appointments, stored PDFs and jobs go to throwaway locations
+_scratch = Path(tempfile.mkdtemp(prefix="load-test-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch / 'familycare.sqlite3'}"
+os.environ["BLOB_STORE_DIR"] = str(_scratch / "blobs")
+os.environ["JOBS_DIR"] = str(_scratch / "jobs")
+
+import httpx  # noqa: E402
+
+from main import app  # noqa: E402
+from services.database import init_db  # noqa: E402
+
+STUB_RESPONSE = {
+    "name": "Lipid Panel",
+    "date": "2025-01-15",
+    "appointment_type": "Lab Work",
+    "summary": "Cholesterol levels are within the healthy range.",
+    "doctor": "Dr. Nowak",
+    "confidence_score": 90,
+}
+
+
+def make_llm_stub(latency: float):
+    """Return a synchronous stand-in for client.chat.completions.create."""
+
+    def create(**kwargs):
+        time.sleep(latency)
+        # Answer with the fields of the requested schema (the summary-only call for reports
+        # matched by a template, all fields otherwise)
+        fields = kwargs["response_format"]["json_schema"]["schema"]["properties"]
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = json.dumps(
+            {field: STUB_RESPONSE[field] for field in fields}
+        )
+        return response
+
+    return create
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def run_load_test(total_requests: int, concurrency: int) -> dict:
+    pdf_paths = sorted(TEST_DATA_DIR.glob("*.pdf"))
+    if not pdf_paths:
+        raise SystemExit(f"No PDFs found in {TEST_DATA_DIR}")
+    pdfs = [(path.name, path.read_bytes()) for path in pdf_paths]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    # ASGITransport does not run the app lifespan, which creates the tables
+    init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as ac:
+
+        async def upload(index: int) -> None:
+            nonlocal failures
+            filename, content = pdfs[index % len(pdfs)]
+            async with semaphore:
+                started = time.perf_counter()
+                response = await ac.post(
+                    "/parse-pdf", files={"file": (filename, content, "application/pdf")}
+                )
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "latency_p50_s": round(statistics.median(latencies), 3),
+        "latency_p95_s": round(percentile(latencies, 95), 3),
+        "latency_max_s": round(max(latencies), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=32, help="Total number of uploads")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent uploads")
+    parser.add_argument(
+        "--llm-latency", type=float, default=1.0, help="Simulated LLM latency in seconds"
+    )
+    args = parser.parse_args()
+
+    with patch(
+        "controllers.appointments.client.chat.completions.create",
+        make_llm_stub(args.llm_latency),
+    ):
+        results = asyncio.run(run_load_test(args.requests, args.concurrency))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Per-page OCR latency of each OCR engine over the PDFs in `Test Data`.
+
+Every page is rasterized once up front, then OCRed (orientation detection and
+recognition, as in production) one page at a time by each installed engine,
+so the numbers compare the engines alone. The first page of each engine is
+reported separately: it includes model loading for tesserocr. Needs the
+tesseract and poppler binaries (and tesserocr for the in-process engine):
+
+    python benchmarks/ocr_engines.py --engines tesserocr pytesseract --repeat 3
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DATA_DIR = BACKEND_DIR.parent / "Test Data"
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services import ocr_engine, pdf_extraction  # noqa: E402
+
+
+def load_pages() -> list:
+    pages = []
+    for path in sorted(TEST_DATA_DIR.glob("*.pdf")):
+        pages.extend(pdf_extraction.convert_from_path(str(path), dpi=pdf_extraction.OCR_DPI))
+    return pages
+
+
+def benchmark(engine_name: str, pages: list, repeat: int) -> dict:
+    started = time.perf_counter()
+    engine = ocr_engine.create_engine(engine_name, pdf_extraction.OCR_LANG)
+    pdf_extraction.ocr_page(pages[0], engine)
+    first_page = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(repeat):
+        for page in pages:
+            started = time.perf_counter()
+            pdf_extraction.ocr_page(page, engine)
+            latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "engine": engine.name,
+        "pages": len(latencies),
+        "first_page_ms": round(first_page * 1000, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=["tesserocr", "pytesseract"],
+        default=[
+            name
+            for name, module in (
+                ("tesserocr", ocr_engine.tesserocr),
+                ("pytesseract", ocr_engine.pytesseract),
+            )
+            if module is not None
+        ],
+        help="Engines to compare (default: all installed)",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over all pages")
+    args = parser.parse_args()
+
+    if not (pdf_extraction.OCR_AVAILABLE and args.engines):
+        raise SystemExit("pdf2image and tesserocr or pytesseract must be installed")
+
+    pages = load_pages()
+    results = [benchmark(name, pages, args.repeat) for name in args.engines]
+    for result in results[:-1]:
+        baseline = results[-1]
+        result[f"p50_speedup_vs_{baseline['engine']}"] = round(
+            baseline["p50_ms"] / result["p50_ms"], 2
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
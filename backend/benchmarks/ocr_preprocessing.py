@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+OCR time and output with and without page preprocessing over `Test Data`.
+
+Every page of every PDF is rasterized once (grayscale, 300 DPI) and OCRed
+twice: as rendered, and after services.image_preprocessing (blank pages
+skipped, crop, rescale to the target line height, binarization). Per page the
+OCR time and character count of both runs are reported, followed by totals
+and the languages the first-page probe picks for each document. Needs the
+tesseract and poppler binaries installed:
+
+    python benchmarks/ocr_preprocessing.py --engine tesserocr
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DATA_DIR = BACKEND_DIR.parent / "Test Data"
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services import image_preprocessing, ocr_engine, pdf_extraction  # noqa: E402
+
+
+def timed_ocr(page, engine, preprocess: bool) -> tuple[float, str]:
+    pdf_extraction.OCR_PREPROCESS = preprocess
+    started = time.perf_counter()
+    text = pdf_extraction.ocr_page(page, engine)
+    return time.perf_counter() - started, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--engine",
+        default=ocr_engine.OCR_ENGINE,
+        choices=["auto", "tesserocr", "pytesseract"],
+        help="OCR engine (default: OCR_ENGINE)",
+    )
+    args = parser.parse_args()
+
+    if not pdf_extraction.OCR_AVAILABLE:
+        raise SystemExit("pdf2image and tesserocr or pytesseract must be installed")
+
+    engine = ocr_engine.create_engine(args.engine, pdf_extraction.OCR_LANG)
+    pages = []
+    languages = {}
+    for path in sorted(TEST_DATA_DIR.glob("*.pdf")):
+        images = pdf_extraction.convert_from_path(
+            str(path), dpi=pdf_extraction.OCR_DPI, grayscale=True
+        )
+        for number, image in enumerate(images, start=1):
+            raw_seconds, raw_text = timed_ocr(image, engine, preprocess=False)
+            prepared_seconds, prepared_text = timed_ocr(image, engine, preprocess=True)
+            if number == 1:
+                languages[path.name] = pdf_extraction.choose_language(prepared_text)
+            pages.append(
+                {
+                    "document": path.name,
+                    "page": number,
+                    "raw_ms": round(raw_seconds * 1000, 1),
+                    "preprocessed_ms": round(prepared_seconds * 1000, 1),
+                    "raw_chars": len(raw_text.strip()),
+                    "preprocessed_chars": len(prepared_text.strip()),
+                    "blank": image_preprocessing.is_blank(image),
+                }
+            )
+
+    raw_total = sum(page["raw_ms"] for page in pages)
+    prepared_total = sum(page["preprocessed_ms"] for page in pages)
+    summary = {
+        "pages": len(pages),
+        "blank_pages_skipped": sum(page["blank"] for page in pages),
+        "raw_p50_ms": statistics.median(page["raw_ms"] for page in pages),
+        "preprocessed_p50_ms": statistics.median(page["preprocessed_ms"] for page in pages),
+        "speedup": round(raw_total / prepared_total, 2) if prepared_total else None,
+        "raw_chars": sum(page["raw_chars"] for page in pages),
+        "preprocessed_chars": sum(page["preprocessed_chars"] for page in pages),
+        "languages": languages,
+    }
+    print(json.dumps({"pages": pages, "summary": summary}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+OCR throughput benchmark over the PDFs in `Test Data`.
+
+Every page of every PDF is rasterized and OCRed (even pages with a text layer),
+once per worker count, and pages/sec and the peak RSS growth of this process
+(rasterized pages; Linux only) are reported. Needs the tesseract and poppler
+binaries installed:
+
+    python benchmarks/ocr_throughput.py --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DATA_DIR = BACKEND_DIR.parent / "Test Data"
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+import PyPDF2  # noqa: E402
+
+from services import pdf_extraction  # noqa: E402
+
+
+def load_documents() -> list[tuple[str, bytes, int]]:
+    documents = []
+    for path in sorted(TEST_DATA_DIR.glob("*.pdf")):
+        content = path.read_bytes()
+        with path.open("rb") as f:
+            page_count = len(PyPDF2.PdfReader(f).pages)
+        documents.append((path.name, content, page_count))
+    return documents
+
+
+def _memory_kb(field: str) -> int:
+    with Path("/proc/self/status").open() as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def benchmark(documents: list[tuple[str, bytes, int]], workers: int) -> dict:
+    # Give the run as many global OCR slots as workers so the slots are not the bottleneck
+    pdf_extraction._ocr_slots = threading.BoundedSemaphore(workers)
+    # Reset the RSS high-water mark (VmHWM) so every run reports its own peak
+    Path("/proc/self/clear_refs").write_text("5")
+    rss_before = _memory_kb("VmRSS")
+
+    pages = 0
+    started = time.perf_counter()
+    for _name, content, page_count in documents:
+        results = pdf_extraction.ocr_pages(content, list(range(1, page_count + 1)), threads=workers)
+        pages += len(results)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "workers": workers,
+        "documents": len(documents),
+        "pages": pages,
+        "elapsed_s": round(elapsed, 2),
+        "pages_per_s": round(pages / elapsed, 2),
+        "peak_rss_growth_mb": round((_memory_kb("VmHWM") - rss_before) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="Worker counts to benchmark",
+    )
+    args = parser.parse_args()
+
+    if not pdf_extraction.OCR_AVAILABLE:
+        raise SystemExit("pdf2image and tesserocr or pytesseract must be installed")
+
+    documents = load_documents()
+    results = [benchmark(documents, workers) for workers in args.workers]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for the PDF parsing pipeline.
+
+Runs two suites over every PDF in `Test Data` and compares the results with
+a stored baseline:
+
+- extraction: the real extract_text_with_rotation path, document by document
+- endpoint: POST /parse-pdf in-process (ASGI transport) with the real OpenAI
+  client talking to a local stub of the chat completions endpoint that
+  answers after a configurable latency
+
+Reports p50/p95/p99 latency, throughput, peak memory and per-stage timing
+(spool, extract, condense, llm). Exits with status 1 when a request failed
+(its timings would be those of an error response) or a metric regressed by
+more than the tolerance:
+
+    python benchmarks/run_benchmarks.py                  # run and compare
+    python benchmarks/run_benchmarks.py --save-baseline  # run and store as baseline
+
+Absolute numbers depend on the machine; store the baseline on the machine
+that runs the comparison.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DATA_DIR = BACKEND_DIR.parent / "Test Data"
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Every upload must go through the full pipeline
+os.environ["PARSE_CACHE_ENABLED"] = "false"
+# Extraction in threads so the stage timers below see the calls
+os.environ["PDF_EXTRACT_WORKERS"] = "0"
+# Parsed appointments, stored PDFs and jobs go to throwaway locations
+_scratch = Path(tempfile.mkdtemp(prefix="benchmark-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch / 'familycare.sqlite3'}"
+os.environ["BLOB_STORE_DIR"] = str(_scratch / "blobs")
+os.environ["JOBS_DIR"] = str(_scratch / "jobs")
+
+import httpx  # noqa: E402
+from load_test_parse_pdf import STUB_RESPONSE, percentile  # noqa: E402
+
+from controllers import appointments  # noqa: E402
+from main import app  # noqa: E402
+from services.database import init_db  # noqa: E402
+from services.llm_client import create_openai_client  # noqa: E402
+from services.metrics import peak_rss_bytes  # noqa: E402
+from services.pdf_extraction import extract_text_with_rotation  # noqa: E402
+
+# Metric -> direction that counts as better; compared against the baseline
+COMPARED_METRICS = {
+    "latency_p50_ms": "lower",
+    "latency_p95_ms": "lower",
+    "throughput_per_s": "higher",
+}
+
+
+def latency_summary(latencies: list[float], elapsed: float) -> dict:
+    return {
+        "count": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "latency_max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+def load_documents() -> list[tuple[str, bytes]]:
+    pdf_paths = sorted(TEST_DATA_DIR.glob("*.pdf"))
+    if not pdf_paths:
+        raise SystemExit(f"No PDFs found in {TEST_DATA_DIR}")
+    return [(path.name, path.read_bytes()) for path in pdf_paths]
+
+
+def run_extraction_suite(documents: list[tuple[str, bytes]], iterations: int) -> dict:
+    # Warm-up: imports, regex compilation and the page cache
+    extract_text_with_rotation(io.BytesIO(documents[0][1]))
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for _name, content in documents:
+            call_started = time.perf_counter()
+            extract_text_with_rotation(io.BytesIO(content))
+            latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    return {**latency_summary(latencies, elapsed), "peak_rss_mb": peak_rss_mb()}
+
+
+class ChatCompletionsStub(BaseHTTPRequestHandler):
+    """Local chat completions endpoint answering with the fields of the requested schema."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.latency)
+        fields = request["response_format"]["json_schema"]["schema"]["properties"]
+        body = json.dumps(
+            {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {
+                            "role": "assistant",
+                            "content": json.dumps(
+                                {field: STUB_RESPONSE[field] for field in fields}
+                            ),
+                        },
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+class StageTimer:
+    """Wraps pipeline functions and records how long each call took per stage."""
+
+    def __init__(self):
+        self.timings: dict[str, list[float]] = defaultdict(list)
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.timings[stage].append(time.perf_counter() - started)
+
+        return timed
+
+    def wrap_async(self, stage: str, func):
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.timings[stage].append(time.perf_counter() - started)
+
+        return timed
+
+    def summary(self) -> dict:
+        return {
+            stage: {
+                "calls": len(values),
+                "mean_ms": round(statistics.fmean(values) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+            }
+            for stage, values in sorted(self.timings.items())
+        }
+
+
+async def upload_all(documents, total_requests: int, concurrency: int) -> tuple[list, float, int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    # ASGITransport does not run the app lifespan, which creates the tables
+    init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as ac:
+
+        async def upload(index: int) -> None:
+            nonlocal failures
+            filename, content = documents[index % len(documents)]
+            async with semaphore:
+                started = time.perf_counter()
+                response = await ac.post(
+                    "/parse-pdf", files={"file": (filename, content, "application/pdf")}
+                )
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, elapsed, failures
+
+
+def run_endpoint_suite(
+    documents: list[tuple[str, bytes]],
+    total_requests: int,
+    concurrency: int,
+    llm_latency: float,
+    fast_path: bool,
+) -> dict:
+    ChatCompletionsStub.latency = llm_latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatCompletionsStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    llm_client = create_openai_client(
+        "benchmark", base_url=f"http://127.0.0.1:{server.server_port}"
+    )
+
+    timer = StageTimer()
+    try:
+        with (
+            patch.object(appointments, "client", llm_client),
+            patch.object(appointments, "RULES_FAST_PATH_ENABLED", fast_path),
+            patch.object(
+                appointments,
+                "spool_upload",
+                timer.wrap_async("spool", appointments.spool_upload),
+            ),
+            patch.object(
+                appointments,
+                "extract_text_from_file",
+                timer.wrap("extract", appointments.extract_text_from_file),
+            ),
+            patch.object(
+                appointments, "condense_text", timer.wrap("condense", appointments.condense_text)
+            ),
+            patch.object(
+                appointments,
+                "request_structured_output",
+                timer.wrap_async("llm", appointments.request_structured_output),
+            ),
+        ):
+            latencies, elapsed, failures = asyncio.run(
+                upload_all(documents, total_requests, concurrency)
+            )
+    finally:
+        llm_client.close()
+        server.shutdown()
+        server.server_close()
+
+    return {
+        **latency_summary(latencies, elapsed),
+        "concurrency": concurrency,
+        "llm_latency_s": llm_latency,
+        "fast_path": fast_path,
+        "failures": failures,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": timer.summary(),
+    }
+
+
+def peak_rss_mb() -> float:
+    return round(peak_rss_bytes() / (1024 * 1024), 1)
+
+
+def failed_requests(results: dict) -> list[str]:
+    """Return a description of every suite with failed requests."""
+    return [
+        f"{suite}.failures: {metrics['failures']} of {metrics['count']} requests"
+        for suite, metrics in results["suites"].items()
+        if metrics.get("failures")
+    ]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every metric that regressed by more than tolerance."""
+    regressions = []
+    for suite, metrics in results["suites"].items():
+        baseline_metrics = baseline.get("suites", {}).get(suite)
+        if not baseline_metrics:
+            continue
+        for metric, better in COMPARED_METRICS.items():
+            current, previous = metrics.get(metric), baseline_metrics.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            if (better == "lower" and change > tolerance) or (
+                better == "higher" and change < -tolerance
+            ):
+                regressions.append(f"{suite}.{metric}: {previous} -> {current} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--iterations", type=int, default=5, help="Extraction passes over all documents"
+    )
+    parser.add_argument("--requests", type=int, default=64, help="Endpoint uploads")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent uploads")
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.5, help="Stub LLM latency in seconds"
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="Send every document through the full LLM extraction",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)"
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store the results as the new baseline"
+    )
+    args = parser.parse_args()
+
+    documents = load_documents()
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "documents": len(documents),
+        },
+        "suites": {
+            "extraction": run_extraction_suite(documents, args.iterations),
+            "endpoint": run_endpoint_suite(
+                documents,
+                args.requests,
+                args.concurrency,
+                args.llm_latency,
+                fast_path=not args.no_fast_path,
+            ),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+    failures = failed_requests(results)
+    if failures:
+        print("Requests failed, the results are not usable:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline stored in {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    if regressions:
+        print("Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
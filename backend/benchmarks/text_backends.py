@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Compare the text-layer backends on every PDF in `Test Data`.
+
+For each backend reports the median time to read each document, the peak RSS
+growth while reading all of them (measured on Linux in a fresh process per
+backend, so native allocations of PDFium count too) and text parity with the
+PyPDF2 output the parser was built on: similarity of the whitespace-normalised
+text and whether the template extraction reads the same appointment fields.
+
+    python benchmarks/text_backends.py --repeat 20
+"""
+
+import argparse
+import difflib
+import io
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DATA_DIR = BACKEND_DIR.parent / "Test Data"
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services import pdf_text  # noqa: E402
+from services.pdf_extraction import PAGE_SEPARATOR  # noqa: E402
+from services.template_extraction import match_template  # noqa: E402
+
+
+def load_documents() -> list[tuple[str, bytes]]:
+    return [(path.name, path.read_bytes()) for path in sorted(TEST_DATA_DIR.glob("*.pdf"))]
+
+
+def read_text(backend: pdf_text.TextBackend, content: bytes) -> str:
+    pages = backend.read_pages(io.BytesIO(content))
+    return PAGE_SEPARATOR.join(page.text + "\n" for page in pages)
+
+
+def _memory_kb(field: str) -> int:
+    with Path("/proc/self/status").open() as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def peak_rss_growth_kb(backend_name: str) -> int:
+    """Run in a fresh process: read every document once and return the RSS high-water growth."""
+    backend = pdf_text.create_backend(backend_name)
+    documents = load_documents()
+    # Reset the high-water mark (VmHWM) to the current RSS, imports must not count (Linux only)
+    Path("/proc/self/clear_refs").write_text("5")
+    before = _memory_kb("VmRSS")
+    for _name, content in documents:
+        read_text(backend, content)
+    return _memory_kb("VmHWM") - before
+
+
+def benchmark(backend_name: str, documents: list[tuple[str, bytes]], repeat: int) -> dict:
+    backend = pdf_text.create_backend(backend_name)
+    reference = pdf_text.PyPDF2Backend()
+    latencies = []
+    similarities = []
+    same_fields = 0
+    for _name, content in documents:
+        runs = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            text = read_text(backend, content)
+            runs.append(time.perf_counter() - started)
+        latencies.append(statistics.median(runs))
+
+        expected = read_text(reference, content)
+        similarities.append(
+            difflib.SequenceMatcher(
+                None, " ".join(text.split()), " ".join(expected.split())
+            ).ratio()
+        )
+        match, expected_match = match_template(text), match_template(expected)
+        same_fields += (match and match.fields()) == (expected_match and expected_match.fields())
+
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        rss_kb = pool.apply(peak_rss_growth_kb, (backend_name,))
+
+    return {
+        "backend": backend.name,
+        "documents": len(documents),
+        "median_ms_per_document": round(statistics.median(latencies) * 1000, 2),
+        "total_ms": round(sum(latencies) * 1000, 1),
+        "peak_rss_growth_mb": round(rss_kb / 1024, 1),
+        "min_text_similarity": round(min(similarities), 3),
+        "mean_text_similarity": round(statistics.fmean(similarities), 3),
+        "same_template_fields": f"{same_fields}/{len(documents)}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=["pdfium", "pypdf2"],
+        default=["pdfium", "pypdf2"] if pdf_text.pdfium is not None else ["pypdf2"],
+        help="Backends to compare (default: all installed)",
+    )
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per document")
+    args = parser.parse_args()
+
+    documents = load_documents()
+    results = [benchmark(name, documents, args.repeat) for name in args.backends]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,57 @@
-import io
+import asyncio
+import base64
+import hashlib
+import json
 import logging
 import os
-from datetime import datetime
+import threading
+import uuid
+from datetime import date, datetime
 
-import PyPDF2
 from dotenv import load_dotenv
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
-from openai import OpenAI
-from pydantic import BaseModel
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
 
-try:
-    import pytesseract
-    from pdf2image import convert_from_bytes
+from services import parse_events
+from services.blob_store import BlobNotFoundError, blob_response, blob_store
+from services.database import (
+    ParsedAppointment,
+    SessionLocal,
+    bulk_insert_appointments,
+    list_appointments_page,
+)
+from services.jobs import job_queue
+from services.llm_client import create_openai_client
+from services.logging_config import redact
+from services.metrics import (
+    collect_spans,
+    record_peak_rss,
+    record_spans,
+    span,
+    track_peak_rss,
+)
+from services.parse_cache import ParseCache, hash_bytes
+from services.pdf_extraction import extract_text_from_file, extraction_fingerprint
+from services.single_flight import SingleFlight
+from services.structured_output import (
+    StreamedStringField,
+    StructuredOutputError,
+    StructuredOutputStats,
+    json_schema_response_format,
+    parse_structured_response,
+)
+from services.template_extraction import RULES_VERSION, match_template
+from services.text_condenser import condense_text
+from services.upload import (
+    SpooledUpload,
+    UploadTooLargeError,
+    spool_upload,
+)
+from services.workers import db_stage, extract_stage, llm_stage
 
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -25,7 +60,8 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or os.getenv("API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable is not set")
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Shared for all requests so API connections are kept alive; closed by the app lifespan
+client = create_openai_client(OPENAI_API_KEY)
 
 
 class AppointmentData(BaseModel):
@@ -38,6 +74,54 @@ class AppointmentData(BaseModel):
     confidence_score: int = 0
 
 
+# The fields the LLM extracts, used as its structured output schema. Strict mode requires
+# every field to be present and no additional fields.
+AppointmentExtraction = create_model(
+    "AppointmentExtraction",
+    __config__=ConfigDict(extra="forbid"),
+    **{
+        name: (field.annotation, ...)
+        for name, field in AppointmentData.model_fields.items()
+        if name != "file_size"
+    },
+)
+
+
+class ParsedAppointmentResponse(BaseModel):
+    """A stored parsed appointment as returned by GET /parsed-appointments."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    original_filename: str
+    name: str
+    date: date
+    appointment_type: str
+    summary: str | None
+    doctor: str | None
+    file_size: int
+    processing_status: str
+    confidence_score: int | None
+    created_at: datetime | None
+    updated_at: datetime | None
+
+
+# An item of GET /parsed-appointments?fields=...: only the selected fields are present
+ParsedAppointmentFields = create_model(
+    "ParsedAppointmentFields",
+    **{
+        name: (field.annotation | None, None)
+        for name, field in ParsedAppointmentResponse.model_fields.items()
+    },
+)
+
+
+class AppointmentSummary(BaseModel):
+    """Structured output of the summary-only call used when a template matched the report."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    summary: str
 
 
 # Create router
@@ -46,230 +130,529 @@ router = APIRouter()
 # Maximum file size: 15MB
 MAX_FILE_SIZE = 15 * 1024 * 1024
 
+# Maximum number of files per batch request and how many of them are parsed at once
+MAX_BATCH_FILES = int(os.getenv("PARSE_BATCH_MAX_FILES", "50"))
+BATCH_CONCURRENCY = int(os.getenv("PARSE_BATCH_CONCURRENCY", "4"))
 
-@router.post("/parse-pdf")
-async def parse_pdf(file: UploadFile = File(...)):
-    """
-    Parse PDF file to extract appointment information using ChatGPT API.
-
-    Parameters:
-        file: PDF file to parse
+# Largest request bodies of the upload endpoints: the files plus room for the multipart
+# framing. Larger requests are rejected before their body is read (UploadSizeLimitMiddleware)
+MULTIPART_OVERHEAD = 64 * 1024
+UPLOAD_BODY_LIMITS = {
+    "/parse-pdf": MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+    "/parse-pdf/batch": MAX_BATCH_FILES * (MAX_FILE_SIZE + MULTIPART_OVERHEAD),
+}
 
-    Returns:
-        name: Title/name of the appointment or medical report
-        date: Date of the appointment in YYYY-MM-DD format
-        appointment_type: One of the predefined appointment types
-        summary: Summary of appointment or medical recommendations
-        file_size: Size of the uploaded file in bytes
-        doctor: Name of doctor or facility name if doctor not available
-        confidence_score: AI confidence score (0-100)
-    """
-    if not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="File must be a PDF")
+# Page size of GET /parsed-appointments
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-    try:
-        # Read PDF content
-        pdf_content = await file.read()
+# Structured outputs (json_schema response format) need gpt-4o-mini or newer
+LLM_MODEL = "gpt-4o-mini"
+LLM_RESPONSE_FORMAT = json_schema_response_format(AppointmentExtraction)
+# Follow-up requests asking the model to fix a response that does not match the schema
+LLM_REPAIR_ATTEMPTS = int(os.getenv("LLM_REPAIR_ATTEMPTS", "1"))
+# Token budget for the document text in the prompt, the rest of the context is left for the
+# instructions and the response
+LLM_DOCUMENT_TOKEN_BUDGET = int(os.getenv("LLM_DOCUMENT_TOKEN_BUDGET", "4000"))
 
-        # Validate file size
-        if len(pdf_content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024 * 1024):.0f}MB",
-            )
+# Read the appointment fields of reports from known templates with rules instead of the LLM
+RULES_FAST_PATH_ENABLED = os.getenv("RULES_FAST_PATH_ENABLED", "true").lower() == "true"
+# Still ask the LLM for the summary of template reports (false: short rule-based summary,
+# no LLM call at all)
+FAST_PATH_LLM_SUMMARY = os.getenv("FAST_PATH_LLM_SUMMARY", "true").lower() == "true"
 
-        if len(pdf_content) == 0:
-            raise HTTPException(status_code=400, detail="File is empty")
+SYSTEM_PROMPT = "You are a medical document parser. Always return valid JSON."
 
-        # Function to extract text with rotation attempts and OCR fallback
-        def extract_text_with_rotation(pdf_bytes):
-            logging.info("Starting text extraction with rotation attempts")
-            rotations = [0, 90, 180, 270]  # Try each rotation
+REPAIR_PROMPT = (
+    "Your previous response could not be used: {error}. "
+    "Return ONLY the corrected JSON object with exactly the requested fields."
+)
 
-            for rotation in rotations:
-                logging.info(f"Attempting rotation: {rotation} degrees")
-                try:
-                    # Reset file pointer
-                    pdf_bytes.seek(0)
-                    reader = PyPDF2.PdfReader(pdf_bytes)
-
-                    # If rotation needed, create rotated PDF
-                    if rotation > 0:
-                        logging.info(f"Applying rotation {rotation} to PDF")
-                        writer = PyPDF2.PdfWriter()
-                        for page in reader.pages:
-                            page.rotate(rotation)
-                            writer.add_page(page)
-
-                        # Write rotated PDF to new BytesIO
-                        rotated_pdf = io.BytesIO()
-                        writer.write(rotated_pdf)
-                        rotated_pdf.seek(0)
-                        reader = PyPDF2.PdfReader(rotated_pdf)
-
-                    # Extract text
-                    text_content = ""
-                    for page in reader.pages:
-                        page_text = page.extract_text()
-                        text_content += page_text + "\n"
-
-                    # Check if we got meaningful text (more than just whitespace)
-                    stripped_content = text_content.strip()
-                    if stripped_content and len(stripped_content) > 10:
-                        logging.info(
-                            f"Successfully extracted text with rotation {rotation}, length: {len(stripped_content)}"
-                        )
-                        return text_content
-
-                    # Try OCR if available and regular extraction failed
-                    if OCR_AVAILABLE:
-                        logging.info(
-                            f"Regular extraction failed for rotation {rotation}, attempting OCR"
-                        )
-                        try:
-                            # Reset file pointer for OCR
-                            pdf_bytes.seek(0)
-                            pdf_data = pdf_bytes.read()
-
-                            # Convert PDF to images for OCR
-                            images = convert_from_bytes(pdf_data, dpi=300)
-                            logging.info(f"Converted PDF to {len(images)} images for OCR")
-
-                            ocr_text = ""
-                            for i, image in enumerate(images):
-                                # Apply rotation to image if needed
-                                if rotation > 0:
-                                    image = image.rotate(
-                                        -rotation, expand=True
-                                    )  # PIL uses counterclockwise rotation
-                                    logging.info(
-                                        f"Applied inverse rotation {rotation} to image {i}"
-                                    )
-
-                                # Perform OCR on the image
-                                page_text = pytesseract.image_to_string(
-                                    image, lang="pol+eng"
-                                )  # Support Polish and English
-                                ocr_text += page_text + "\n"
-
-                            # Check if OCR extracted meaningful text
-                            stripped_ocr = ocr_text.strip()
-                            if (
-                                stripped_ocr and len(stripped_ocr) > 20
-                            ):  # OCR might extract some garbage, so higher threshold
-                                logging.info(
-                                    f"OCR successful for rotation {rotation}, extracted text length: {len(stripped_ocr)}"
-                                )
-                                return ocr_text
-                            else:
-                                logging.warning(
-                                    f"OCR for rotation {rotation} extracted insufficient text (length: {len(stripped_ocr)})"
-                                )
-
-                        except Exception as ocr_error:
-                            logging.warning(f"OCR failed for rotation {rotation}: {ocr_error!s}")
-                            # OCR failed, continue to next rotation
-                            continue
-
-                except Exception as e:
-                    logging.warning(f"Rotation {rotation} failed: {e!s}")
-                    # If this rotation fails, continue to next rotation
-                    continue
-
-            # If all rotations and OCR attempts failed, return empty string
-            logging.warning("All rotation attempts and OCR failed, returning empty string")
-            return ""
-
-        # Extract text from PDF with rotation attempts
-        logging.info(f"Starting PDF processing for file: {file.filename}")
-        text_content = extract_text_with_rotation(io.BytesIO(pdf_content))
-
-        if not text_content.strip():
-            logging.error(f"Failed to extract any text from PDF: {file.filename}")
-            raise HTTPException(
-                status_code=400,
-                detail="Could not extract text from PDF even after trying different rotations",
-            )
+SUMMARY_INSTRUCTIONS = """
+            Provide a comprehensive expert medical analysis including: patient demographics and history, chief complaint and symptoms, detailed physical examination findings with clinical significance, complete diagnostic test results with normal ranges and interpretation, definitive or differential diagnosis with clinical reasoning, treatment plan with medications (doses, frequencies, duration), preventive measures, lifestyle recommendations, follow-up schedule and monitoring parameters, potential complications or red flags, prognosis and expected outcomes, and any other critical clinical insights or recommendations based on medical expertise.
 
-        logging.info(f"Successfully extracted text from PDF, length: {len(text_content.strip())}")
+            + Summarize physical exam findings and what they mean in simple terms (e.g., "Your lungs sounded clear, which means there are no signs of infection.")
+            + Avoid numeric lab values — instead, explain results conceptually ("Your blood sugar was higher than normal, which can mean…").
+            + Describe what treatments are recommended and why.
+            + For medications: name, what it does, how often to take it, how long, and common side effects in simple terms.
+            + Include lifestyle advice (diet, exercise, sleep, stress, smoking, alcohol) in positive, encouraging language.
+            + Mention any procedures or therapies and explain what to expect."""
 
-        # Use ChatGPT to parse the appointment data
-        logging.info("Preparing ChatGPT prompt for appointment data extraction")
-        prompt = f"""
+PROMPT_TEMPLATE = f"""
         Extract appointment information from the following medical document text.
         Return all text in english only.
         Return ONLY a JSON object with exactly these fields:
         - name: Title or name of the appointment/medical report (e.g., "Dermatology Consultation", "Blood Test Results")
         - date: The appointment date in YYYY-MM-DD format (extract from the document)
         - appointment_type: Must be one of these exact values: 'General Checkup', 'Dental', 'Vision', 'Specialist', 'Vaccination', 'Follow-up', 'Emergency', 'Lab Work', 'Physical Therapy', 'Mental Health', 'Veterinary'
-        - summary:
-            Provide a comprehensive expert medical analysis including: patient demographics and history, chief complaint and symptoms, detailed physical examination findings with clinical significance, complete diagnostic test results with normal ranges and interpretation, definitive or differential diagnosis with clinical reasoning, treatment plan with medications (doses, frequencies, duration), preventive measures, lifestyle recommendations, follow-up schedule and monitoring parameters, potential complications or red flags, prognosis and expected outcomes, and any other critical clinical insights or recommendations based on medical expertise.
-
-            + Summarize physical exam findings and what they mean in simple terms (e.g., "Your lungs sounded clear, which means there are no signs of infection.")
-            + Avoid numeric lab values — instead, explain results conceptually ("Your blood sugar was higher than normal, which can mean…").
-            + Describe what treatments are recommended and why.
-            + For medications: name, what it does, how often to take it, how long, and common side effects in simple terms.
-            + Include lifestyle advice (diet, exercise, sleep, stress, smoking, alcohol) in positive, encouraging language.
-            + Mention any procedures or therapies and explain what to expect.
+        - summary:{SUMMARY_INSTRUCTIONS}
         - doctor: Name of the doctor, or name of the medical facility/clinic if doctor name not available
         - confidence_score: A score between 0 and 100 indicating how certain you are about the information you extracted from the document
 
         Document text:
-        {text_content[:15000]}  # Limit text to avoid token limits
+        {{document_text}}
+        """
+
+# Used for reports matched by a template, where only the summary is missing
+SUMMARY_PROMPT_TEMPLATE = f"""
+        Write the summary of the following medical document.
+        Return all text in english only.
+        Return ONLY a JSON object with exactly this field:
+        - summary:{SUMMARY_INSTRUCTIONS}
+
+        Document text:
+        {{document_text}}
         """
 
-        logging.info("Making ChatGPT API call for appointment parsing")
+# Identifies the extractor configuration; cached text is only reused for the same value
+EXTRACTION_FINGERPRINT = extraction_fingerprint()
+
+# Identifies the prompt/model version (and the text it is given); cached parse results are
+# only reused for the same value
+PROMPT_FINGERPRINT = hash_bytes(
+    f"{EXTRACTION_FINGERPRINT}\n{LLM_MODEL}\n{LLM_DOCUMENT_TOKEN_BUDGET}\n{LLM_RESPONSE_FORMAT}\n"
+    f"{SYSTEM_PROMPT}\n{PROMPT_TEMPLATE}\n{SUMMARY_PROMPT_TEMPLATE}\n"
+    f"{RULES_FAST_PATH_ENABLED}:{RULES_VERSION}:{FAST_PATH_LLM_SUMMARY}".encode()
+)[:16]
+
+# Content-addressed cache of extracted text and parsed results (default 512MB)
+parse_cache = ParseCache(
+    directory=os.getenv("PARSE_CACHE_DIR", ".cache/parse"),
+    max_bytes=int(os.getenv("PARSE_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+    enabled=os.getenv("PARSE_CACHE_ENABLED", "true").lower() == "true",
+)
+
+llm_output_stats = StructuredOutputStats()
+
+# Concurrent uploads of the same PDF share one parse
+parse_flights = SingleFlight()
+# Events of the parses in flight, by parse_flights key, for clients streaming them
+flight_events: dict[str, parse_events.Broadcast] = {}
+
+
+def load_parse_cache() -> None:
+    """
+    Index the parse cache on disk, called in a thread at startup.
+
+    Drops results produced by a previous prompt template or model, and text by a
+    previous extractor.
+    """
+    parse_cache.load()
+    parse_cache.invalidate_results(keep_fingerprint=PROMPT_FINGERPRINT)
+    parse_cache.invalidate_text(keep_fingerprint=EXTRACTION_FINGERPRINT)
+
+
+@router.get("/parse-pdf/cache")
+async def get_parse_cache_stats():
+    """
+    Return parse cache statistics.
+
+    Returns:
+        Hit/miss counters, hit rates, entry count and size of the parse cache, counters
+        of concurrent identical uploads coalesced into one parse, and of uploads stored
+        in the blob store or deduplicated against a stored copy
+    """
+    return {
+        **parse_cache.stats(),
+        "single_flight": parse_flights.stats(),
+        "blob_store": blob_store.stats(),
+    }
+
+
+@router.delete("/parse-pdf/cache")
+async def invalidate_parse_cache(results_only: bool = True):
+    """
+    Invalidate the parse cache.
+
+    Parameters:
+        results_only: Only drop parsed results and keep extracted text (default True).
+            Use after changing the prompt template outside of PROMPT_TEMPLATE.
+    """
+    if results_only:
+        removed = await asyncio.to_thread(parse_cache.invalidate_results)
+        return {"removed": removed}
+
+    await asyncio.to_thread(parse_cache.clear)
+    return {"removed": "all"}
+
+
+@router.get("/parse-pdf/llm-stats")
+async def get_llm_output_stats():
+    """
+    Return structured output statistics of the appointment extraction call.
+
+    Returns:
+        Response, parse failure and repair counters with the parse failure rate
+    """
+    return llm_output_stats.stats()
+
+
+def stream_completion(stop: threading.Event, **request) -> str:
+    """
+    Run a chat completion with streaming and return the content of the response.
+
+    The summary field is decoded from the partial response and emitted as summary events
+    while the model is still writing, for clients of POST /parse-pdf?stream=true. Runs in
+    the LLM thread pool like the non-streaming call.
+
+    Parameters:
+        stop: Set when the parse was cancelled; the response is abandoned at the next chunk
+        request: Arguments of client.chat.completions.create
+    """
+    summary = StreamedStringField("summary")
+    content = []
+    stream = client.chat.completions.create(stream=True, **request)
+    try:
+        for chunk in stream:
+            if stop.is_set():
+                break
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            content.append(chunk.choices[0].delta.content)
+            text = summary.feed(chunk.choices[0].delta.content)
+            if text:
+                parse_events.emit("summary", delta=text)
+    finally:
+        # Closes the connection, so an abandoned response stops downloading
+        stream.close()
+    return "".join(content)
+
+
+async def request_structured_output(prompt: str, output_model: type[BaseModel]):
+    """
+    Ask the LLM for a response matching output_model, repairing responses that do not.
+
+    A response that fails validation is sent back to the model together with the error, up
+    to LLM_REPAIR_ATTEMPTS times, so the user does not need to upload the document again.
+    When a client streams the parse, the response is streamed too and every attempt
+    starts with an llm stage event, after which the summary text starts over. Cancelling
+    the parse stops reading a streamed response.
+
+    Parameters:
+        prompt: User prompt including the document text
+        output_model: Pydantic model used as the response schema
+
+    Returns:
+        The validated output_model instance
+
+    Raises:
+        HTTPException: if the AI service fails or no valid response was produced
+    """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+    llm_output_stats.record("requests")
+
+    for attempt in range(LLM_REPAIR_ATTEMPTS + 1):
+        logger.debug("Making ChatGPT API call for appointment parsing (attempt %d)", attempt + 1)
+        if attempt:
+            llm_output_stats.record("repair_attempts")
+        parse_events.emit("stage", stage="llm", attempt=attempt + 1)
+        request = {
+            "model": LLM_MODEL,
+            "messages": messages,
+            "response_format": json_schema_response_format(output_model),
+            "temperature": 0.1,  # Low temperature for consistent parsing
+            "max_tokens": 4096,
+        }
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a medical document parser. Always return valid JSON.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.1,  # Low temperature for consistent parsing
-                max_tokens=4096,
-            )
-            logging.info("ChatGPT API call successful")
+            # The OpenAI client is synchronous, so the call runs in the LLM thread pool
+            with span("llm_call"):
+                if parse_events.active():
+                    stop = threading.Event()
+                    try:
+                        result_text = await llm_stage.run(stream_completion, stop, **request)
+                    except asyncio.CancelledError:
+                        # No caller waits for the parse anymore; the thread is not interrupted
+                        # by the cancellation, it checks stop between chunks
+                        stop.set()
+                        raise
+                else:
+                    response = await llm_stage.run(client.chat.completions.create, **request)
+                    result_text = response.choices[0].message.content
+            logger.debug("ChatGPT API call successful")
         except Exception as e:
-            logging.error(f"ChatGPT API call failed: {e!s}")
+            logger.error("ChatGPT API call failed: %s", e)
             raise HTTPException(
                 status_code=500, detail="Failed to process document with AI service"
             )
+        llm_output_stats.record("responses")
+
+        logger.debug("Raw ChatGPT response: %s", redact(result_text))
+        try:
+            output = parse_structured_response(result_text, output_model)
+        except StructuredOutputError as e:
+            llm_output_stats.record("parse_failures")
+            logger.warning("Failed to parse JSON response: %s", e)
+            messages = [
+                *messages,
+                {"role": "assistant", "content": result_text or ""},
+                {"role": "user", "content": REPAIR_PROMPT.format(error=e)},
+            ]
+            continue
 
-        # Parse the response
-        result_text = response.choices[0].message.content.strip()
-        logging.info(f"Raw ChatGPT response: {result_text[:500]}...")
+        if attempt:
+            llm_output_stats.record("repaired")
+        logger.debug("Successfully parsed JSON response")
+        return output
 
-        # Try to extract JSON from the response
-        import json
+    llm_output_stats.record("unrecoverable")
+    raise HTTPException(
+        status_code=400,
+        detail="Failed to parse JSON response from AI service. Unable to extract appointment information.",
+    )
 
-        logging.info("Parsing JSON response from ChatGPT")
+
+def start_shared_parse(upload: SpooledUpload, filename: str, key: str) -> asyncio.Task:
+    """
+    Start parse_document for a single flight on a handle of the upload owned by the parse.
+
+    Called synchronously when the flight starts, so the handle exists before the caller can
+    be cancelled. The events of the parse go to a broadcast registered under key in
+    flight_events, for every streaming caller. Both are removed when the parse finishes,
+    also if it is cancelled before it started.
+    """
+    shared = upload.share()
+    broadcast = flight_events[key] = parse_events.Broadcast()
+
+    def finish(_task: asyncio.Task) -> None:
+        shared.cleanup()
+        if flight_events.get(key) is broadcast:
+            del flight_events[key]
+
+    # The task copies the context, with the broadcast in place of the first caller's channel
+    with parse_events.bind(broadcast):
+        task = asyncio.ensure_future(parse_document(shared, filename))
+    task.add_done_callback(finish)
+    return task
+
+
+async def process_upload(upload: SpooledUpload, filename: str) -> dict:
+    """
+    Run the extraction and AI parsing pipeline on a spooled PDF upload.
+
+    Concurrent uploads of the same content (e.g. a double-clicked upload) are parsed
+    once and all receive the result or the error. The shared parse reads its own handle
+    on the file, so it keeps working when the caller that started it goes away and
+    removes its upload. Streaming callers all receive the events of the shared parse.
+
+    Parameters:
+        upload: Uploaded PDF spooled to disk
+        filename: Original filename of the upload
+
+    Returns:
+        Parsed appointment data including file_size and original_filename
+
+    Raises:
+        HTTPException: if the document cannot be parsed
+    """
+    key = f"{upload.sha256}:{PROMPT_FINGERPRINT}"
+    with span("total"):
+        flight = parse_flights.start(key, start_shared_parse, upload, filename, key)
+        with parse_events.listen(flight_events.get(key)):
+            result = await parse_flights.wait(flight)
+    response_data = dict(result)
+    response_data["original_filename"] = filename
+    return response_data
+
+
+def appointment_row(result: dict, file_sha256: str | None = None) -> dict:
+    """Column values of the parsed_appointments row for a process_upload result."""
+    return {
+        "file_sha256": file_sha256,
+        "original_filename": result["original_filename"],
+        "name": result["name"],
+        "date": date.fromisoformat(result["date"]),
+        "appointment_type": result["appointment_type"],
+        "summary": result["summary"],
+        "doctor": result["doctor"],
+        "file_size": result["file_size"],
+        "confidence_score": result["confidence_score"],
+    }
+
+
+def save_appointment(result: dict, file_sha256: str | None = None) -> str:
+    """Store one parsed appointment and return its id."""
+    session = SessionLocal()
+    try:
+        appointment = ParsedAppointment(id=uuid.uuid4(), **appointment_row(result, file_sha256))
+        session.add(appointment)
+        session.commit()
+        # Load the stored row, including the server-side defaults
+        session.refresh(appointment)
+        return str(appointment.id)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def save_appointments(results: list[dict], file_hashes: list[str] | None = None) -> list[str]:
+    """Store parsed appointments in one transaction and return their ids."""
+    file_hashes = file_hashes or [None] * len(results)
+    session = SessionLocal()
+    try:
+        ids = bulk_insert_appointments(
+            session,
+            [
+                appointment_row(result, file_sha256)
+                for result, file_sha256 in zip(results, file_hashes, strict=True)
+            ],
+        )
+        session.commit()
+        return [str(appointment_id) for appointment_id in ids]
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+async def parse_and_store(upload: SpooledUpload, filename: str) -> dict:
+    """
+    Parse a spooled PDF upload and store the result in parsed_appointments.
+
+    The PDF goes to the blob store (once per content), the row references it by hash.
+
+    Returns:
+        The process_upload result with the id of the stored row
+
+    Raises:
+        HTTPException: if the document cannot be parsed or the result cannot be stored
+    """
+    # The streaming endpoint and the job queue parse through here too, after the response
+    # was returned, so the memory of the parse is logged here rather than by the endpoint
+    with track_peak_rss() as peaks:
         try:
-            # Remove any markdown formatting if present
-            if result_text.startswith("```json"):
-                logging.info("Removing markdown formatting from JSON response")
-                result_text = result_text[7:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
+            result = await process_upload(upload, filename)
+        finally:
+            if peaks:
+                logger.info(
+                    "Memory: extraction of %s raised the peak rss by %.1fMB",
+                    redact(filename),
+                    max(peaks) / 2**20,
+                )
+    parse_events.emit("stage", stage="store")
+    try:
+        with span("store"):
+            await asyncio.to_thread(blob_store.put, upload.path, upload.sha256)
+            result["id"] = await db_stage.run(save_appointment, result, upload.sha256)
+    except Exception as e:
+        logger.error("Failed to store parsed appointment: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to store parsed appointment")
+    return result
+
+
+async def parse_document(upload: SpooledUpload, filename: str) -> dict:
+    """
+    Parse a spooled PDF into appointment data, using the parse cache.
+
+    Parameters:
+        upload: Uploaded PDF spooled to disk
+        filename: Original filename of the upload, used for logging
+
+    Returns:
+        Parsed appointment data including file_size
+
+    Raises:
+        HTTPException: if the document cannot be parsed
+    """
+    if upload.size == 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+
+    # Serve repeat uploads of the same document from the cache
+    pdf_hash = upload.sha256
+    # The cache reads and writes files, keep them off the event loop
+    cached_result = await asyncio.to_thread(parse_cache.get_result, pdf_hash, PROMPT_FINGERPRINT)
+    if cached_result is not None:
+        logger.info("Parse cache hit for file: %s", redact(filename))
+        parse_events.emit("stage", stage="cached")
+        parse_events.emit("summary", delta=cached_result["summary"])
+        return cached_result
+
+    # Extract text from PDF with rotation attempts
+    logger.info("Starting PDF processing for file: %s", redact(filename))
+    text_content = await asyncio.to_thread(parse_cache.get_text, pdf_hash, EXTRACTION_FINGERPRINT)
+    if text_content is None:
+        # CPU-bound: runs in the extraction worker pool, not on the event loop.
+        # Only the path is handed over, workers read the spooled file themselves.
+        # Spans recorded inside a worker process come back with the text
+        parse_events.emit("stage", stage="extract")
+        with span("extract"):
+            (text_content, text_fingerprint), spans, peak_rss = await extract_stage.run(
+                collect_spans, extract_text_from_file, str(upload.path)
+            )
+        record_spans(spans)
+        record_peak_rss(peak_rss)
+        if text_fingerprint != EXTRACTION_FINGERPRINT:
+            # E.g. tesserocr failed to start in the worker and it fell back to pytesseract
+            logger.warning(
+                "Text was extracted with another OCR engine than configured, "
+                "it is cached separately and not reused"
+            )
+        if text_content.strip():
+            # Keyed by what actually extracted it
+            await asyncio.to_thread(parse_cache.set_text, pdf_hash, text_fingerprint, text_content)
+    else:
+        logger.debug("Using cached extracted text")
+
+    if not text_content.strip():
+        logger.error("Failed to extract any text from PDF: %s", redact(filename))
+        raise HTTPException(
+            status_code=400,
+            detail="Could not extract text from PDF even after trying different rotations",
+        )
+
+    logger.debug("Successfully extracted text from PDF, length: %d", len(text_content))
+
+    # Use ChatGPT to parse the appointment data
+    # Drop repeated headers/footers and whitespace, then fit the text into the token budget
+    with span("prompt_build"):
+        # Tokenizing a long document is CPU work, keep it off the event loop
+        condensed = await asyncio.to_thread(
+            condense_text, text_content, LLM_DOCUMENT_TOKEN_BUDGET, LLM_MODEL
+        )
+    logger.debug(
+        "Condensed document text from %d to %d tokens (saved %d, truncated: %s)",
+        condensed.original_tokens,
+        condensed.tokens,
+        condensed.tokens_saved,
+        condensed.truncated,
+    )
 
-            parsed_data = json.loads(result_text.strip())
-            logging.info("Successfully parsed JSON response")
+    # Reports from known templates: fields come from rules, the LLM only writes the summary
+    with span("template_match"):
+        template_match = match_template(text_content) if RULES_FAST_PATH_ENABLED else None
+    if template_match is not None:
+        logger.info("Document matched template '%s', skipping extraction", template_match.template)
+        parsed_data = template_match.fields()
+        if FAST_PATH_LLM_SUMMARY:
+            prompt = SUMMARY_PROMPT_TEMPLATE.format(document_text=condensed.text)
+            summary = await request_structured_output(prompt, AppointmentSummary)
+            parsed_data["summary"] = summary.summary
+        else:
+            parsed_data["summary"] = template_match.summary()
+    else:
+        prompt = PROMPT_TEMPLATE.format(document_text=condensed.text)
+        extraction = await request_structured_output(prompt, AppointmentExtraction)
+        parsed_data = extraction.model_dump()
 
+    parse_events.emit("stage", stage="validation")
+    with span("validation"):
+        try:
             # Add file size to the response
-            parsed_data["file_size"] = len(pdf_content)
-            logging.info(f"Added file size: {len(pdf_content)} bytes")
+            parsed_data["file_size"] = upload.size
 
             # Get confidence score
             confidence_score = parsed_data.get("confidence_score", 0)
-            logging.info(f"Extracted confidence score: {confidence_score}")
+            logger.debug("Extracted confidence score: %s", confidence_score)
 
             # Check if confidence score is below 51 - return error
             if confidence_score < 51:
-                logging.warning(
-                    f"Low confidence score: {confidence_score}, rejecting appointment data"
+                logger.warning(
+                    "Low confidence score: %s, rejecting appointment data", confidence_score
                 )
                 raise HTTPException(
                     status_code=400,
@@ -283,15 +666,15 @@ async def parse_pdf(file: UploadFile = File(...)):
             ]
 
             if missing_fields:
-                logging.warning(
-                    f"Missing required fields: {missing_fields}, confidence: {confidence_score}"
+                logger.warning(
+                    "Missing required fields: %s, confidence: %s", missing_fields, confidence_score
                 )
                 raise HTTPException(
                     status_code=400,
                     detail=f"Missing required fields: {', '.join(missing_fields)}. Confidence score: {confidence_score}",
                 )
 
-            logging.info("All required fields present and confidence score acceptable")
+            logger.debug("All required fields present and confidence score acceptable")
 
             # Handle appointment_type logic
             valid_types = [
@@ -310,7 +693,7 @@ async def parse_pdf(file: UploadFile = File(...)):
             ]
 
             appointment_type = parsed_data.get("appointment_type", "").strip()
-            logging.info(f"Original appointment type: '{appointment_type}'")
+            logger.debug("Original appointment type: %s", redact(appointment_type))
 
             # If appointment_type is missing or invalid, and confidence is high enough, set to "Other"
             if (
@@ -318,10 +701,11 @@ async def parse_pdf(file: UploadFile = File(...)):
             ):  # Exclude "Other" from invalid check
                 if confidence_score > 51:
                     parsed_data["appointment_type"] = "Other"
-                    logging.info("Set appointment type to 'Other' due to high confidence score")
+                    logger.debug("Set appointment type to 'Other' due to high confidence score")
                 else:
-                    logging.warning(
-                        f"Cannot determine appointment type and confidence ({confidence_score}) too low to use 'Other'"
+                    logger.warning(
+                        "Cannot determine appointment type and confidence (%s) too low to use 'Other'",
+                        confidence_score,
                     )
                     raise HTTPException(
                         status_code=409,
@@ -329,53 +713,476 @@ async def parse_pdf(file: UploadFile = File(...)):
                     )
             elif appointment_type not in valid_types:
                 # This shouldn't happen with the above logic, but just in case
-                logging.warning(f"Invalid appointment type after validation: {appointment_type}")
+                logger.warning(
+                    "Invalid appointment type after validation: %s", redact(appointment_type)
+                )
                 raise HTTPException(
                     status_code=409, detail=f"Invalid appointment type: {appointment_type}"
                 )
 
-            logging.info(f"Final appointment type: {parsed_data['appointment_type']}")
+            logger.debug("Final appointment type: %s", parsed_data["appointment_type"])
 
             # Validate date format with proper parsing
             date_str = parsed_data.get("date", "").strip()
-            logging.info(f"Original date: '{date_str}'")
+
             if not date_str:
                 parsed_data["date"] = datetime.now().strftime("%Y-%m-%d")
-                logging.warning(f"Empty date, using current date: {parsed_data['date']}")
+                logger.warning("Empty date, using current date")
             else:
                 try:
                     # Try to parse the date to validate it's a real date
                     datetime.strptime(date_str, "%Y-%m-%d")
-                    logging.info(f"Valid date format: {date_str}")
                 except ValueError:
                     # If parsing fails, use current date
                     parsed_data["date"] = datetime.now().strftime("%Y-%m-%d")
-                    logging.warning(
-                        f"Invalid date '{date_str}', using current date: {parsed_data['date']}"
-                    )
+                    logger.warning("Invalid date %s, using current date", redact(date_str))
 
             appointment_data = AppointmentData(**parsed_data)
-            logging.info("Successfully created AppointmentData object")
+            logger.debug("Successfully created AppointmentData object")
 
-        except (json.JSONDecodeError, ValueError) as e:
-            # Fallback if JSON parsing fails - this represents low confidence
-            logging.error(f"Failed to parse JSON response: {e!s}")
-            logging.error(f"Raw response that failed parsing: {result_text[:1000]}")
+            await asyncio.to_thread(
+                parse_cache.set_result, pdf_hash, PROMPT_FINGERPRINT, appointment_data.model_dump()
+            )
+
+        except ValueError as e:
+            if isinstance(e, ValidationError):
+                # The message repeats the rejected values, which come from the document
+                logger.error(
+                    "Failed to build appointment data: %d invalid fields (%s)",
+                    e.error_count(),
+                    ", ".join(".".join(str(part) for part in error["loc"]) for error in e.errors()),
+                )
+            else:
+                logger.error("Failed to build appointment data: %s", redact(e))
             raise HTTPException(
                 status_code=400,
                 detail="Failed to parse JSON response from AI service. Unable to extract appointment information.",
             )
 
-        # Return parsed appointment data
-        logging.info("Appointment processing completed successfully")
-        response_data = appointment_data.model_dump()
-        response_data["original_filename"] = file.filename
+    # Return parsed appointment data
+    logger.info("Appointment processing completed successfully")
+    return appointment_data.model_dump()
+
+
+def stream_parse(upload: SpooledUpload, filename: str) -> StreamingResponse:
+    """
+    Parse and store a spooled upload, streaming its progress as newline-delimited JSON.
+
+    The response owns the upload and removes it when the stream ends. A client that goes
+    away stops waiting for the parse; the parse (and a streamed LLM response) is cancelled
+    once no caller waits for it anymore, see SingleFlight.wait.
+    """
+
+    async def run(channel: parse_events.EventChannel) -> None:
+        with parse_events.bind(channel):
+            try:
+                result = await parse_and_store(upload, filename)
+                channel.emit("result", {"status_code": 200, "result": result})
+            except HTTPException as e:
+                channel.emit("error", {"status_code": e.status_code, "detail": e.detail})
+            except Exception as e:
+                logger.exception("Unexpected error during PDF processing: %s", e)
+                channel.emit(
+                    "error", {"status_code": 500, "detail": f"Error processing PDF: {e!s}"}
+                )
+            finally:
+                channel.close()
+
+    async def stream_events():
+        channel = parse_events.EventChannel()
+        # The parse runs in its own task so events are sent while it is waiting on a stage
+        task = asyncio.create_task(run(channel))
+        try:
+            async for event in channel:
+                yield json.dumps(event) + "\n"
+        finally:
+            task.cancel()
+            upload.cleanup()
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="application/x-ndjson",
+        # Keep proxies from buffering the events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/parse-pdf")
+async def parse_pdf(
+    file: UploadFile = File(...),
+    run_async: bool = Query(False, alias="async"),
+    stream: bool = Query(False),
+):
+    """
+    Parse PDF file to extract appointment information using ChatGPT API.
+
+    Parameters:
+        file: PDF file to parse
+        async: Queue the document and return a job id immediately (HTTP 202) instead of
+            waiting for the result; poll GET /jobs/{job_id} for the status and result
+        stream: Stream the progress as newline-delimited JSON while the document is parsed:
+            {"event": "stage", "stage": "extract"}  (then llm, validation and store, or
+                cached and store for a document parsed before)
+            {"event": "summary", "delta": "The patient..."}  (summary text as it is generated)
+            {"event": "result", "status_code": 200, "result": {...}}  (the fields below)
+            {"event": "error", "status_code": 400, "detail": "..."}
+            The summary text starts over with every llm stage event (a repaired response).
+
+    Returns:
+        id: Id of the stored parsed appointment
+        name: Title/name of the appointment or medical report
+        date: Date of the appointment in YYYY-MM-DD format
+        appointment_type: One of the predefined appointment types
+        summary: Summary of appointment or medical recommendations
+        file_size: Size of the uploaded file in bytes
+        doctor: Name of doctor or facility name if doctor not available
+        confidence_score: AI confidence score (0-100)
+    """
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    if run_async and stream:
+        raise HTTPException(status_code=400, detail="async and stream cannot be combined")
+
+    upload = None
+    try:
+        # Stream the upload to a temporary file, rejecting it once it crosses the size limit
+        try:
+            with span("read"):
+                upload = await spool_upload(file, MAX_FILE_SIZE)
+        except UploadTooLargeError:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024 * 1024):.0f}MB",
+            )
+
+        if run_async:
+            if upload.size == 0:
+                raise HTTPException(status_code=400, detail="File is empty")
+            job_id = await job_queue.submit(upload, file.filename)
+            # The queue owns the spooled file now
+            upload = None
+            return JSONResponse(
+                status_code=202,
+                content={"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"},
+            )
+
+        if stream:
+            response = stream_parse(upload, file.filename)
+            # The response owns the spooled file now
+            upload = None
+            return response
+
+        response_data = await parse_and_store(upload, file.filename)
         return JSONResponse(content=response_data)
 
     except HTTPException:
         # Re-raise HTTPExceptions as they already have the correct status code
-        logging.warning("HTTPException raised during appointment processing")
+        logger.warning("HTTPException raised during appointment processing")
         raise
     except Exception as e:
-        logging.error(f"Unexpected error during PDF processing: {e!s}")
+        logger.exception("Unexpected error during PDF processing: %s", e)
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {e!s}")
+    finally:
+        if upload is not None:
+            upload.cleanup()
+
+
+@router.post("/parse-pdf/batch")
+async def parse_pdf_batch(files: list[UploadFile] = File(...)):
+    """
+    Parse multiple PDF files in one request.
+
+    Files go through the same pipeline as /parse-pdf, BATCH_CONCURRENCY at a time.
+    Results are streamed back as newline-delimited JSON in completion order, one
+    line per file. Parsed results are stored in parsed_appointments; files that
+    finish at the same time share one bulk insert, and result carries the row id:
+        {"index": 0, "filename": "a.pdf", "status_code": 200, "result": {...}}
+        {"index": 1, "filename": "b.pdf", "status_code": 400, "detail": "..."}
+
+    Parameters:
+        files: PDF files to parse
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=413, detail=f"Too many files. Maximum is {MAX_BATCH_FILES} per batch"
+        )
+
+    # Spool every upload before streaming; the request's files are closed once the response starts
+    uploads: list[SpooledUpload | None] = []
+    errors: dict[int, HTTPException] = {}
+    for index, file in enumerate(files):
+        uploads.append(None)
+        if not file.filename.lower().endswith(".pdf"):
+            errors[index] = HTTPException(status_code=400, detail="File must be a PDF")
+            continue
+        try:
+            with span("read"):
+                uploads[index] = await spool_upload(file, MAX_FILE_SIZE)
+        except UploadTooLargeError:
+            errors[index] = HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024 * 1024):.0f}MB",
+            )
+
+    filenames = [file.filename for file in files]
+    logger.info("Starting batch processing of %d files", len(files))
+
+    async def process(index: int, semaphore: asyncio.Semaphore) -> dict:
+        line = {"index": index, "filename": filenames[index]}
+        if index in errors:
+            return {
+                **line,
+                "status_code": errors[index].status_code,
+                "detail": errors[index].detail,
+            }
+
+        async with semaphore:
+            try:
+                result = await process_upload(uploads[index], filenames[index])
+                await asyncio.to_thread(blob_store.put, uploads[index].path, uploads[index].sha256)
+                return {**line, "status_code": 200, "result": result}
+            except HTTPException as e:
+                return {**line, "status_code": e.status_code, "detail": e.detail}
+            except Exception as e:
+                logger.exception(
+                    "Unexpected error during batch processing of %s: %s",
+                    redact(filenames[index]),
+                    e,
+                )
+                return {**line, "status_code": 500, "detail": f"Error processing PDF: {e!s}"}
+            finally:
+                uploads[index].cleanup()
+
+    async def store(lines: list[dict]) -> None:
+        parsed = [line for line in lines if line["status_code"] == 200]
+        if not parsed:
+            return
+        try:
+            with span("store"):
+                ids = await db_stage.run(
+                    save_appointments,
+                    [line["result"] for line in parsed],
+                    [uploads[line["index"]].sha256 for line in parsed],
+                )
+        except Exception as e:
+            logger.error("Failed to store %d parsed appointments: %s", len(parsed), e)
+            for line in parsed:
+                del line["result"]
+                line.update(status_code=500, detail="Failed to store parsed appointment")
+            return
+        for line, appointment_id in zip(parsed, ids, strict=True):
+            line["result"]["id"] = appointment_id
+
+    async def stream_results():
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        tasks = [asyncio.create_task(process(index, semaphore)) for index in range(len(files))]
+        try:
+            pending = set(tasks)
+            while pending:
+                # Files finishing together are stored with one bulk insert
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                lines = [task.result() for task in done]
+                await store(lines)
+                for line in lines:
+                    yield json.dumps(line) + "\n"
+        finally:
+            # Client went away or all files are done: stop pending work and drop spooled files
+            for task in tasks:
+                task.cancel()
+            for upload in uploads:
+                if upload is not None:
+                    upload.cleanup()
+            logger.info("Batch processing finished")
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+LIST_FIELDS = tuple(ParsedAppointmentResponse.model_fields)
+
+
+def encode_cursor(appointment) -> str:
+    """Opaque cursor pointing after appointment in the (date DESC, id) order."""
+    payload = json.dumps([appointment.date.isoformat(), str(appointment.id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, uuid.UUID]:
+    """
+    Return the (date, id) a cursor points after.
+
+    Raises:
+        HTTPException: if the cursor is malformed
+    """
+    try:
+        cursor_date, cursor_id = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+        return date.fromisoformat(cursor_date), uuid.UUID(cursor_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def list_appointments(limit: int, fields: list[str], **query) -> tuple[list[dict], str | None]:
+    """Return one page of appointments with the requested fields and the next page's cursor."""
+    session = SessionLocal()
+    try:
+        # One extra row tells whether there is a next page
+        appointments = list_appointments_page(session, limit + 1, columns=fields, **query)
+        next_cursor = encode_cursor(appointments[limit - 1]) if len(appointments) > limit else None
+        page = [
+            {field: getattr(appointment, field) for field in fields}
+            for appointment in appointments[:limit]
+        ]
+        return jsonable_encoder(page), next_cursor
+    finally:
+        session.close()
+
+
+# The handler builds the response itself (see fields), these document it
+@router.get(
+    "/parsed-appointments",
+    responses={
+        200: {
+            "model": list[ParsedAppointmentFields],
+            "description": "One page of appointments with every field, or only the fields "
+            "selected with the fields parameter",
+        },
+        304: {"description": "The page still matches If-None-Match"},
+    },
+)
+async def get_parsed_appointments(
+    request: Request,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    family_member_id: uuid.UUID | None = None,
+    appointment_type: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    fields: str | None = None,
+):
+    """
+    Return one page of stored parsed appointments, newest date first.
+
+    The next page is requested with the cursor from the X-Next-Cursor header (also in a
+    Link rel="next" header); it is absent on the last page. Pages carry an ETag, a request
+    with a matching If-None-Match gets 304 Not Modified without a body.
+
+    Parameters:
+        limit: Page size
+        cursor: X-Next-Cursor of the previous page
+        family_member_id: Only appointments of this family member
+        appointment_type: Only appointments of this type
+        date_from: Only appointments on or after this date
+        date_to: Only appointments on or before this date
+        fields: Comma-separated fields to return (e.g. "id,name,date" to omit the summary
+            in list views), all fields by default
+
+    Raises:
+        HTTPException: if a parameter is invalid or the database cannot be queried
+    """
+    if fields is None:
+        selected = list(LIST_FIELDS)
+    else:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = sorted(set(selected) - set(LIST_FIELDS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        if not selected:
+            raise HTTPException(status_code=400, detail="fields must name at least one field")
+
+    try:
+        page, next_cursor = await db_stage.run(
+            list_appointments,
+            limit,
+            selected,
+            after=decode_cursor(cursor) if cursor else None,
+            family_member_id=family_member_id,
+            appointment_type=appointment_type,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to fetch parsed appointments: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch parsed appointments: {e!s}")
+
+    body = json.dumps(page).encode()
+    headers = {
+        "ETag": f'W/"{hashlib.sha256(body).hexdigest()[:32]}"',
+        # Cacheable, but revalidated with If-None-Match on every use
+        "Cache-Control": "private, no-cache",
+    }
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def appointment_file(appointment_id: uuid.UUID):
+    session = SessionLocal()
+    try:
+        return (
+            session.query(ParsedAppointment.file_sha256, ParsedAppointment.original_filename)
+            .filter(ParsedAppointment.id == appointment_id)
+            .one_or_none()
+        )
+    finally:
+        session.close()
+
+
+@router.get("/parsed-appointments/{appointment_id}/file")
+async def download_appointment_file(appointment_id: uuid.UUID, request: Request):
+    """
+    Download the PDF a parsed appointment was extracted from.
+
+    Supports single byte ranges (Range/If-Range) and revalidation with If-None-Match.
+
+    Raises:
+        HTTPException: if the appointment or its file does not exist
+    """
+    row = await db_stage.run(appointment_file, appointment_id)
+    if row is None or row.file_sha256 is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        return blob_response(blob_store, row.file_sha256, row.original_filename, request.headers)
+    except BlobNotFoundError:
+        logger.error("Blob %s of appointment %s is missing", row.file_sha256, appointment_id)
+        raise HTTPException(status_code=404, detail="File not found")
+
+
+@router.get("/jobs/metrics")
+async def get_job_metrics():
+    """
+    Return job queue metrics.
+
+    Returns:
+        depth: Number of jobs waiting to be processed
+        queued/processing/completed/failed/dead_letter: Number of jobs in each state
+        oldest_queued_age_s: Age of the oldest waiting job in seconds
+        workers: Number of running workers
+    """
+    return await job_queue.metrics()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Return the status of an asynchronous parsing job.
+
+    Parameters:
+        job_id: Id returned by POST /parse-pdf?async=true
+
+    Returns:
+        status: queued, processing, completed, failed or dead_letter
+        result: Parsed appointment data once completed
+        error: status_code and detail once failed or dead-lettered
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Expose Prometheus metrics, including per-stage parse timings.
+
+    Returns:
+        Metrics in the Prometheus text exposition format
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
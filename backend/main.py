@@ -1,20 +1,53 @@
-import logging
-import sys
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from controllers.appointments import (
+    LLM_MODEL,
+    UPLOAD_BODY_LIMITS,
+    load_parse_cache,
+    parse_and_store,
+)
+from controllers.appointments import client as llm_client
 from controllers.appointments import router as appointments_router
+from controllers.metrics import router as metrics_router
+from services.database import init_db
+from services.jobs import job_queue
+from services.logging_config import RequestIdMiddleware, configure_logging
+from services.text_condenser import TOKENIZER_LOAD_TIMEOUT, load_encoding
+from services.upload import UploadSizeLimitMiddleware
+from services.workers import shutdown_stages
+
+# Structured logs written to stdout by a background thread
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    init_db()
+    # Scanning a large cache directory would block the event loop
+    await asyncio.to_thread(load_parse_cache)
+    # Load the tokenizer before the first upload needs it; a slow download does not hold up
+    # startup, the load carries on in its thread
+    with contextlib.suppress(TimeoutError):
+        await asyncio.wait_for(asyncio.to_thread(load_encoding, LLM_MODEL), TOKENIZER_LOAD_TIMEOUT)
+    # Workers for POST /parse-pdf?async=true
+    await job_queue.start(parse_and_store)
+    yield
+    await job_queue.stop()
+    # Stop extraction worker processes and LLM threads
+    shutdown_stages()
+    # Close the pooled API connections
+    llm_client.close()
 
-# Configure logging to output to stdout
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=sys.stdout,
-)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
+# Reject oversized uploads before their body is received; inside CORS so browsers can read the 413
+app.add_middleware(UploadSizeLimitMiddleware, limits=UPLOAD_BODY_LIMITS)
 
 # Configure CORS
 app.add_middleware(
@@ -23,7 +56,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Request-ID", "X-Next-Cursor", "Link", "ETag"],
 )
+# Correlation id for the logs of each request
+app.add_middleware(RequestIdMiddleware)
 
 # Include routers
 app.include_router(appointments_router)
+app.include_router(metrics_router)
@@ -39,12 +39,12 @@ CREATE TABLE family_members (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
--- Files table (stores complete file data in database)
+-- Files table (file contents live in the content-addressed blob store)
 CREATE TABLE files (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     title VARCHAR(500) NOT NULL,
-    file_data BYTEA NOT NULL, -- Binary data for the complete file
+    file_sha256 CHAR(64) NOT NULL, -- SHA-256 of the file in the blob store
     file_size BIGINT NOT NULL, -- File size in bytes
     mime_type VARCHAR(255),
     date DATE NOT NULL,
@@ -112,7 +112,7 @@ CREATE TABLE parsed_appointments (
     summary TEXT, -- Medical findings, diagnosis, or recommendations
     doctor VARCHAR(255), -- Doctor name or facility name
     file_size BIGINT NOT NULL, -- File size in bytes
-    raw_file_data BYTEA, -- Optional: store the original PDF if needed
+    file_sha256 CHAR(64), -- SHA-256 of the uploaded PDF in the blob store
     processing_status VARCHAR(20) NOT NULL DEFAULT 'completed' CHECK (processing_status IN (
         'completed',
         'failed',
@@ -130,6 +130,7 @@ CREATE INDEX idx_family_members_family ON family_members(family_id);
 
 CREATE INDEX idx_files_user ON files(user_id);
 CREATE INDEX idx_files_date ON files(date DESC);
+CREATE INDEX idx_files_sha256 ON files(file_sha256);
 
 CREATE INDEX idx_appointments_family_member ON appointments(family_member_id);
 CREATE INDEX idx_appointments_date_time ON appointments(date_time);
@@ -137,9 +138,10 @@ CREATE INDEX idx_appointments_status ON appointments(status);
 
 CREATE INDEX idx_parsed_appointments_user ON parsed_appointments(user_id);
 CREATE INDEX idx_parsed_appointments_family_member ON parsed_appointments(family_member_id);
-CREATE INDEX idx_parsed_appointments_date ON parsed_appointments(date);
+CREATE INDEX idx_parsed_appointments_date ON parsed_appointments(date DESC, id); -- listing order and keyset pagination
 CREATE INDEX idx_parsed_appointments_type ON parsed_appointments(appointment_type);
 CREATE INDEX idx_parsed_appointments_status ON parsed_appointments(processing_status);
+CREATE INDEX idx_parsed_appointments_sha256 ON parsed_appointments(file_sha256);
 
 -- Trigger function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -170,13 +172,13 @@ CREATE TRIGGER update_parsed_appointments_updated_at BEFORE UPDATE ON parsed_app
 COMMENT ON TABLE families IS 'Stores family information';
 COMMENT ON TABLE users IS 'User authentication and account information - belongs to a family';
 COMMENT ON TABLE family_members IS 'Stores family member information including humans and pets';
-COMMENT ON TABLE files IS 'Stores complete file data in database (medical documents, images, etc.)';
+COMMENT ON TABLE files IS 'Stores file metadata (medical documents, images, etc.); contents are in the blob store';
 COMMENT ON TABLE appointments IS 'Stores medical appointments for family members';
 COMMENT ON TABLE parsed_appointments IS 'Stores parsed appointment data extracted from uploaded PDF medical documents';
 
 COMMENT ON COLUMN users.family_id IS 'Reference to the family this user belongs to';
 COMMENT ON COLUMN family_members.allergies IS 'Array of allergy strings';
-COMMENT ON COLUMN files.file_data IS 'Complete file stored as binary data';
+COMMENT ON COLUMN files.file_sha256 IS 'Content address of the file in the blob store, shared by identical files';
 COMMENT ON COLUMN files.file_size IS 'File size in bytes';
 COMMENT ON COLUMN appointments.duration IS 'Appointment duration in minutes';
 COMMENT ON COLUMN appointments.reminder IS 'Whether to send appointment reminder';
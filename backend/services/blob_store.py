@@ -0,0 +1,253 @@
+"""
+Content-addressed storage of uploaded documents.
+
+Each PDF is stored once under its SHA-256, so identical uploads (the same
+report uploaded for two family members, or twice) share one copy, and
+database rows only keep the hash. The local store shards files as
+<BLOB_STORE_DIR>/ab/cd/abcd...; BLOB_STORE_BACKEND selects the implementation
+and is the place to plug in an S3-compatible store.
+
+Downloads are served with blob_response: single byte ranges, ETag
+revalidation, and zero-copy transfer either through the ASGI zerocopysend
+extension when the server offers it, or by handing the file to a fronting
+nginx with X-Accel-Redirect (BLOB_ACCEL_REDIRECT_PREFIX).
+"""
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "local")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", ".cache/blobs")
+# Internal nginx location mapped to BLOB_STORE_DIR, e.g. /protected-blobs/
+BLOB_ACCEL_REDIRECT_PREFIX = os.getenv("BLOB_ACCEL_REDIRECT_PREFIX")
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+_SINGLE_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class BlobNotFoundError(Exception):
+    """Raised when no blob is stored under a hash."""
+
+
+class RangeNotSatisfiableError(Exception):
+    """Raised for a Range header that lies outside the file."""
+
+
+class BlobStore(ABC):
+    """Stores documents under their SHA-256 hex digest."""
+
+    @abstractmethod
+    def put(self, source: Path, sha256: str) -> bool:
+        """Store the file at source under sha256; returns False if it was already stored."""
+
+    @abstractmethod
+    def exists(self, sha256: str) -> bool:
+        """Return whether a blob is stored under sha256."""
+
+    @abstractmethod
+    def path(self, sha256: str) -> Path:
+        """Return the local path of a blob (raises BlobNotFoundError)."""
+
+    @abstractmethod
+    def delete(self, sha256: str) -> None:
+        """Remove a blob; callers must make sure no row references it anymore."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Return counters of stored and deduplicated uploads."""
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blob store on the local filesystem.
+
+    Parameters:
+        root: Directory holding the blobs
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        # Updated from the threads storing uploads
+        self._lock = threading.Lock()
+        self.counters = {"stored": 0, "deduplicated": 0}
+
+    def _record(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def key(self, sha256: str) -> str:
+        """Path of a blob relative to the root, e.g. ab/cd/abcd..."""
+        if not _SHA256.fullmatch(sha256):
+            raise ValueError(f"Not a SHA-256 hex digest: {sha256!r}")
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    def put(self, source: Path, sha256: str) -> bool:
+        target = self.root / self.key(sha256)
+        if target.exists():
+            self._record("deduplicated")
+            logger.debug("Blob %s is already stored", sha256)
+            return False
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            # copyfile uses sendfile on Linux, the data does not pass through Python
+            shutil.copyfile(source, temp_name)
+            # Atomic: concurrent puts of the same hash both succeed with identical content
+            Path(temp_name).replace(target)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+        self._record("stored")
+        return True
+
+    def exists(self, sha256: str) -> bool:
+        return (self.root / self.key(sha256)).exists()
+
+    def path(self, sha256: str) -> Path:
+        path = self.root / self.key(sha256)
+        if not path.exists():
+            raise BlobNotFoundError(sha256)
+        return path
+
+    def delete(self, sha256: str) -> None:
+        (self.root / self.key(sha256)).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+
+def create_blob_store() -> BlobStore:
+    """Create the blob store selected by BLOB_STORE_BACKEND."""
+    if BLOB_STORE_BACKEND == "local":
+        return LocalBlobStore(BLOB_STORE_DIR)
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND: {BLOB_STORE_BACKEND}")
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Return the inclusive (start, end) of a single-range Range header.
+
+    Returns None when the whole file should be sent: no header, or one this
+    does not handle (other units, multiple ranges).
+
+    Raises:
+        RangeNotSatisfiableError: if the range lies outside the file
+    """
+    match = _SINGLE_RANGE.fullmatch((header or "").strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiableError
+    return start, end
+
+
+class BlobFileResponse(Response):
+    """Sends count bytes of a file starting at offset, without loading the file into memory."""
+
+    def __init__(self, path: Path, offset: int, count: int, status_code: int, headers: dict):
+        super().__init__(
+            status_code=status_code,
+            headers={**headers, "Content-Length": str(count)},
+            media_type="application/pdf",
+        )
+        self.path = path
+        self.offset = offset
+        self.count = count
+
+    async def __call__(self, scope, _receive, send):
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with self.path.open("rb") as file:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file.fileno(),
+                        "offset": self.offset,
+                        "count": self.count,
+                        "more_body": False,
+                    }
+                )
+            return
+
+        async with await anyio.open_file(self.path, "rb") as file:
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def blob_response(store: BlobStore, sha256: str, filename: str, request_headers: Headers):
+    """
+    Build the download response for a stored blob.
+
+    Blobs never change, so the hash is a strong ETag and responses may be cached.
+
+    Raises:
+        BlobNotFoundError: if the blob is missing
+    """
+    etag = f'"{sha256}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": f"inline; filename*=UTF-8''{quote(filename)}",
+    }
+    if_none_match = request_headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    path = store.path(sha256)
+    if BLOB_ACCEL_REDIRECT_PREFIX and isinstance(store, LocalBlobStore):
+        # nginx sends the file (with sendfile and range support) instead of the app
+        headers["X-Accel-Redirect"] = BLOB_ACCEL_REDIRECT_PREFIX + store.key(sha256)
+        return Response(headers=headers, media_type="application/pdf")
+
+    size = path.stat().st_size
+    range_header = request_headers.get("range")
+    # A Range for another version of the content must be ignored (RFC 9110 If-Range)
+    if request_headers.get("if-range", etag) != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiableError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return BlobFileResponse(path, 0, size, 200, headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return BlobFileResponse(path, start, end - start + 1, 206, headers)
+
+
+blob_store = create_blob_store()
@@ -0,0 +1,122 @@
+"""
+Page image preprocessing between rasterization and OCR.
+
+Tesseract's time grows with the number of pixels it scans, and it reads best
+when text lines are about TARGET_LINE_HEIGHT pixels tall. Before a page is
+OCRed it is
+
+1. checked for ink: blank pages (back sides of duplex scans) are skipped
+2. cropped to the bounding box of its ink, plus a margin
+3. rescaled so its median text line is TARGET_LINE_HEIGHT pixels tall, which
+   amounts to choosing the OCR resolution per page from its text size
+4. binarized with an Otsu threshold
+
+The ink analysis works on the grayscale pixels as a NumPy array. Pages with
+a dark background are passed through unchanged, the ink heuristics assume
+dark text on light paper.
+"""
+
+import logging
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# A pixel is ink when it is this much darker than the paper (median brightness);
+# show-through from the back side of thin paper stays below it
+INK_CONTRAST = 80
+# Pages with a smaller share of ink pixels are blank (a short line of text is ~0.2%)
+BLANK_INK_RATIO = 0.0005
+# White border kept around the ink when cropping, in pixels
+CROP_MARGIN = 24
+# Rows with a smaller share of ink pixels are gaps between text lines; it also
+# keeps the vertical rules of tables from joining all lines into one
+LINE_INK_RATIO = 0.02
+# Runs of inked rows shorter than this are rules or noise, not text lines
+MIN_LINE_HEIGHT = 4
+# Line height (ascender to descender) Tesseract reads best, about 10pt text at 300 DPI
+TARGET_LINE_HEIGHT = 40
+# Bounds of the rescaling factor, and the smallest change worth resampling for
+MIN_SCALE = 0.5
+MAX_SCALE = 2.0
+MIN_SCALE_CHANGE = 0.15
+
+
+def _pixels(image: Image.Image) -> np.ndarray:
+    return np.asarray(image if image.mode == "L" else image.convert("L"))
+
+
+def _ink_mask(pixels: np.ndarray) -> np.ndarray | None:
+    """Ink pixels of a light page, None if the page has a dark background."""
+    paper = int(np.median(pixels[::4, ::4]))
+    if paper < 128:
+        return None
+    return pixels < paper - INK_CONTRAST
+
+
+def is_blank(image: Image.Image) -> bool:
+    """Return whether a page carries (next to) no ink."""
+    ink = _ink_mask(_pixels(image))
+    return ink is not None and ink.mean() < BLANK_INK_RATIO
+
+
+def line_height(ink: np.ndarray) -> float | None:
+    """Median height in pixels of the text lines of an ink mask, None if there are none."""
+    inked_rows = ink.mean(axis=1) >= LINE_INK_RATIO
+    # Starts and ends of runs of inked rows
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], inked_rows.astype(np.int8), [0]))))
+    heights = edges[1::2] - edges[::2]
+    heights = heights[heights >= MIN_LINE_HEIGHT]
+    if heights.size == 0:
+        return None
+    return float(np.median(heights))
+
+
+def otsu_threshold(histogram) -> int:
+    """Threshold that best separates the two brightness classes of a 256-bin histogram (Otsu)."""
+    counts = np.asarray(histogram, dtype=np.float64)
+    weights = np.cumsum(counts)
+    means = np.cumsum(counts * np.arange(256))
+    total_weight, total_mean = weights[-1], means[-1]
+    background = total_weight - weights
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (total_mean * weights - means * total_weight) ** 2 / (weights * background)
+    # Thresholds with an empty class divide 0 by 0
+    return int(np.argmax(np.nan_to_num(between)))
+
+
+def prepare(image: Image.Image) -> Image.Image:
+    """
+    Crop, rescale and binarize an upright page for OCR.
+
+    Returns:
+        The prepared page in mode L (black text on white), or the grayscale page
+        unchanged when it has a dark background or no ink
+    """
+    pixels = _pixels(image)
+    ink = _ink_mask(pixels)
+    if ink is None or not ink.any():
+        return Image.fromarray(pixels)
+
+    rows = np.flatnonzero(ink.any(axis=1))
+    columns = np.flatnonzero(ink.any(axis=0))
+    top = max(0, rows[0] - CROP_MARGIN)
+    bottom = min(pixels.shape[0], rows[-1] + 1 + CROP_MARGIN)
+    left = max(0, columns[0] - CROP_MARGIN)
+    right = min(pixels.shape[1], columns[-1] + 1 + CROP_MARGIN)
+    pixels = pixels[top:bottom, left:right]
+
+    page = Image.fromarray(pixels)
+    height = line_height(ink[top:bottom, left:right])
+    if height is not None:
+        scale = min(MAX_SCALE, max(MIN_SCALE, TARGET_LINE_HEIGHT / height))
+        if abs(scale - 1) >= MIN_SCALE_CHANGE:
+            size = (max(1, round(page.width * scale)), max(1, round(page.height * scale)))
+            resample = Image.Resampling.LANCZOS if scale < 1 else Image.Resampling.BICUBIC
+            page = page.resize(size, resample)
+            logger.debug("Rescaled page by %.2f for a line height of %.0f px", scale, height)
+
+    # PIL's histogram and lookup table are several times faster than NumPy on full pages
+    threshold = otsu_threshold(page.histogram())
+    return page.point([0] * (threshold + 1) + [255] * (255 - threshold))
@@ -0,0 +1,301 @@
+"""
+SQLite-backed job queue for asynchronous document parsing.
+
+Jobs survive restarts: the uploaded PDF is moved into the queue's spool
+directory and the job row keeps its state. A pool of in-process asyncio
+workers claims queued jobs, retries transient failures with exponential
+backoff and moves jobs that keep failing to the dead letter state.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from services.logging_config import redact, start_request
+from services.upload import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+# The document itself cannot be parsed (4xx), retrying will not help
+FAILED = "failed"
+# Transient errors that did not go away after JOB_MAX_ATTEMPTS attempts
+DEAD_LETTER = "dead_letter"
+
+STATUSES = [QUEUED, PROCESSING, COMPLETED, FAILED, DEAD_LETTER]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    spool_path TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_next_attempt ON jobs(status, next_attempt_at);
+"""
+
+
+class JobQueue:
+    """
+    Durable FIFO job queue with in-process workers.
+
+    Parameters:
+        directory: Directory holding the SQLite database and spooled PDFs
+        workers: Number of concurrent worker tasks
+        max_attempts: Attempts before a job with transient errors is dead-lettered
+        retry_backoff: Seconds before the first retry, doubled for each further attempt
+        poll_interval: Seconds idle workers wait before checking for due retries
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        workers: int,
+        max_attempts: int,
+        retry_backoff: float,
+        poll_interval: float = 1.0,
+    ):
+        self.directory = Path(directory)
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._workers: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module has no side effects
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.directory / "jobs.sqlite3", check_same_thread=False, isolation_level=None
+            )
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _insert(self, job_id: str, upload: SpooledUpload, filename: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        spool_path = self.directory / f"{job_id}.pdf"
+        shutil.move(upload.path, spool_path)
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO jobs (id, filename, spool_path, file_size, sha256, status,"
+                " created_at, updated_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    filename,
+                    str(spool_path),
+                    upload.size,
+                    upload.sha256,
+                    QUEUED,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+
+    def _claim(self) -> dict | None:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND next_attempt_at <= ?"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED, now),
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?"
+                        " WHERE id = ?",
+                        (PROCESSING, now, row["id"]),
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db().execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+
+    def _requeue_interrupted(self) -> int:
+        # Jobs left in "processing" by a previous process that stopped mid-job
+        with self._lock:
+            cursor = self._db().execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (QUEUED, time.time(), PROCESSING),
+            )
+        return cursor.rowcount
+
+    def _get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "filename": row["filename"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": json.loads(row["error"]) if row["error"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def _metrics(self) -> dict:
+        with self._lock:
+            db = self._db()
+            counts = dict(
+                db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            )
+            oldest = db.execute(
+                "SELECT MIN(created_at) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+        return {
+            "depth": counts.get(QUEUED, 0),
+            **{status: counts.get(status, 0) for status in STATUSES},
+            "oldest_queued_age_s": round(time.time() - oldest, 3) if oldest else 0.0,
+            "workers": len(self._workers),
+        }
+
+    async def submit(self, upload: SpooledUpload, filename: str) -> str:
+        """
+        Enqueue a spooled upload; the queue takes ownership of the spooled file.
+
+        Returns:
+            The job id
+        """
+        job_id = str(uuid.uuid4())
+        await asyncio.to_thread(self._insert, job_id, upload, filename)
+        logger.info("Queued job %s for file: %s", job_id, redact(filename))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> dict | None:
+        """Return the status (and result or error once finished) of a job."""
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def metrics(self) -> dict:
+        """Return queue depth and job counts by status."""
+        return await asyncio.to_thread(self._metrics)
+
+    async def start(self, handler) -> None:
+        """
+        Start the worker tasks.
+
+        Parameters:
+            handler: Coroutine function called as handler(upload, filename) returning the result
+        """
+        requeued = await asyncio.to_thread(self._requeue_interrupted)
+        if requeued:
+            logger.warning("Requeued %d interrupted jobs", requeued)
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(handler)) for _ in range(self.worker_count)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the worker tasks; jobs being processed are requeued on the next start."""
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await worker
+        self._workers = []
+        self._wakeup = None
+
+    async def _worker(self, handler) -> None:
+        while True:
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                self._wakeup.clear()
+                continue
+            await self._run(job, handler)
+
+    async def _run(self, job: dict, handler) -> None:
+        # Logs of a job carry its id as the correlation id
+        start_request(job["id"])
+        upload = SpooledUpload(
+            path=Path(job["spool_path"]), size=job["file_size"], sha256=job["sha256"]
+        )
+        try:
+            result = await handler(upload, job["filename"])
+        except Exception as e:
+            status_code = getattr(e, "status_code", 500)
+            error = json.dumps({"status_code": status_code, "detail": getattr(e, "detail", str(e))})
+
+            if status_code < 500:
+                logger.warning("Job %s failed: %s", job["id"], e)
+                await asyncio.to_thread(self._update, job["id"], status=FAILED, error=error)
+            elif job["attempts"] >= self.max_attempts:
+                logger.error(
+                    "Job %s moved to dead letter after %d attempts", job["id"], job["attempts"]
+                )
+                await asyncio.to_thread(self._update, job["id"], status=DEAD_LETTER, error=error)
+            else:
+                delay = self.retry_backoff * 2 ** (job["attempts"] - 1)
+                logger.warning(
+                    "Job %s attempt %d failed, retrying in %ss", job["id"], job["attempts"], delay
+                )
+                await asyncio.to_thread(
+                    self._update,
+                    job["id"],
+                    status=QUEUED,
+                    error=error,
+                    next_attempt_at=time.time() + delay,
+                )
+                return
+        else:
+            await asyncio.to_thread(
+                self._update, job["id"], status=COMPLETED, result=json.dumps(result), error=None
+            )
+            logger.info("Job %s completed", job["id"])
+
+        # Finished for good, the spooled PDF is no longer needed
+        upload.cleanup()
+
+
+job_queue = JobQueue(
+    directory=os.getenv("JOBS_DIR", ".cache/jobs"),
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF", "5")),
+)
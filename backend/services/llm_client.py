@@ -0,0 +1,70 @@
+"""
+OpenAI client on a shared, tuned HTTP connection pool.
+
+All LLM calls go through one httpx client so TLS connections to the API are
+kept alive and reused across requests (and multiplexed over HTTP/2 when the
+h2 package is installed) instead of being re-established under load. Rate
+limits (429) and server errors (5xx) are retried by the OpenAI SDK with
+exponential backoff and jitter, honouring Retry-After headers.
+"""
+
+import importlib.util
+import logging
+import os
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+from services.workers import LLM_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Connection pool: enough connections for every concurrent LLM call
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", str(LLM_CONCURRENCY * 2)))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", str(LLM_CONCURRENCY))
+)
+# Seconds an idle connection is kept open
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+# Seconds; completions with long summaries can take a while, connecting should not
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+# Retries of 408/409/429/5xx responses and connection errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+
+def create_http_client(http2: bool = LLM_HTTP2) -> httpx.Client:
+    """Create the pooled httpx client used for LLM API calls."""
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("LLM_HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1")
+        http2 = False
+
+    return DefaultHttpxClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    )
+
+
+def create_openai_client(api_key: str, base_url: str | None = None, **kwargs) -> OpenAI:
+    """
+    Create an OpenAI client on a pooled HTTP client.
+
+    Parameters:
+        api_key: OpenAI API key
+        base_url: API base URL; defaults to OPENAI_BASE_URL or the public API
+        **kwargs: Overrides of the OpenAI client arguments (e.g. max_retries)
+    """
+    kwargs.setdefault("max_retries", LLM_MAX_RETRIES)
+    kwargs.setdefault("timeout", httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT))
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=create_http_client(),
+        **kwargs,
+    )
@@ -0,0 +1,230 @@
+"""
+Structured, non-blocking logging.
+
+configure_logging() replaces logging.basicConfig: records are put on an
+in-memory queue by the request handling code and formatted and written to
+stdout by a background thread, so a slow stdout never blocks the event loop.
+
+- LOG_FORMAT=json (default) writes one JSON object per line, LOG_FORMAT=text
+  the classic single-line format
+- every record carries the request_id of the request (or job) it belongs to,
+  taken from the X-Request-ID header or generated per request
+- DEBUG records are kept only for a LOG_DEBUG_SAMPLE_RATE share of requests
+  (0.01 by default), so step-by-step detail is available without paying
+  for it on every request; LOG_LEVEL=DEBUG keeps all of them
+- document content (extracted text, model output, filenames) must be logged
+  through redact(), which hides it unless LOG_REDACT=false
+
+Use %-style arguments (logger.info("Parsed %s", name)) rather than f-strings:
+messages of dropped records are never formatted, and formatting of the others
+happens on the logging thread.
+"""
+
+import atexit
+import contextlib
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+LOG_REDACT = os.getenv("LOG_REDACT", "true").lower() == "true"
+# Records beyond this many waiting for the logging thread are dropped instead of blocking
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Libraries whose DEBUG output is per-connection noise rather than request detail
+QUIET_LOGGERS = ("httpx", "httpcore", "hpack", "openai", "PIL", "multipart", "asyncio")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+debug_sampled_var: ContextVar[bool] = ContextVar("debug_sampled", default=False)
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "request_id",
+    "taskName",
+}
+
+_listener: QueueListener | None = None
+
+
+def start_request(request_id: str | None = None) -> str:
+    """
+    Bind a correlation id to the current context and decide on debug sampling.
+
+    Parameters:
+        request_id: Id supplied by the caller (e.g. X-Request-ID), generated if None
+
+    Returns:
+        The correlation id
+    """
+    request_id = request_id or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    debug_sampled_var.set(random.random() < LOG_DEBUG_SAMPLE_RATE)
+    return request_id
+
+
+class Redacted:
+    """Log argument that renders as a placeholder with the length unless LOG_REDACT=false."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self) -> str:
+        text = "" if self.value is None else str(self.value)
+        if not LOG_REDACT:
+            return text
+        return f"<redacted {len(text)} chars>"
+
+    __repr__ = __str__
+
+
+def redact(value) -> Redacted:
+    """Wrap document content (text, model output, filenames) before passing it to a logger."""
+    return Redacted(value)
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware that starts a logging context per HTTP request.
+
+    The id comes from the X-Request-ID request header when present and is
+    returned in the X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        # Ids are echoed into logs and headers, accept only short printable ones
+        request_id = start_request(
+            supplied if supplied.isprintable() and len(supplied) <= 128 else None
+        )
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the request id and drop DEBUG records of requests not sampled for debug."""
+
+    def __init__(self, keep_all_debug: bool = False):
+        super().__init__()
+        self.keep_all_debug = keep_all_debug
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and not (self.keep_all_debug or debug_sampled_var.get()):
+            return False
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats the message in the caller; records stay in-process,
+        # so handing them over as they are is safe
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Dropping a log line is better than stalling a request on a stuck stdout
+        with contextlib.suppress(queue.Full):
+            self.queue.put_nowait(record)
+
+
+def configure_logging(stream=None) -> QueueListener:
+    """
+    Install the queue handler on the root logger and start the writer thread.
+
+    Calling it again replaces the previous configuration.
+
+    Parameters:
+        stream: Output stream, stdout by default
+
+    Returns:
+        The started QueueListener
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    keep_all_debug = LOG_LEVEL == "DEBUG"
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = _DeferredQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter(keep_all_debug))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if isinstance(existing, _DeferredQueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    # Sampled DEBUG records must reach the filter, unsampled ones are dropped there
+    level = logging.getLevelName(LOG_LEVEL)
+    if level == logging.INFO and LOG_DEBUG_SAMPLE_RATE > 0:
+        level = logging.DEBUG
+    root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(logging.INFO, root.level))
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,169 @@
+"""
+Stage timing metrics for the parsing pipeline.
+
+Code wraps pipeline stages in `with span("stage"):`; durations are recorded in
+the pdf_parse_stage_seconds Prometheus histogram (served on /metrics) and, when
+OTEL_EXPORTER_OTLP_ENDPOINT is set and the OpenTelemetry SDK is installed
+(`pip install opentelemetry-sdk opentelemetry-exporter-otlp`), exported as
+trace spans to that collector. METRICS_ENABLED=false turns span() into a no-op.
+
+Extraction can run in worker processes whose metrics would never reach
+/metrics. There spans are buffered and returned together with the result (see
+collect_spans) and recorded by the parent process with record_spans.
+
+collect_spans also measures how far the extraction raised the peak resident
+memory of the process running it. The request collects it with track_peak_rss
+and logs it when its parse finishes.
+"""
+
+import logging
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from pathlib import Path
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+
+# From sub-millisecond regex work up to slow LLM calls
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "pdf_parse_stage_seconds",
+    "Time spent in each stage of the PDF parsing pipeline",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+# Set in extraction worker processes by mark_worker_process. The app process itself can be
+# a child process (uvicorn --reload or --workers), so the process tree does not tell
+_in_worker_process = False
+# Spans recorded in an extraction worker process, see collect_spans
+_worker_spans: list[tuple[str, int, float]] | None = None
+# Peak RSS growth of the extractions of the current request, see track_peak_rss
+_request_peaks: ContextVar[list[int] | None] = ContextVar("request_peaks", default=None)
+
+
+def _create_tracer():
+    if not (METRICS_ENABLED and OTEL_EXPORTER_OTLP_ENDPOINT):
+        return None
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but OpenTelemetry is not installed")
+        return None
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "pdf-parser")})
+    )
+    # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT itself
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    return provider.get_tracer(__name__)
+
+
+_tracer = _create_tracer()
+
+
+def record(stage: str, start_ns: int, duration: float) -> None:
+    """Record a finished stage that started at start_ns (epoch nanoseconds)."""
+    if _worker_spans is not None:
+        _worker_spans.append((stage, start_ns, duration))
+        return
+    STAGE_SECONDS.labels(stage=stage).observe(duration)
+    if _tracer is not None:
+        otel_span = _tracer.start_span(f"pdf_parse.{stage}", start_time=start_ns)
+        otel_span.end(end_time=start_ns + int(duration * 1e9))
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as one occurrence of stage."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start_ns = time.time_ns()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, start_ns, time.perf_counter() - started)
+
+
+def mark_worker_process() -> None:
+    """Buffer the spans of collect_spans calls in this process (extraction pool initializer)."""
+    global _in_worker_process
+    _in_worker_process = True
+
+
+def peak_rss_bytes() -> int:
+    """Return the peak resident set size of this process (VmHWM, see reset_peak_rss)."""
+    with suppress(OSError, ValueError), Path("/proc/self/status").open() as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def reset_peak_rss() -> None:
+    """Reset the peak resident set size to the current one (Linux only, a no-op elsewhere)."""
+    with suppress(OSError):
+        Path("/proc/self/clear_refs").write_text("5")
+
+
+def collect_spans(func, *args):
+    """
+    Run func in an extraction worker and return (result, spans, peak RSS growth).
+
+    In the main process (thread workers) spans are recorded directly and the list is empty.
+    The growth is how far func raised the peak resident memory of the process, in bytes.
+    A worker process resets the peak first, so it measures func alone; in the main process
+    it is the growth of the process peak and includes concurrent requests.
+    """
+    global _worker_spans
+    if not _in_worker_process:
+        peak_start = peak_rss_bytes()
+        return func(*args), [], peak_rss_bytes() - peak_start
+    # A worker process runs one task at a time, so a process-wide buffer is enough
+    _worker_spans = []
+    reset_peak_rss()
+    peak_start = peak_rss_bytes()
+    try:
+        return func(*args), _worker_spans, peak_rss_bytes() - peak_start
+    finally:
+        _worker_spans = None
+
+
+def record_spans(spans: list[tuple[str, int, float]]) -> None:
+    """Record spans returned by collect_spans."""
+    for stage, start_ns, duration in spans:
+        record(stage, start_ns, duration)
+
+
+@contextmanager
+def track_peak_rss():
+    """Collect the peak RSS growth of the extractions started in this context; yields a list."""
+    peaks: list[int] = []
+    token = _request_peaks.set(peaks)
+    try:
+        yield peaks
+    finally:
+        _request_peaks.reset(token)
+
+
+def record_peak_rss(growth: int) -> None:
+    """Add the peak RSS growth returned by collect_spans to the request tracking it, if any."""
+    peaks = _request_peaks.get()
+    if peaks is not None:
+        peaks.append(growth)
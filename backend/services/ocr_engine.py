@@ -0,0 +1,230 @@
+"""
+OCR engines used to read image pages.
+
+Two backends implement the same OCREngine interface:
+
+- tesserocr: libtesseract called in-process. Loading the language models
+  takes longer than recognising a page, so API handles are created once per
+  language set and kept warm for the life of the worker; pages only pay for
+  recognition.
+- pytesseract: runs the tesseract binary once per call (model loading
+  included), the fallback when tesserocr is not installed or cannot load its
+  models.
+
+OCR_ENGINE=auto (default) prefers tesserocr; OCR_ENGINE=tesserocr or
+pytesseract forces one. The engine is selected once per process, when the
+extraction worker starts (see pdf_extraction.init_worker) or on first use.
+TESSDATA_PREFIX points tesserocr at the tessdata directory when the library
+was built with another default.
+"""
+
+import functools
+import logging
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto").lower()
+TESSDATA_PREFIX = os.getenv("TESSDATA_PREFIX")
+
+# Whether any engine can be used at all
+OCR_ENGINE_INSTALLED = pytesseract is not None or tesserocr is not None
+
+_engine: "OCREngine | None" = None
+_engine_lock = threading.Lock()
+
+
+class OCREngine(ABC):
+    """Tesseract backend: page orientation detection and text recognition."""
+
+    name: str
+
+    @abstractmethod
+    def detect_orientation(self, image) -> int:
+        """
+        Detect the orientation of a page image.
+
+        Returns:
+            Clockwise rotation in degrees (0, 90, 180 or 270) needed to make the page
+            upright, 0 when there is too little text to tell
+        """
+
+    @abstractmethod
+    def image_to_string(self, image, lang: str) -> str:
+        """Recognise the text of an upright page image in the languages of lang (e.g. pol+eng)."""
+
+    @abstractmethod
+    def warm(self, lang: str) -> None:
+        """Load what recognition in lang needs ahead of the first page."""
+
+
+class PytesseractEngine(OCREngine):
+    """Runs the tesseract binary per call through pytesseract."""
+
+    name = "pytesseract"
+
+    def detect_orientation(self, image) -> int:
+        try:
+            osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        except pytesseract.TesseractError as e:
+            # OSD needs a minimum amount of text; assume the page is upright
+            logger.debug("Orientation detection failed, assuming upright page: %s", e)
+            return 0
+        return int(osd.get("rotate", 0)) % 360
+
+    def image_to_string(self, image, lang: str) -> str:
+        return pytesseract.image_to_string(image, lang=lang)
+
+    def warm(self, lang: str) -> None:
+        # Nothing stays loaded, every call starts its own tesseract process
+        pass
+
+
+class _HandlePool:
+    """Idle tesserocr API handles of one configuration, created on demand and reused."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._idle: queue.SimpleQueue = queue.SimpleQueue()
+        self.created = 0
+
+    @contextmanager
+    def borrow(self):
+        try:
+            api = self._idle.get_nowait()
+        except queue.Empty:
+            api = self._factory()
+            self.created += 1
+        try:
+            yield api
+        finally:
+            # Drop the page image, the loaded models stay
+            api.Clear()
+            self._idle.put(api)
+
+    def fill(self) -> None:
+        """Make sure at least one handle is loaded."""
+        with self.borrow():
+            pass
+
+
+class TesserocrEngine(OCREngine):
+    """
+    In-process libtesseract through tesserocr.
+
+    A handle is used by one thread at a time. Each language set has its own
+    pool of handles, so concurrent OCR threads of a worker get one handle each
+    (bounded by the OCR threads) and reuse them for every later page.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        self._pools: dict[str, _HandlePool] = {}
+        self._lock = threading.Lock()
+
+    def _api(self, lang: str, **kwargs):
+        if TESSDATA_PREFIX:
+            kwargs["path"] = TESSDATA_PREFIX
+        # Raises RuntimeError when the traineddata of lang cannot be loaded
+        return tesserocr.PyTessBaseAPI(lang=lang, **kwargs)
+
+    def _pool(self, lang: str) -> _HandlePool:
+        with self._lock:
+            pool = self._pools.get(lang)
+            if pool is None:
+                if lang == "osd":
+                    factory = functools.partial(self._api, "osd", psm=tesserocr.PSM.OSD_ONLY)
+                else:
+                    factory = functools.partial(self._api, lang)
+                pool = self._pools[lang] = _HandlePool(factory)
+            return pool
+
+    def detect_orientation(self, image) -> int:
+        with self._pool("osd").borrow() as api:
+            api.SetImage(image)
+            # None when the page has too little text
+            result = api.DetectOrientationScript()
+        if not result:
+            logger.debug("Orientation detection failed, assuming upright page")
+            return 0
+        # orient_deg is how far the text is rotated clockwise; undo it with the opposite turn
+        return (360 - int(result["orient_deg"])) % 360
+
+    def image_to_string(self, image, lang: str) -> str:
+        with self._pool(lang).borrow() as api:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+
+    def warm(self, lang: str) -> None:
+        self._pool("osd").fill()
+        self._pool(lang).fill()
+
+
+def create_engine(name: str, lang: str) -> OCREngine:
+    """
+    Create the OCR engine called name (auto, tesserocr or pytesseract) and warm it for lang.
+
+    auto picks tesserocr when it is installed and can load its models, pytesseract otherwise.
+
+    Raises:
+        RuntimeError: if the requested engine is not installed or cannot load lang
+        ValueError: for an unknown engine name
+    """
+    if name not in ("auto", "tesserocr", "pytesseract"):
+        raise ValueError(f"Unknown OCR_ENGINE: {name}")
+
+    if name in ("auto", "tesserocr"):
+        if tesserocr is not None:
+            engine = TesserocrEngine()
+            try:
+                engine.warm(lang)
+                return engine
+            except RuntimeError as e:
+                if name == "tesserocr":
+                    raise
+                logger.warning("tesserocr cannot load %s, falling back to pytesseract: %s", lang, e)
+        elif name == "tesserocr":
+            raise RuntimeError("OCR_ENGINE=tesserocr but tesserocr is not installed")
+
+    if pytesseract is None:
+        raise RuntimeError("No OCR engine is installed (pip install tesserocr or pytesseract)")
+    return PytesseractEngine()
+
+
+def configured_engine_name() -> str:
+    """
+    Return the name of the engine this process uses, without loading one.
+
+    Before the engine is selected, auto is assumed to get tesserocr whenever it is installed.
+    """
+    if _engine is not None:
+        return _engine.name
+    if OCR_ENGINE == "pytesseract" or (OCR_ENGINE == "auto" and tesserocr is None):
+        return "pytesseract"
+    return "tesserocr"
+
+
+def get_engine(lang: str) -> OCREngine:
+    """Return the engine of this process, selecting it by OCR_ENGINE on first call."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(OCR_ENGINE, lang)
+                logger.info("Using the %s OCR engine", _engine.name)
+    return _engine
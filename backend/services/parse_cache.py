@@ -0,0 +1,259 @@
+"""
+Content-addressed on-disk cache for PDF parsing results.
+
+Entries are keyed by the SHA-256 of the uploaded PDF and a fingerprint of
+what produced them: extracted text by the extractor fingerprint (text
+backend, OCR engine and settings, extraction version), parsed appointment
+data by the prompt/model fingerprint. Changing the prompt template makes old
+results unreachable without throwing away the (expensive) extracted text, and
+changing the extractor makes old text unreachable.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def hash_bytes(data: bytes) -> str:
+    """Return the hex SHA-256 digest of data."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParseCache:
+    """
+    Size-bounded LRU cache stored as JSON files on the local filesystem.
+
+    Layout:
+        <directory>/text/<fingerprint>/<hh>/<pdf_hash>.json
+        <directory>/results/<fingerprint>/<hh>/<pdf_hash>.json
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int, enabled: bool = True):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.counters = {
+            "text_hits": 0,
+            "text_misses": 0,
+            "result_hits": 0,
+            "result_misses": 0,
+            "evictions": 0,
+        }
+        # Guards the index only; files are read and written outside of it
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        # Least recently used entries first
+        self._entries: OrderedDict[Path, int] = OrderedDict()
+        self._total_bytes = 0
+
+    def load(self) -> None:
+        """
+        Index the entries on disk, once.
+
+        Called at startup (off the event loop) and otherwise by the first cache access;
+        every method does blocking file I/O and belongs in a worker thread.
+        """
+        if self._loaded or not self.enabled:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            files = sorted(self.directory.rglob("*.json"), key=lambda path: path.stat().st_mtime)
+            with self._lock:
+                for path in files:
+                    size = path.stat().st_size
+                    self._entries[path] = size
+                    self._total_bytes += size
+                evicted = self._evict()
+                self._loaded = True
+            self._unlink(evicted)
+        logger.info(
+            "Parse cache loaded %d entries (%d bytes) from %s",
+            len(self._entries),
+            self._total_bytes,
+            self.directory,
+        )
+
+    def _text_path(self, pdf_hash: str, fingerprint: str) -> Path:
+        return self.directory / "text" / fingerprint / pdf_hash[:2] / f"{pdf_hash}.json"
+
+    def _result_path(self, pdf_hash: str, fingerprint: str) -> Path:
+        return self.directory / "results" / fingerprint / pdf_hash[:2] / f"{pdf_hash}.json"
+
+    def _read(self, path: Path, counter: str):
+        if not self.enabled:
+            return None
+        self.load()
+
+        with self._lock:
+            if path not in self._entries:
+                self.counters[f"{counter}_misses"] += 1
+                return None
+
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            # Also an entry evicted since the lookup above, which is not worth a warning
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("Dropping unreadable cache entry %s: %s", path.name, e)
+            with self._lock:
+                self._forget(path)
+                self.counters[f"{counter}_misses"] += 1
+            self._unlink([path])
+            return None
+
+        with self._lock:
+            # Mark as most recently used, also on disk so the order survives restarts
+            if path in self._entries:
+                self._entries.move_to_end(path)
+            self.counters[f"{counter}_hits"] += 1
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return payload
+
+    def _write(self, path: Path, payload) -> None:
+        if not self.enabled:
+            return
+
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        self.load()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+        with self._lock:
+            self._forget(path)
+            self._entries[path] = len(data)
+            self._total_bytes += len(data)
+            evicted = self._evict()
+        self._unlink(evicted)
+
+    def _forget(self, path: Path) -> None:
+        self._total_bytes -= self._entries.pop(path, 0)
+
+    @staticmethod
+    def _unlink(paths: list[Path]) -> None:
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> list[Path]:
+        """Drop least recently used entries from the index; returns the files to remove."""
+        evicted = []
+        while self._total_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+            evicted.append(oldest)
+            self.counters["evictions"] += 1
+        return evicted
+
+    def get_text(self, pdf_hash: str, fingerprint: str) -> str | None:
+        """Return cached text of a PDF extracted with the given extractor fingerprint, or None."""
+        payload = self._read(self._text_path(pdf_hash, fingerprint), "text")
+        return payload["text"] if payload else None
+
+    def set_text(self, pdf_hash: str, fingerprint: str, text: str) -> None:
+        """Store extracted text for a PDF and extractor fingerprint."""
+        self._write(self._text_path(pdf_hash, fingerprint), {"text": text})
+
+    def get_result(self, pdf_hash: str, fingerprint: str) -> dict | None:
+        """Return cached appointment data for a PDF parsed with the given prompt fingerprint."""
+        return self._read(self._result_path(pdf_hash, fingerprint), "result")
+
+    def set_result(self, pdf_hash: str, fingerprint: str, data: dict) -> None:
+        """Store validated appointment data for a PDF and prompt fingerprint."""
+        self._write(self._result_path(pdf_hash, fingerprint), data)
+
+    def invalidate_results(self, keep_fingerprint: str | None = None) -> int:
+        """
+        Remove cached appointment data produced by other prompt/model versions.
+
+        Parameters:
+            keep_fingerprint: Fingerprint whose results are kept, or None to drop all results
+
+        Returns:
+            Number of removed entries
+        """
+        return self._invalidate("results", keep_fingerprint)
+
+    def invalidate_text(self, keep_fingerprint: str | None = None) -> int:
+        """
+        Remove cached text extracted by other extractor configurations.
+
+        Parameters:
+            keep_fingerprint: Fingerprint whose text is kept, or None to drop all text
+
+        Returns:
+            Number of removed entries
+        """
+        return self._invalidate("text", keep_fingerprint)
+
+    def _invalidate(self, layer: str, keep_fingerprint: str | None) -> int:
+        if not self.enabled:
+            return 0
+
+        self.load()
+        layer_dir = self.directory / layer
+        with self._lock:
+            stale = [
+                path
+                for path in self._entries
+                if path.is_relative_to(layer_dir)
+                and path.relative_to(layer_dir).parts[0] != keep_fingerprint
+            ]
+            for path in stale:
+                self._forget(path)
+        self._unlink(stale)
+
+        # Clean up now empty fingerprint directories (and entries of older layouts)
+        if layer_dir.exists():
+            for fingerprint_dir in layer_dir.iterdir():
+                if fingerprint_dir.name != keep_fingerprint:
+                    shutil.rmtree(fingerprint_dir, ignore_errors=True)
+
+        if stale:
+            logger.info("Invalidated %d cached %s entries", len(stale), layer)
+        return len(stale)
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        self.load()
+        with self._lock:
+            paths = list(self._entries)
+            self._entries.clear()
+            self._total_bytes = 0
+        self._unlink(paths)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current cache size."""
+        with self._lock:
+            lookups = {
+                layer: self.counters[f"{layer}_hits"] + self.counters[f"{layer}_misses"]
+                for layer in ("text", "result")
+            }
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                **self.counters,
+                "text_hit_rate": self.counters["text_hits"] / lookups["text"]
+                if lookups["text"]
+                else 0.0,
+                "result_hit_rate": self.counters["result_hits"] / lookups["result"]
+                if lookups["result"]
+                else 0.0,
+            }
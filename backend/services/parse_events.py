@@ -0,0 +1,131 @@
+"""
+Progress events of a parse, sent to clients of POST /parse-pdf?stream=true.
+
+The streaming endpoint binds an EventChannel to the context of its request.
+Concurrent uploads of the same document share one parse (see SingleFlight), so
+the parse itself emits into a Broadcast, which forwards its events to the
+channel of every streaming caller waiting for it. Callers that join late first
+get the events emitted so far.
+
+The pipeline calls emit() at each stage and for every piece of summary text
+the LLM generates. Worker threads see the caller's context (see
+workers.Stage), so emit() also works from the LLM thread; events are handed to
+the event loop thread-safely. Without a bound channel or broadcast emit() does
+nothing, the non-streaming endpoints are unaffected.
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_sink_var: ContextVar["EventChannel | Broadcast | None"] = ContextVar("parse_events", default=None)
+
+# Marks the end of the events of a channel
+_CLOSED = object()
+
+
+class EventChannel:
+    """Queue of the events for one streaming client, consumed on the event loop that created it."""
+
+    # Someone reads every event put on a channel
+    listening = True
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def _put(self, item) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._queue.put_nowait(item)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def emit(self, event: str, data: dict) -> None:
+        """Queue an event; callable from any thread."""
+        self._put({"event": event, **data})
+
+    def close(self) -> None:
+        """End the event stream after the events queued so far."""
+        self._put(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        item = await self._queue.get()
+        if item is _CLOSED:
+            raise StopAsyncIteration
+        return item
+
+
+class Broadcast:
+    """Events of one shared parse, forwarded to the channels of every caller streaming it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history: list[tuple[str, dict]] = []
+        self._channels: set[EventChannel] = set()
+
+    @property
+    def listening(self) -> bool:
+        """Whether a streaming caller is waiting for the parse."""
+        return bool(self._channels)
+
+    def emit(self, event: str, data: dict) -> None:
+        """Send an event to every subscribed channel; callable from any thread."""
+        with self._lock:
+            self._history.append((event, data))
+            for channel in self._channels:
+                channel.emit(event, data)
+
+    @contextmanager
+    def forward_to(self, channel: EventChannel):
+        """Send the events emitted so far, and then every new one, to channel."""
+        with self._lock:
+            for event, data in self._history:
+                channel.emit(event, data)
+            self._channels.add(channel)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._channels.discard(channel)
+
+
+@contextmanager
+def bind(sink: "EventChannel | Broadcast"):
+    """Send the events emitted in this context (and the tasks and threads it starts) to sink."""
+    token = _sink_var.set(sink)
+    try:
+        yield sink
+    finally:
+        _sink_var.reset(token)
+
+
+@contextmanager
+def listen(broadcast: Broadcast | None):
+    """Forward the events of a shared parse to the channel bound to this context, if any."""
+    channel = _sink_var.get()
+    if broadcast is None or not isinstance(channel, EventChannel):
+        yield
+        return
+    with broadcast.forward_to(channel):
+        yield
+
+
+def active() -> bool:
+    """Return whether a client is streaming the events of the current parse."""
+    sink = _sink_var.get()
+    return sink is not None and sink.listening
+
+
+def emit(event: str, **data) -> None:
+    """Send an event to the channel or broadcast bound to the current context, if any."""
+    sink = _sink_var.get()
+    if sink is not None:
+        sink.emit(event, data)
@@ -0,0 +1,482 @@
+"""
+Page-level PDF text extraction: text layer where present, OCR on image pages.
+
+Functions in this module are free of import-time side effects so they can run
+inside worker processes.
+"""
+
+import hashlib
+import logging
+import math
+import multiprocessing.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from services import image_preprocessing, logging_config, metrics, ocr_engine, pdf_text
+from services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pdf2image import convert_from_bytes, convert_from_path
+
+    OCR_AVAILABLE = ocr_engine.OCR_ENGINE_INSTALLED
+except ImportError:
+    OCR_AVAILABLE = False
+
+# Resolution used to rasterize pages for OCR
+OCR_DPI = 300
+# Orientation detection runs on a thumbnail reduced by this factor (300 DPI -> 100 DPI)
+OSD_REDUCE_FACTOR = 3
+OCR_LANG = "pol+eng"  # Support Polish and English
+# Language set for the remaining pages when the first OCRed page shows no Polish
+ENGLISH_LANG = "eng"
+# Letters that, of the OCR languages, only Polish uses
+POLISH_LETTERS = frozenset("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ")
+# OCR text the first page must yield before the language of the document is decided from it
+LANG_PROBE_MIN_CHARS = 200
+# Crop, rescale and binarize pages and skip blank ones before OCR (services.image_preprocessing)
+OCR_PREPROCESS = os.getenv("PDF_OCR_PREPROCESS", "true").lower() == "true"
+# Choose the OCR languages of multi-page documents from their first OCRed page
+OCR_LANG_PROBE = os.getenv("PDF_OCR_LANG_PROBE", "true").lower() == "true"
+# Pages with less text-layer text than this are treated as scanned images
+MIN_PAGE_TEXT_CHARS = 10
+# Separates pages in extracted text (form feed, same as pdftotext) so later steps can
+# recognise per-page headers and footers
+PAGE_SEPARATOR = "\f"
+# Bump whenever a change to the extraction code changes the text it produces; text cached
+# by an earlier version is then no longer used (see extraction_fingerprint)
+EXTRACTION_VERSION = 1
+
+# Pages OCRed in parallel per document
+OCR_THREADS = int(os.getenv("PDF_OCR_THREADS", str(os.cpu_count() or 1)))
+# poppler processes used to rasterize a window of pages
+RASTER_THREADS = int(os.getenv("PDF_RASTER_THREADS", "2"))
+# Consecutive pages rendered by one pdf2image call
+RASTER_WINDOW = int(os.getenv("PDF_RASTER_WINDOW", "2"))
+# Rasterized pages a document may hold in memory at once, in MB. Pages are rendered in
+# grayscale (one byte per pixel, about 8.7 MB for A4 at 300 DPI); rendering waits for
+# OCR to release pages when the budget is used up
+OCR_MEMORY_BUDGET_MB = int(os.getenv("PDF_OCR_MEMORY_BUDGET_MB", "96"))
+# Maximum number of pages OCRed per document, further image pages are skipped
+OCR_MAX_PAGES = int(os.getenv("PDF_OCR_MAX_PAGES", "30"))
+# Maximum number of pages OCRed at once across all concurrent uploads
+OCR_GLOBAL_SLOTS = int(os.getenv("PDF_OCR_GLOBAL_SLOTS", str(os.cpu_count() or 1)))
+
+# Page size assumed when the text layer did not provide one (A4 in points)
+DEFAULT_PAGE_SIZE = (595.0, 842.0)
+
+# Replaced by a cross-process semaphore in extraction worker processes, see init_worker
+_ocr_slots = threading.BoundedSemaphore(OCR_GLOBAL_SLOTS)
+
+
+def init_worker(ocr_slots) -> None:
+    """
+    Process pool initializer: set up logging, share the global OCR slots with the parent
+    and siblings, and select and warm up the OCR engine before the first document arrives.
+    """
+    global _ocr_slots
+    # The parent's log writer thread does not exist in a worker, it gets its own
+    logging_config.configure_logging()
+    # Flush queued records when the worker exits (workers do not run atexit handlers)
+    multiprocessing.util.Finalize(None, logging_config.shutdown_logging, exitpriority=10)
+    # Spans of this process are sent back to the parent with each result
+    metrics.mark_worker_process()
+    _ocr_slots = ocr_slots
+    if OCR_AVAILABLE:
+        try:
+            ocr_engine.get_engine(OCR_LANG)
+        except Exception as e:
+            # Reported again for every OCRed page, the worker still serves text-layer PDFs
+            logger.error("OCR engine could not be started: %s", e)
+
+
+def extraction_fingerprint() -> str:
+    """
+    Identify what produces the extracted text: the extraction version, the text backend,
+    the OCR engine and the OCR settings. Cached text is only reused for the same value.
+
+    The OCR engine is the one this process selected, or the configured one before OCR first
+    ran. A worker whose tesserocr fails to start falls back to pytesseract, so its text is
+    keyed by the fingerprint it returns with the text (extract_text_from_file), not by the
+    one the parent computes.
+    """
+    settings = [
+        EXTRACTION_VERSION,
+        pdf_text.get_backend().name,
+        ocr_engine.configured_engine_name() if OCR_AVAILABLE else None,
+        OCR_LANG,
+        OCR_DPI,
+        OCR_PREPROCESS,
+        OCR_LANG_PROBE,
+        MIN_PAGE_TEXT_CHARS,
+    ]
+    return hashlib.sha256(repr(settings).encode()).hexdigest()[:16]
+
+
+def detect_orientation(image, engine: ocr_engine.OCREngine | None = None) -> int:
+    """
+    Detect page orientation with Tesseract OSD on a low-resolution thumbnail.
+
+    Parameters:
+        image: Rasterized page
+        engine: OCR engine to use, the one selected by OCR_ENGINE if None
+
+    Returns:
+        Clockwise rotation in degrees (0, 90, 180 or 270) needed to make the page upright
+    """
+    engine = engine or ocr_engine.get_engine(OCR_LANG)
+    thumbnail = image.convert("L").reduce(OSD_REDUCE_FACTOR)
+    with span("orientation"):
+        return engine.detect_orientation(thumbnail)
+
+
+def ocr_page(image, engine: ocr_engine.OCREngine | None = None, lang: str | None = None) -> str:
+    """
+    OCR a rasterized page: skip it if blank, rotate it upright, preprocess it and read it.
+
+    Parameters:
+        image: Rasterized page
+        engine: OCR engine to use, the one selected by OCR_ENGINE if None
+        lang: Tesseract languages, OCR_LANG if None
+
+    Returns:
+        The page text, empty for blank pages
+    """
+    engine = engine or ocr_engine.get_engine(OCR_LANG)
+    if OCR_PREPROCESS:
+        with span("preprocess"):
+            blank = image_preprocessing.is_blank(image)
+        if blank:
+            logger.debug("Skipping blank page")
+            return ""
+    rotation = detect_orientation(image, engine)
+    if rotation:
+        # PIL rotates counterclockwise
+        image = image.rotate(-rotation, expand=True)
+        logger.debug("Detected page rotation of %d degrees", rotation)
+    if OCR_PREPROCESS:
+        with span("preprocess"):
+            image = image_preprocessing.prepare(image)
+    with span("ocr_page"):
+        return engine.image_to_string(image, lang or OCR_LANG)
+
+
+def _ocr_with_slot(image, lang: str | None = None) -> str:
+    with _ocr_slots:
+        return ocr_page(image, lang=lang)
+
+
+def choose_language(probe_text: str) -> str:
+    """Languages for the remaining pages of a document, from the OCR text of its first page."""
+    if len(probe_text.strip()) < LANG_PROBE_MIN_CHARS or POLISH_LETTERS.intersection(probe_text):
+        return OCR_LANG
+    return ENGLISH_LANG
+
+
+class _MemoryBudget:
+    """Bytes of rasterized pages one document may hold at once."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int) -> None:
+        """Wait until size bytes fit in the budget (a lone page larger than the budget fits)."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.used == 0 or self.used + size <= self.limit)
+            self.used += size
+
+    def release(self, size: int) -> None:
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+def _page_bytes(page_size: tuple[float, float] | None) -> int:
+    """Memory of a page rendered in grayscale at OCR_DPI, from its size in points."""
+    width, height = page_size if page_size and all(page_size) else DEFAULT_PAGE_SIZE
+    return math.ceil(width * OCR_DPI / 72) * math.ceil(height * OCR_DPI / 72)
+
+
+def _rasterize(pdf_source: bytes | str, **kwargs):
+    """Render pages with poppler, reading from disk when the PDF is a file path."""
+    with span("rasterize"):
+        if isinstance(pdf_source, str):
+            return convert_from_path(pdf_source, **kwargs)
+        return convert_from_bytes(pdf_source, **kwargs)
+
+
+def _pdf_source(pdf_file) -> bytes | str:
+    """Return the path of a file-backed PDF stream, or its content otherwise."""
+    name = getattr(pdf_file, "name", None)
+    if isinstance(name, str) and Path(name).is_file():
+        return name
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def _page_ranges(page_numbers: list[int]) -> list[tuple[int, int]]:
+    """Group sorted 1-based page numbers into (first_page, last_page) runs."""
+    ranges: list[tuple[int, int]] = []
+    for number in page_numbers:
+        if ranges and ranges[-1][1] == number - 1:
+            ranges[-1] = (ranges[-1][0], number)
+        else:
+            ranges.append((number, number))
+    return ranges
+
+
+def _render_pages(
+    pdf_source: bytes | str,
+    page_numbers: list[int],
+    budget: _MemoryBudget,
+    page_sizes: dict[int, tuple[float, float]],
+    scan_images: dict[int, tuple[int, int]],
+):
+    """
+    Lazily produce grayscale page images for OCR.
+
+    Scanned pages (in scan_images) come first: their embedded image is decoded
+    directly at its native resolution. The other pages, and scanned pages whose
+    image cannot be decoded, are rendered with poppler at most RASTER_WINDOW
+    consecutive pages at a time.
+
+    The memory of each page is reserved in budget before it is decoded or rendered;
+    the consumer releases a page's share once it is done with the page. Rendering
+    stops at the end of the document.
+
+    Yields:
+        (page number, image, bytes reserved for the page)
+    """
+    to_render = []
+    for number in page_numbers:
+        pixel_size = scan_images.get(number)
+        if pixel_size is None:
+            to_render.append(number)
+            continue
+        reserved = pixel_size[0] * pixel_size[1]
+        budget.acquire(reserved)
+        try:
+            with span("extract_image"):
+                image = pdf_text.read_scan_image(pdf_source, number)
+        except Exception as e:
+            budget.release(reserved)
+            logger.debug("Could not decode the image of page %d, rendering it: %s", number, e)
+            to_render.append(number)
+            continue
+        yield number, image, reserved
+        del image
+
+    for first_page, last_page in _page_ranges(to_render):
+        for window_first in range(first_page, last_page + 1, RASTER_WINDOW):
+            numbers = list(range(window_first, min(window_first + RASTER_WINDOW, last_page + 1)))
+            reserved = [_page_bytes(page_sizes.get(number)) for number in numbers]
+            budget.acquire(sum(reserved))
+            try:
+                rendered = _rasterize(
+                    pdf_source,
+                    dpi=OCR_DPI,
+                    first_page=numbers[0],
+                    last_page=numbers[-1],
+                    grayscale=True,
+                    thread_count=min(RASTER_THREADS, len(numbers)),
+                )
+            except Exception as e:
+                budget.release(sum(reserved))
+                logger.warning("Rasterizing pages %d-%d failed: %s", numbers[0], numbers[-1], e)
+                continue
+
+            # poppler returns fewer pages than asked for past the end of the document
+            returned = min(len(rendered), len(numbers))
+            pending = rendered[:returned]
+            del rendered
+            budget.release(sum(reserved[returned:]))
+            for number, size in zip(numbers[:returned], reserved[:returned], strict=True):
+                # Hand the page over without keeping a reference here
+                image = pending.pop(0)
+                yield number, image, size
+                del image
+            if returned < len(numbers):
+                return
+
+
+def _ocr_within_budget(image, budget: _MemoryBudget, reserved: int, lang: str | None) -> str:
+    try:
+        return _ocr_with_slot(image, lang)
+    finally:
+        budget.release(reserved)
+
+
+def ocr_pages(
+    pdf_source: bytes | str,
+    page_numbers: list[int],
+    threads: int | None = None,
+    page_sizes: dict[int, tuple[float, float]] | None = None,
+    scan_images: dict[int, tuple[int, int]] | None = None,
+) -> dict[int, str]:
+    """
+    Rasterize and OCR the given pages in parallel, a few pages at a time.
+
+    Pages are rendered while earlier pages are OCRed, and released as soon as they
+    are OCRed, so memory use is bounded by OCR_MEMORY_BUDGET_MB rather than by the
+    page count. With OCR_LANG_PROBE the first page is read with OCR_LANG and decides
+    the languages of the pages submitted after it is read: when it shows no Polish,
+    they are read as English only. Pages submitted meanwhile are read with OCR_LANG,
+    so the first pages are not serialized behind the probe.
+
+    Parameters:
+        pdf_source: PDF file content or path
+        page_numbers: Sorted 1-based page numbers to OCR
+        threads: Pages OCRed concurrently (default OCR_THREADS)
+        page_sizes: Page sizes in points by page number, for the memory budget (A4 if missing)
+        scan_images: Pixel size of the embedded image by page number, for pages that are a
+            single scanned image (PageText.scan_image_size); these are not rendered
+
+    Returns:
+        OCR text by page number; pages that failed or lie past the end of the document
+        are missing
+    """
+    budget = _MemoryBudget(OCR_MEMORY_BUDGET_MB * 1024 * 1024)
+    workers = max(1, min(threads or OCR_THREADS, len(page_numbers)))
+    lang = OCR_LANG
+    probing = OCR_LANG_PROBE and len(page_numbers) > 1
+    # OCR of the first page while it has not decided the languages yet
+    probe = None
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for page_number, image, reserved in _render_pages(
+            pdf_source, page_numbers, budget, page_sizes or {}, scan_images or {}
+        ):
+            if probe is not None and probe.done():
+                lang = OCR_LANG if probe.exception() else choose_language(probe.result())
+                probe = None
+                logger.debug("Reading the remaining pages with languages %s", lang)
+            future = pool.submit(_ocr_within_budget, image, budget, reserved, lang)
+            futures[future] = page_number
+            if probing:
+                probe, probing = future, False
+            del image
+        for future, page_number in futures.items():
+            try:
+                results[page_number] = future.result()
+            except Exception as e:
+                logger.warning("OCR failed for page %d: %s", page_number, e)
+    return results
+
+
+def extract_pages(pdf_bytes) -> list[str]:
+    """
+    Extract text page by page, using the text layer where present and OCR elsewhere.
+
+    Pages whose text layer has fewer than MIN_PAGE_TEXT_CHARS characters are
+    treated as image pages. Only those pages are OCRed, in parallel and up to
+    OCR_MAX_PAGES pages per document. Pages that are a single scanned image have
+    that image decoded directly; the others are rasterized (consecutive image
+    pages share pdf2image calls, RASTER_WINDOW pages at a time).
+
+    Returns:
+        Text of every page, in document order
+    """
+    try:
+        with span("text_layer"):
+            pages = pdf_text.get_backend().read_pages(pdf_bytes)
+        page_texts = [page.text for page in pages]
+        page_sizes = {number: (page.width, page.height) for number, page in enumerate(pages, 1)}
+        scan_images = {
+            number: page.scan_image_size
+            for number, page in enumerate(pages, 1)
+            if page.scan_image_size
+        }
+    except Exception as e:
+        logger.warning("Text layer extraction failed, falling back to OCR of all pages: %s", e)
+        page_texts = None
+
+    if not OCR_AVAILABLE:
+        if page_texts is None or any(
+            len(page_text.strip()) < MIN_PAGE_TEXT_CHARS for page_text in page_texts
+        ):
+            logger.warning("OCR is not available, image pages are skipped")
+        return page_texts or []
+
+    if page_texts is None:
+        # Page structure is unreadable, let poppler render whatever it can
+        results = ocr_pages(_pdf_source(pdf_bytes), list(range(1, OCR_MAX_PAGES + 1)))
+        logger.debug("OCRed %d pages of a PDF without readable page structure", len(results))
+        return [results.get(number, "") for number in range(1, max(results, default=0) + 1)]
+
+    image_pages = [
+        number
+        for number, page_text in enumerate(page_texts, start=1)
+        if len(page_text.strip()) < MIN_PAGE_TEXT_CHARS
+    ]
+    logger.debug(
+        "Classified %d pages: %d text, %d image",
+        len(page_texts),
+        len(page_texts) - len(image_pages),
+        len(image_pages),
+    )
+    if not image_pages:
+        return page_texts
+
+    if len(image_pages) > OCR_MAX_PAGES:
+        logger.warning(
+            "Document has %d image pages, only the first %d are OCRed",
+            len(image_pages),
+            OCR_MAX_PAGES,
+        )
+        image_pages = image_pages[:OCR_MAX_PAGES]
+
+    ocr_results = ocr_pages(
+        _pdf_source(pdf_bytes), image_pages, page_sizes=page_sizes, scan_images=scan_images
+    )
+    for page_number, page_text in ocr_results.items():
+        page_texts[page_number - 1] = page_text
+
+    return page_texts
+
+
+def extract_text_with_rotation(pdf_bytes):
+    """
+    Extract text from a PDF, OCRing only the pages that lack a text layer.
+
+    Returns:
+        Text of all pages in order separated by PAGE_SEPARATOR, or an empty string if nothing
+        meaningful was found
+    """
+    try:
+        page_texts = extract_pages(pdf_bytes)
+    except Exception as e:
+        logger.warning("Text extraction failed: %s", e)
+        return ""
+
+    text_content = PAGE_SEPARATOR.join(page_text + "\n" for page_text in page_texts)
+
+    # Check if we got meaningful text (more than just whitespace)
+    stripped_content = text_content.strip()
+    if stripped_content and len(stripped_content) > 10:
+        logger.debug("Successfully extracted text, length: %d", len(stripped_content))
+        return text_content
+
+    logger.warning("Extracted insufficient text (length: %d)", len(stripped_content))
+    return ""
+
+
+def extract_text_from_file(path: str) -> tuple[str, str]:
+    """
+    Extract text from a PDF on disk.
+
+    Used by the extraction workers: only the path crosses the process boundary,
+    the PDF itself is read from the file (poppler reads it directly for OCR).
+
+    Returns:
+        The text (see extract_text_with_rotation) and the extraction_fingerprint of the
+        worker that extracted it
+    """
+    with Path(path).open("rb") as pdf_file:
+        text = extract_text_with_rotation(pdf_file)
+    return text, extraction_fingerprint()
@@ -0,0 +1,225 @@
+"""
+Text-layer backends: read the text and metadata of every page of a PDF in one pass.
+
+- pdfium: Google's PDFium (the PDF engine of Chrome) through pypdfium2,
+  native code and several times faster than PyPDF2 on text-heavy reports
+- pypdf2: the pure-Python PyPDF2 reader, the fallback when pypdfium2 is not
+  installed
+
+PDF_TEXT_BACKEND=auto (default) prefers pdfium; PDF_TEXT_BACKEND=pdfium or
+pypdf2 forces one. The backend is selected once per process, on first use.
+
+The backends lay out table rows differently (PDFium keeps a row on one line,
+PyPDF2 puts every cell on its own line); the template extraction accepts both.
+
+With PDFium, pages that are a single embedded image (scanner output) are
+flagged with the image's pixel size, and read_scan_image() decodes that image
+directly so OCR does not have to render the page.
+"""
+
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+except ImportError:
+    pdfium = None
+
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "auto").lower()
+# Share of the page an image must cover for the page to count as a scanned image
+SCAN_IMAGE_MIN_COVERAGE = 0.8
+
+# PDFium is not thread-safe; documents of concurrent extraction threads are read one at a time
+_pdfium_lock = threading.Lock()
+
+_backend: "TextBackend | None" = None
+_backend_lock = threading.Lock()
+
+
+@dataclass
+class PageText:
+    """Text layer and metadata of one page."""
+
+    text: str
+    # Page size in PDF points (1/72 inch), 0 if unknown
+    width: float = 0.0
+    height: float = 0.0
+    # Clockwise rotation applied when displaying the page (/Rotate)
+    rotation: int = 0
+    # Images drawn on the page
+    image_count: int = 0
+    # Pixel size of the embedded image when the page is one image covering it (pdfium only)
+    scan_image_size: tuple[int, int] | None = None
+
+
+class TextBackend(ABC):
+    """Reads the text layer of a PDF."""
+
+    name: str
+
+    @abstractmethod
+    def read_pages(self, pdf_file) -> list[PageText]:
+        """
+        Parse a PDF and return its pages in order.
+
+        Parameters:
+            pdf_file: Binary stream with the PDF
+
+        Raises:
+            Exception: if the PDF cannot be parsed (the exception type depends on the backend)
+        """
+
+
+class PdfiumBackend(TextBackend):
+    """Text layer through PDFium (pypdfium2)."""
+
+    name = "pdfium"
+
+    def read_pages(self, pdf_file) -> list[PageText]:
+        pdf_file.seek(0)
+        data = pdf_file.read()
+        pages = []
+        with _pdfium_lock:
+            document = pdfium.PdfDocument(data)
+            try:
+                for page in document:
+                    try:
+                        textpage = page.get_textpage()
+                        try:
+                            text = textpage.get_text_range()
+                        finally:
+                            textpage.close()
+                        width, height = page.get_size()
+                        images = list(page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]))
+                        pages.append(
+                            PageText(
+                                # PDFium ends lines with \r\n, PyPDF2 and pdftotext with \n
+                                text=text.replace("\r\n", "\n"),
+                                width=width,
+                                height=height,
+                                rotation=page.get_rotation(),
+                                image_count=len(images),
+                                scan_image_size=_scan_image_size(images, width * height),
+                            )
+                        )
+                    finally:
+                        page.close()
+            finally:
+                document.close()
+        return pages
+
+
+def _scan_image_size(images: list, page_area: float) -> tuple[int, int] | None:
+    """Pixel size of the only image of a page if it covers the page, else None."""
+    if len(images) != 1 or page_area <= 0:
+        return None
+    left, bottom, right, top = images[0].get_bounds()
+    if (right - left) * (top - bottom) < SCAN_IMAGE_MIN_COVERAGE * page_area:
+        return None
+    return tuple(images[0].get_px_size())
+
+
+def read_scan_image(pdf_source: bytes | str, page_number: int):
+    """
+    Decode the embedded image of a scanned page at its native resolution.
+
+    Only for pages with a PageText.scan_image_size; the image is decoded once,
+    without rendering the page.
+
+    Parameters:
+        pdf_source: PDF file content or path
+        page_number: 1-based page number
+
+    Returns:
+        The image in grayscale
+
+    Raises:
+        RuntimeError: if pypdfium2 is not installed
+        ValueError: if the page is not a single image
+    """
+    if pdfium is None:
+        raise RuntimeError("pypdfium2 is not installed")
+    with _pdfium_lock:
+        document = pdfium.PdfDocument(pdf_source)
+        try:
+            page = document[page_number - 1]
+            try:
+                images = list(page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]))
+                if len(images) != 1:
+                    raise ValueError(f"Page {page_number} has {len(images)} images")
+                bitmap = images[0].get_bitmap(render=False)
+                # convert() copies the pixels out of the PDFium buffer closed below
+                return bitmap.to_pil().convert("L")
+            finally:
+                page.close()
+        finally:
+            document.close()
+
+
+class PyPDF2Backend(TextBackend):
+    """Text layer through the pure-Python PyPDF2 reader."""
+
+    name = "pypdf2"
+
+    def read_pages(self, pdf_file) -> list[PageText]:
+        pdf_file.seek(0)
+        reader = PyPDF2.PdfReader(pdf_file)
+        return [
+            PageText(text=page.extract_text() or "", **_pypdf2_metadata(page))
+            for page in reader.pages
+        ]
+
+
+def _pypdf2_metadata(page) -> dict:
+    """Size, rotation and image count of a PyPDF2 page (images inside form XObjects are missed)."""
+    try:
+        resources = page["/Resources"].get_object() if "/Resources" in page else {}
+        xobjects = resources["/XObject"].get_object() if "/XObject" in resources else {}
+        return {
+            "width": float(page.mediabox.width),
+            "height": float(page.mediabox.height),
+            "rotation": int(page.get("/Rotate", 0)) % 360,
+            "image_count": sum(
+                1 for xobject in xobjects.values() if xobject.get_object()["/Subtype"] == "/Image"
+            ),
+        }
+    except Exception as e:
+        # Metadata is advisory, a malformed page dictionary must not cost the page its text
+        logger.debug("Could not read page metadata: %s", e)
+        return {}
+
+
+def create_backend(name: str) -> TextBackend:
+    """
+    Create the text backend called name (auto, pdfium or pypdf2).
+
+    Raises:
+        RuntimeError: if pdfium is requested but pypdfium2 is not installed
+        ValueError: for an unknown backend name
+    """
+    if name not in ("auto", "pdfium", "pypdf2"):
+        raise ValueError(f"Unknown PDF_TEXT_BACKEND: {name}")
+    if name == "pdfium" and pdfium is None:
+        raise RuntimeError("PDF_TEXT_BACKEND=pdfium but pypdfium2 is not installed")
+    if name != "pypdf2" and pdfium is not None:
+        return PdfiumBackend()
+    return PyPDF2Backend()
+
+
+def get_backend() -> TextBackend:
+    """Return the text backend of this process, selecting it by PDF_TEXT_BACKEND on first call."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(PDF_TEXT_BACKEND)
+                logger.info("Using the %s text backend", _backend.name)
+    return _backend
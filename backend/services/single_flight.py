@@ -0,0 +1,93 @@
+"""
+Single-flight deduplication of concurrent identical computations.
+
+A double-clicked upload or a retrying frontend sends the same PDF twice
+while the first request is still being parsed. Calls with the same key
+join the computation already in flight and all receive its result (or its
+exception) instead of running the extract, OCR and LLM pipeline again.
+"""
+
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time; concurrent callers share it."""
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        # Callers awaiting each running computation
+        self._waiters: dict[asyncio.Task, int] = {}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def start(self, key: str, func, *args, **kwargs) -> asyncio.Task:
+        """
+        Start func(*args, **kwargs) unless a call with the same key is running.
+
+        func may be a coroutine function or return a task. Returns the task of the
+        running computation, to be awaited with wait().
+        """
+        with self._lock:
+            self.counters["calls"] += 1
+            task = self._tasks.get(key)
+            # A computation cancelled because its callers left is not joined, start a new one
+            if task is None or task.cancelled() or task.cancelling():
+                self.counters["executions"] += 1
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                self._tasks[key] = task
+                task.add_done_callback(lambda done: self._finish(key, done))
+            else:
+                self.counters["coalesced"] += 1
+            return task
+
+    async def wait(self, task: asyncio.Task):
+        """
+        Await a computation returned by start().
+
+        A caller that is cancelled (e.g. the client disconnected) does not cancel the
+        computation for the other callers; it is cancelled when no caller is left.
+        """
+        with self._lock:
+            self._waiters[task] = self._waiters.get(task, 0) + 1
+        cancelled = False
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            if self._leave(task) == 0 and cancelled:
+                task.cancel()
+
+    async def run(self, key: str, func, *args, **kwargs):
+        """Await func(*args, **kwargs), or the already running call with the same key."""
+        return await self.wait(self.start(key, func, *args, **kwargs))
+
+    def _leave(self, task: asyncio.Task) -> int:
+        with self._lock:
+            remaining = self._waiters.pop(task) - 1
+            if remaining:
+                self._waiters[task] = remaining
+            return remaining
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """Return call counters, the share of coalesced calls and the calls in flight."""
+        with self._lock:
+            counters = dict(self.counters)
+            in_flight = len(self._tasks)
+        return {
+            **counters,
+            "in_flight": in_flight,
+            "coalesced_rate": counters["coalesced"] / counters["calls"]
+            if counters["calls"]
+            else 0.0,
+        }
@@ -0,0 +1,170 @@
+"""
+Schema-constrained LLM responses.
+
+Builds the strict JSON schema `response_format` for a pydantic model, validates
+the model's answer against it and keeps counters of how often answers fail to
+parse and how often a repair request fixes them. StreamedStringField reads one
+string field out of a response while it is still being streamed.
+"""
+
+import functools
+import re
+import threading
+from typing import TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+# Single-character escapes of JSON strings
+_JSON_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class StructuredOutputError(ValueError):
+    """The LLM response is not valid JSON matching the expected schema."""
+
+
+@functools.cache
+def json_schema_response_format(model: type[BaseModel]) -> dict:
+    """
+    Build a strict structured-output response format from a pydantic model.
+
+    Every field of the model must be required and the model must forbid extra
+    fields, as strict mode does not support optional or additional properties.
+    """
+    schema = model.model_json_schema()
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": schema, "strict": True},
+    }
+
+
+def parse_structured_response(content: str | None, model: type[ModelT]) -> ModelT:
+    """
+    Validate an LLM response against the model.
+
+    Raises:
+        StructuredOutputError: with a description of the problem, suitable to send back
+            to the model in a repair request
+    """
+    if not content or not content.strip():
+        raise StructuredOutputError("The response is empty")
+    # Strict mode never adds markdown, but keep accepting fenced JSON from other models
+    text = _CODE_FENCE.sub("", content.strip())
+    try:
+        return model.model_validate_json(text)
+    except ValidationError as e:
+        errors = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'response'}: {error['msg']}"
+            for error in e.errors()
+        )
+        raise StructuredOutputError(errors) from e
+
+
+class StreamedStringField:
+    """
+    Decode the value of one string field of a flat JSON object as the object streams in.
+
+    feed() takes the response in the pieces the API streams it in and returns the text of
+    the field that became complete, so it can be shown before the response is finished.
+    Escapes split across pieces are held back until they are complete.
+
+    Parameters:
+        field: Name of the field, e.g. summary
+    """
+
+    def __init__(self, field: str):
+        # An unescaped quote before the name can only open a key: quotes in strings are escaped
+        self._key = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self._buffer = ""
+        self._in_value = False
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """Add the next piece of the response and return the newly decoded text of the field."""
+        if self.done:
+            return ""
+        self._buffer += chunk
+        if not self._in_value:
+            match = self._key.search(self._buffer)
+            if match is None:
+                return ""
+            self._buffer = self._buffer[match.end() :]
+            self._in_value = True
+        return self._decode()
+
+    def _decode(self) -> str:
+        text = self._buffer
+        decoded = []
+        i = 0
+        while i < len(text):
+            char = text[i]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                decoded.append(char)
+                i += 1
+                continue
+            if i + 1 == len(text):
+                break
+            if text[i + 1] != "u":
+                decoded.append(_JSON_ESCAPES.get(text[i + 1], text[i + 1]))
+                i += 2
+                continue
+            if i + 6 > len(text):
+                break
+            code = int(text[i + 2 : i + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # High surrogate, decoded together with the low surrogate that follows
+                if i + 12 > len(text):
+                    break
+                low = int(text[i + 8 : i + 12], 16)
+                code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                i += 6
+            decoded.append(chr(code))
+            i += 6
+        self._buffer = text[i:]
+        return "".join(decoded)
+
+
+class StructuredOutputStats:
+    """Thread-safe counters of structured response parsing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "responses": 0,
+            "parse_failures": 0,
+            "repair_attempts": 0,
+            "repaired": 0,
+            "unrecoverable": 0,
+        }
+
+    def record(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> dict:
+        """Return counters with the parse failure rate and the rate of requests lost to it."""
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "parse_failure_rate": counters["parse_failures"] / counters["responses"]
+            if counters["responses"]
+            else 0.0,
+            "unrecoverable_rate": counters["unrecoverable"] / counters["requests"]
+            if counters["requests"]
+            else 0.0,
+        }
@@ -0,0 +1,230 @@
+"""
+Rule-based extraction for reports generated from known templates.
+
+Most uploaded lab and specialist reports come from a handful of templates
+with a fixed title, doctor and date line. For those the appointment fields
+can be read with regexes and keyword tables in microseconds, so the LLM is
+only needed for the summary. Templates are tried in order; add new layouts
+with register_template().
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date
+
+# Bump when extraction rules change so cached results produced by older rules are dropped
+RULES_VERSION = "1"
+
+# Confidence reported for documents fully matched by a template
+TEMPLATE_CONFIDENCE = 95
+
+# Polish month names in nominative and genitive form, with and without diacritics
+POLISH_MONTHS = {
+    "styczeń": 1,
+    "styczen": 1,
+    "stycznia": 1,
+    "luty": 2,
+    "lutego": 2,
+    "marzec": 3,
+    "marca": 3,
+    "kwiecień": 4,
+    "kwiecien": 4,
+    "kwietnia": 4,
+    "maj": 5,
+    "maja": 5,
+    "czerwiec": 6,
+    "czerwca": 6,
+    "lipiec": 7,
+    "lipca": 7,
+    "sierpień": 8,
+    "sierpien": 8,
+    "sierpnia": 8,
+    "wrzesień": 9,
+    "wrzesien": 9,
+    "września": 9,
+    "wrzesnia": 9,
+    "październik": 10,
+    "pazdziernik": 10,
+    "października": 10,
+    "pazdziernika": 10,
+    "listopad": 11,
+    "listopada": 11,
+    "grudzień": 12,
+    "grudzien": 12,
+    "grudnia": 12,
+}
+
+# Report kind keyword (matched as a prefix, so inflected forms match too) ->
+# (appointment type, English report name). More specific keywords go first.
+REPORT_KINDS = {
+    "panel lipidowy": ("Lab Work", "Lipid Panel"),
+    "panel podstawowy": ("Lab Work", "Basic Metabolic Panel"),
+    "panel nerkowy": ("Lab Work", "Kidney Function Panel"),
+    "panel wątrobowy": ("Lab Work", "Liver Function Panel"),
+    "panel tarczycowy": ("Lab Work", "Thyroid Panel"),
+    "morfologia": ("Lab Work", "Complete Blood Count"),
+    "badanie moczu": ("Lab Work", "Urinalysis"),
+    "dermatolog": ("Specialist", "Dermatology Consultation"),
+    "laryngolog": ("Specialist", "ENT Consultation"),
+    "kardiolog": ("Specialist", "Cardiology Consultation"),
+    "neurolog": ("Specialist", "Neurology Consultation"),
+    "ortoped": ("Specialist", "Orthopedic Consultation"),
+    "endokrynolog": ("Specialist", "Endocrinology Consultation"),
+    "gastroenterolog": ("Specialist", "Gastroenterology Consultation"),
+    "alergolog": ("Specialist", "Allergy Consultation"),
+    "okulist": ("Vision", "Eye Examination"),
+    "stomatolog": ("Dental", "Dental Examination"),
+    "fizjoterap": ("Physical Therapy", "Physiotherapy Session"),
+    "rehabilitac": ("Physical Therapy", "Rehabilitation Session"),
+    "psychiatr": ("Mental Health", "Psychiatric Consultation"),
+    "psycholog": ("Mental Health", "Psychological Consultation"),
+    "szczepien": ("Vaccination", "Vaccination"),
+    "weteryna": ("Veterinary", "Veterinary Visit"),
+    "medycyna rodzinna": ("General Checkup", "General Checkup"),
+    "bilans": ("General Checkup", "General Checkup"),
+}
+
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})[./-](\d{1,2})[./-](\d{4})\b")
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_WORD_DATE = re.compile(r"\b(\d{1,2})\s+([^\W\d_]+)\s+(\d{4})\b")
+
+
+def parse_date(value: str) -> str | None:
+    """
+    Parse a date written as YYYY-MM-DD, DD.MM.YYYY or "3 października 2025".
+
+    Returns:
+        The date in YYYY-MM-DD format, or None if no valid date was found
+    """
+    candidates = []
+    if match := _ISO_DATE.search(value):
+        candidates.append((match[1], match[2], match[3]))
+    if match := _NUMERIC_DATE.search(value):
+        candidates.append((match[3], match[2], match[1]))
+    if (match := _WORD_DATE.search(value)) and match[2].lower() in POLISH_MONTHS:
+        candidates.append((match[3], POLISH_MONTHS[match[2].lower()], match[1]))
+
+    for year, month, day in candidates:
+        try:
+            return date(int(year), int(month), int(day)).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def classify_report(kind: str) -> tuple[str, str] | None:
+    """Map a report title or specialty to (appointment type, English name) via REPORT_KINDS."""
+    normalized = " ".join(kind.lower().split())
+    for keyword, classification in REPORT_KINDS.items():
+        if re.search(rf"\b{re.escape(keyword)}", normalized):
+            return classification
+    return None
+
+
+@dataclass
+class TemplateMatch:
+    template: str
+    name: str
+    date: str
+    appointment_type: str
+    doctor: str
+    facility: str = ""
+    confidence_score: int = TEMPLATE_CONFIDENCE
+
+    def fields(self) -> dict:
+        """Return the appointment fields in the shape of the LLM extraction."""
+        return {
+            "name": self.name,
+            "date": self.date,
+            "appointment_type": self.appointment_type,
+            "doctor": self.doctor,
+            "confidence_score": self.confidence_score,
+        }
+
+    def summary(self) -> str:
+        """Short factual summary used when the LLM is not asked for one."""
+        summary = f"{self.name} on {self.date} with {self.doctor}"
+        if self.facility and self.facility != self.doctor:
+            summary += f" at {self.facility}"
+        return summary + "."
+
+
+@dataclass
+class LabeledReportTemplate:
+    """
+    Report layout with a title line and "Label: value" fields.
+
+    Values may follow the label on the same line or on the next line (the usual
+    result of text extraction from two-column tables).
+
+    Parameters:
+        name: Template name reported in logs
+        title: Regex with a "kind" group matching the report title line
+        labels: Field ("doctor", "date", "kind", "facility") -> accepted label texts
+    """
+
+    name: str
+    title: re.Pattern
+    labels: dict[str, tuple[str, ...]] = field(default_factory=dict)
+
+    def _value(self, text: str, field_name: str) -> str:
+        for label in self.labels.get(field_name, ()):
+            match = re.search(
+                rf"^[ \t]*{re.escape(label)}(?!\w)[ \t]*:?[ \t]*(.*)\n?(.*)$", text, re.MULTILINE
+            )
+            if match:
+                return (match[1] or match[2]).strip()
+        return ""
+
+    def extract(self, text: str) -> TemplateMatch | None:
+        title = self.title.search(text)
+        if title is None:
+            return None
+
+        # The explicit kind field is more precise than the title, fall back to the title
+        classification = classify_report(self._value(text, "kind")) or classify_report(
+            title["kind"]
+        )
+        parsed_date = parse_date(self._value(text, "date"))
+        facility = self._value(text, "facility")
+        doctor = self._value(text, "doctor") or facility
+        if classification is None or parsed_date is None or not doctor:
+            return None
+
+        appointment_type, name = classification
+        return TemplateMatch(
+            template=self.name,
+            name=name,
+            date=parsed_date,
+            appointment_type=appointment_type,
+            doctor=doctor,
+            facility=facility,
+        )
+
+
+TEMPLATES = [
+    LabeledReportTemplate(
+        name="raport_medyczny",
+        title=re.compile(r"^\s*Raport medyczny\s*[-\u2013\u2014:]\s*(?P<kind>.+)$", re.MULTILINE),
+        labels={
+            "doctor": ("Lekarz prowadzący", "Lekarz"),
+            "date": ("Data badania", "Data wizyty"),
+            "kind": ("Rodzaj badania", "Specjalizacja", "Poradnia"),
+            "facility": ("Placówka",),
+        },
+    ),
+]
+
+
+def register_template(template) -> None:
+    """Add a template; it needs a name and an extract(text) -> TemplateMatch | None method."""
+    TEMPLATES.append(template)
+
+
+def match_template(text: str) -> TemplateMatch | None:
+    """Return the first template that extracts all appointment fields, or None."""
+    for template in TEMPLATES:
+        match = template.extract(text)
+        if match is not None:
+            return match
+    return None
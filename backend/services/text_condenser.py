@@ -0,0 +1,228 @@
+"""
+Condense extracted document text before it is sent to the LLM.
+
+Medical reports repeat the clinic header/footer on every page, carry long
+whitespace runs from the PDF layout and sometimes duplicated lines from OCR.
+None of that helps the model, but all of it costs input tokens. The condenser
+removes it and then fits the text into a token budget, keeping the beginning
+and the end of the document (where the date and the signature usually are).
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from services.pdf_extraction import PAGE_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Number of lines at the top and bottom of each page checked for headers/footers
+EDGE_LINES = 3
+# Lines at least this long are dropped when they repeat anywhere in the document
+MIN_DEDUP_LINE_CHARS = 40
+# Share of the token budget kept from the start of the document, the rest is the tail
+HEAD_SHARE = 0.7
+TRUNCATION_MARKER = "[...]"
+# Seconds the app waits at startup for the tokenizer, whose BPE file may be downloaded
+TOKENIZER_LOAD_TIMEOUT = float(os.getenv("TOKENIZER_LOAD_TIMEOUT", "30"))
+# Seconds before a tokenizer that failed to load is tried again
+TOKENIZER_RETRY_SECONDS = 300
+
+_WHITESPACE_RUN = re.compile(r"[ \t\u00a0]+")
+_DIGITS = re.compile(r"\d+")
+
+
+@dataclass
+class CondensedText:
+    text: str
+    original_tokens: int
+    tokens: int
+    truncated: bool
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+_encodings: dict = {}
+# Monotonic time of the last failed load by model
+_encoding_failures: dict[str, float] = {}
+_encodings_lock = threading.Lock()
+
+
+def load_encoding(model: str):
+    """
+    Load the tokenizer of model, called once at startup.
+
+    tiktoken downloads the BPE file unless TIKTOKEN_CACHE_DIR holds it (the Docker
+    image bakes it in). A failure is not kept: until the tokenizer loads, tokens are
+    estimated and the load is tried again after TOKENIZER_RETRY_SECONDS.
+
+    Returns:
+        The tiktoken encoding, or None if it is unavailable
+    """
+    if tiktoken is None:
+        return None
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except Exception as e:
+            # Unknown model or the encoding file cannot be downloaded
+            _encoding_failures[model] = time.monotonic()
+            logger.warning("tiktoken encoding unavailable for %s, estimating tokens: %s", model, e)
+            return None
+        _encodings[model] = encoding
+        _encoding_failures.pop(model, None)
+        return encoding
+
+
+def _encoding(model: str):
+    encoding = _encodings.get(model)
+    if encoding is not None or tiktoken is None:
+        return encoding
+    failed_at = _encoding_failures.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < TOKENIZER_RETRY_SECONDS:
+        return None
+    return load_encoding(model)
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count tokens with the model's tokenizer, or estimate them (~4 characters per token)."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _truncate_tokens(text: str, max_tokens: int, model: str, from_end: bool = False) -> str:
+    encoding = _encoding(model)
+    if encoding is None:
+        max_chars = max_tokens * 4
+        return text[-max_chars:] if from_end else text[:max_chars]
+    tokens = encoding.encode(text, disallowed_special=())
+    tokens = tokens[-max_tokens:] if from_end else tokens[:max_tokens]
+    return encoding.decode(tokens)
+
+
+def _normalize_lines(text: str) -> list[list[str]]:
+    """Split text into pages of whitespace-normalized, non-empty lines."""
+    pages = []
+    for page in text.split(PAGE_SEPARATOR):
+        lines = [_WHITESPACE_RUN.sub(" ", line).strip() for line in page.splitlines()]
+        pages.append([line for line in lines if line])
+    return pages
+
+
+def _repeated_page_edges(pages: list[list[str]]) -> set[str]:
+    """Find header/footer lines: edge lines present on at least half of the pages."""
+    if len(pages) < 2:
+        return set()
+    counts = Counter()
+    for lines in pages:
+        edges = lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+        # Page numbers differ between pages ("Strona 1 z 3"), so compare with digits masked
+        counts.update({_DIGITS.sub("#", line) for line in edges})
+    threshold = max(2, math.ceil(len(pages) / 2))
+    return {line for line, count in counts.items() if count >= threshold}
+
+
+def _remove_boilerplate(pages: list[list[str]]) -> list[str]:
+    repeated_edges = _repeated_page_edges(pages)
+    seen_edges: set[str] = set()
+    seen_long_lines: set[str] = set()
+    lines: list[str] = []
+
+    for page_lines in pages:
+        for index, line in enumerate(page_lines):
+            is_edge = index < EDGE_LINES or index >= len(page_lines) - EDGE_LINES
+            masked = _DIGITS.sub("#", line)
+            if is_edge and masked in repeated_edges:
+                # Keep the first occurrence, the header often names the clinic
+                if masked in seen_edges:
+                    continue
+                seen_edges.add(masked)
+
+            if lines and lines[-1] == line:
+                continue
+            if len(line) >= MIN_DEDUP_LINE_CHARS:
+                if line in seen_long_lines:
+                    continue
+                seen_long_lines.add(line)
+
+            lines.append(line)
+    return lines
+
+
+def _fit_budget(lines: list[str], max_tokens: int, model: str) -> str:
+    """Keep whole lines from the head and the tail of the document within max_tokens."""
+    marker_tokens = count_tokens(TRUNCATION_MARKER, model) + 2
+    head_budget = int((max_tokens - marker_tokens) * HEAD_SHARE)
+    tail_budget = max_tokens - marker_tokens - head_budget
+
+    head: list[str] = []
+    remaining = lines
+    used = 0
+    for index, line in enumerate(lines):
+        line_tokens = count_tokens(line, model) + 1
+        if used + line_tokens > head_budget:
+            if not head:
+                # A huge first line (e.g. OCR without line breaks): keep its beginning here and
+                # let the tail keep its end
+                head.append(_truncate_tokens(line, head_budget, model))
+            remaining = lines[index:]
+            break
+        head.append(line)
+        used += line_tokens
+
+    tail: list[str] = []
+    used = 0
+    for line in reversed(remaining):
+        line_tokens = count_tokens(line, model) + 1
+        if used + line_tokens > tail_budget:
+            if not tail:
+                tail.append(_truncate_tokens(line, tail_budget, model, from_end=True))
+            break
+        tail.append(line)
+        used += line_tokens
+    tail.reverse()
+
+    return "\n".join([*head, TRUNCATION_MARKER, *tail])
+
+
+def condense_text(text: str, max_tokens: int, model: str) -> CondensedText:
+    """
+    Normalize and deduplicate document text and fit it into a token budget.
+
+    Parameters:
+        text: Extracted document text, pages separated by PAGE_SEPARATOR
+        max_tokens: Token budget for the returned text
+        model: Model name used to pick the tokenizer
+
+    Returns:
+        The condensed text with token counts before and after
+    """
+    original_tokens = count_tokens(text, model)
+    lines = _remove_boilerplate(_normalize_lines(text))
+    condensed = "\n".join(lines)
+    tokens = count_tokens(condensed, model)
+
+    truncated = tokens > max_tokens
+    if truncated:
+        condensed = _fit_budget(lines, max_tokens, model)
+        tokens = count_tokens(condensed, model)
+
+    return CondensedText(
+        text=condensed, original_tokens=original_tokens, tokens=tokens, truncated=truncated
+    )
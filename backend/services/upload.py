@@ -0,0 +1,167 @@
+"""
+Bounded-memory handling of uploaded files.
+
+Uploads are streamed in chunks into a temporary file while being hashed, so a
+request never holds more than one chunk of the upload in memory. Extraction
+stages receive the file path and read (or let poppler read) the file directly
+instead of getting their own copy of the bytes.
+
+Requests to the upload endpoints whose body exceeds the limit are rejected by
+UploadSizeLimitMiddleware before the framework reads (and spools) the body.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Directory for spooled uploads, defaults to the system temp directory
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload exceeds the allowed size."""
+
+
+@dataclass
+class SpooledUpload:
+    path: Path
+    size: int
+    sha256: str
+
+    def cleanup(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def share(self) -> "SpooledUpload":
+        """
+        Return a second handle on the spooled file, with its own path and its own cleanup.
+
+        The file is hard linked next to the original (copied where links are not
+        supported), so either handle can be cleaned up while the other is still read.
+        """
+        path = self.path.with_name(f"{self.path.stem}.{secrets.token_hex(4)}{self.path.suffix}")
+        try:
+            os.link(self.path, path)
+        except OSError:
+            shutil.copyfile(self.path, path)
+        return SpooledUpload(path=path, size=self.size, sha256=self.sha256)
+
+
+async def spool_upload(file: UploadFile, max_size: int) -> SpooledUpload:
+    """
+    Stream an upload into a temporary file, hashing it on the way.
+
+    Parameters:
+        file: Uploaded file
+        max_size: Maximum allowed size in bytes
+
+    Returns:
+        The spooled upload; the caller must call cleanup() when done
+
+    Raises:
+        UploadTooLargeError: as soon as more than max_size bytes were received
+    """
+    # Reject without reading anything if the size is already known
+    if file.size is not None and file.size > max_size:
+        raise UploadTooLargeError
+
+    hasher = hashlib.sha256()
+    size = 0
+    fd, name = tempfile.mkstemp(suffix=".pdf", dir=UPLOAD_SPOOL_DIR)
+    path = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError
+                hasher.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+    return SpooledUpload(path=path, size=size, sha256=hasher.hexdigest())
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that answers 413 to request bodies above a per-path limit.
+
+    A declared Content-Length above the limit is rejected before any of the body is
+    received. Bodies without one (chunked uploads) are counted as they arrive and cut
+    off as soon as they cross the limit.
+
+    Parameters:
+        app: ASGI application
+        limits: Maximum body size in bytes per request path
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            await _send_too_large(send, limit)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    await _send_too_large(send, limit)
+                    # The app stops reading as if the client had gone away
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # The app fails on the cut-off body; the 413 has been sent already
+            if not rejected:
+                raise
+
+
+async def _send_too_large(send, limit: int) -> None:
+    body = json.dumps(
+        {"detail": f"Upload too large. Maximum request size is {limit / (1024 * 1024):.0f}MB"}
+    ).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                # The rest of the body is not read, the connection cannot be reused
+                (b"connection", b"close"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,145 @@
+"""
+Bounded executors that keep blocking pipeline stages off the event loop.
+
+Each stage has its own concurrency limit so a burst of scanned uploads cannot
+starve the LLM stage (or the other way round). CPU-bound stages run in a
+process pool, I/O-bound stages in a thread pool.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from services import pdf_extraction
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """
+    A pipeline stage with a concurrency limit and a dedicated executor.
+
+    Parameters:
+        name: Stage name used in logs
+        limit: Maximum number of calls running (or queued in the executor) at once
+        executor_factory: Creates the executor on first use, or None to use the loop default
+    """
+
+    def __init__(self, name: str, limit: int, executor_factory=None):
+        self.name = name
+        self.limit = max(1, limit)
+        self._executor_factory = executor_factory
+        self._executor: Executor | None = None
+        self._executor_lock = threading.Lock()
+        # asyncio primitives are bound to one event loop, keep one semaphore per loop
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.in_flight = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limit)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    def _get_executor(self) -> Executor | None:
+        if self._executor_factory is None:
+            return None
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = self._executor_factory()
+            return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) in this stage's executor, waiting for a free slot first."""
+        async with self._semaphore():
+            self.in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                executor = self._get_executor()
+                call = functools.partial(func, *args, **kwargs)
+                if not isinstance(executor, ProcessPoolExecutor):
+                    # Threads see the caller's context (request id for logs), like asyncio.to_thread
+                    call = functools.partial(contextvars.copy_context().run, call)
+                return await loop.run_in_executor(executor, call)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM on a huge scan); start a fresh pool for the next call
+                logger.error("Worker pool for stage '%s' is broken, recreating it", self.name)
+                self.shutdown(wait=False)
+                raise
+            finally:
+                self.in_flight -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the stage executor, if one was started."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
+                self._executor = None
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+# Number of worker processes for PDF extraction/OCR; 0 runs extraction in threads instead
+EXTRACT_WORKERS = _env_int("PDF_EXTRACT_WORKERS", os.cpu_count() or 1)
+EXTRACT_CONCURRENCY = _env_int("PDF_EXTRACT_CONCURRENCY", EXTRACT_WORKERS or 4)
+LLM_CONCURRENCY = _env_int("LLM_CONCURRENCY", 8)
+# Concurrent database calls; also the size of the database connection pool
+DB_CONCURRENCY = _env_int("DB_CONCURRENCY", 10)
+# Extraction workers start from a fresh interpreter rather than a fork of the app, which
+# is running threads (executors, the log writer) that a forked child would not have
+EXTRACT_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _extraction_process_pool() -> ProcessPoolExecutor:
+    context = multiprocessing.get_context(EXTRACT_START_METHOD)
+    # OCR slots are shared by every worker process so concurrent uploads
+    # cannot start more tesseract processes than there are cores
+    ocr_slots = context.BoundedSemaphore(pdf_extraction.OCR_GLOBAL_SLOTS)
+    return ProcessPoolExecutor(
+        max_workers=EXTRACT_WORKERS,
+        mp_context=context,
+        initializer=pdf_extraction.init_worker,
+        initargs=(ocr_slots,),
+    )
+
+
+extract_stage = Stage(
+    "extract",
+    EXTRACT_CONCURRENCY,
+    _extraction_process_pool
+    if EXTRACT_WORKERS > 0
+    else functools.partial(ThreadPoolExecutor, max_workers=EXTRACT_CONCURRENCY),
+)
+
+llm_stage = Stage(
+    "llm",
+    LLM_CONCURRENCY,
+    functools.partial(ThreadPoolExecutor, max_workers=LLM_CONCURRENCY),
+)
+
+db_stage = Stage(
+    "db",
+    DB_CONCURRENCY,
+    functools.partial(ThreadPoolExecutor, max_workers=DB_CONCURRENCY),
+)
+
+STAGES = [extract_stage, llm_stage, db_stage]
+
+
+def shutdown_stages() -> None:
+    """Shut down all stage executors (called on application shutdown)."""
+    for stage in STAGES:
+        stage.shutdown()
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Configure the app for tests before it is imported by the test modules
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("PARSE_CACHE_ENABLED", "false")
+# Extract in threads so patched PDF readers are visible to the extraction stage
+os.environ.setdefault("PDF_EXTRACT_WORKERS", "0")
+# The extraction tests mock PyPDF2, read text layers with it even where pypdfium2 is installed
+os.environ.setdefault("PDF_TEXT_BACKEND", "pypdf2")
+# OCR tests feed blank mock pages and check the images passed to tesseract
+os.environ.setdefault("PDF_OCR_PREPROCESS", "false")
+# The OCR tests mock pytesseract, use it even where tesserocr is installed
+os.environ.setdefault("OCR_ENGINE", "pytesseract")
+# Keep the job queue database out of the working tree
+os.environ.setdefault("JOBS_DIR", tempfile.mkdtemp(prefix="jobs-"))
+# Parsed appointments go to a throwaway SQLite database
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='db-')}/familycare.sqlite3"
+)
+# Uploaded PDFs go to a throwaway blob store
+os.environ.setdefault("BLOB_STORE_DIR", tempfile.mkdtemp(prefix="blobs-"))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Create the tables of the test database (the app lifespan does not run in tests)"""
+    from services.database import init_db
+
+    init_db()
+
+
+# Appointment fields of a valid, confident LLM response
+COMPLETE_DATA = {
+    "name": "Lipid Panel",
+    "date": "2025-01-15",
+    "appointment_type": "Lab Work",
+    "summary": "Cholesterol levels are within the healthy range.",
+    "doctor": "Dr. Nowak",
+    "confidence_score": 90,
+}
+
+
+def make_chat_response(content: str | None) -> Mock:
+    """Non-streamed chat completion whose message has content"""
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = content
+    return response
+
+
+@pytest.fixture
+def complete_data() -> dict:
+    """Fields the mocked LLM answers with; modules may override it"""
+    return dict(COMPLETE_DATA)
+
+
+@pytest.fixture
+def chat_response():
+    """Factory of non-streamed chat completions, for responses other than complete_data"""
+    return make_chat_response
+
+
+@pytest.fixture
+def mock_pdf_reader():
+    """PyPDF2 reader of a one-page PDF; set pages[0].extract_text for other text"""
+    with patch("services.pdf_text.PyPDF2.PdfReader") as reader:
+        page = Mock()
+        page.extract_text.return_value = "Mock PDF content for testing"
+        reader.return_value.pages = [page]
+        yield reader
+
+
+@pytest.fixture
+def mock_chatgpt(complete_data):
+    """The LLM call, answering with complete_data; set return_value or side_effect to change"""
+    with patch("controllers.appointments.client.chat.completions.create") as create:
+        create.return_value = make_chat_response(json.dumps(complete_data))
+        yield create
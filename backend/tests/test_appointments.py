@@ -10,6 +10,14 @@ from main import app
 client = TestClient(app)
 
 
+def mock_query_results(mock_session, appointments):
+    """Make the filtered, ordered and limited appointment query return appointments"""
+    query = mock_session.query.return_value
+    for method in ("options", "filter", "order_by", "limit"):
+        getattr(query, method).return_value = query
+    query.all.return_value = appointments
+
+
 class TestParsedAppointments:
     @patch("controllers.appointments.SessionLocal")
     def test_get_parsed_appointments_with_data(self, mock_session_local):
@@ -48,7 +56,7 @@ class TestParsedAppointments:
         mock_appointment2.updated_at = datetime(2025, 2, 20, 11, 0, 0)
 
         # Mock the query results
-        mock_session.query.return_value.all.return_value = [mock_appointment1, mock_appointment2]
+        mock_query_results(mock_session, [mock_appointment1, mock_appointment2])
 
         response = client.get("/parsed-appointments")
 
@@ -89,7 +97,7 @@ class TestParsedAppointments:
         mock_session_local.return_value = mock_session
 
         # Mock empty query results
-        mock_session.query.return_value.all.return_value = []
+        mock_query_results(mock_session, [])
 
         response = client.get("/parsed-appointments")
 
@@ -0,0 +1,67 @@
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+def read_ndjson(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+class TestParsePdfBatch:
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_batch_streams_one_line_per_file(self, mock_chatgpt):
+        """Test that every file gets its own result line, including per-file errors"""
+        files = [
+            ("files", ("first.pdf", io.BytesIO(b"first pdf"), "application/pdf")),
+            ("files", ("notes.txt", io.BytesIO(b"not a pdf"), "text/plain")),
+            ("files", ("second.pdf", io.BytesIO(b"second pdf"), "application/pdf")),
+        ]
+
+        response = client.post("/parse-pdf/batch", files=files)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = sorted(read_ndjson(response), key=lambda line: line["index"])
+        assert [line["filename"] for line in lines] == ["first.pdf", "notes.txt", "second.pdf"]
+        assert [line["status_code"] for line in lines] == [200, 400, 200]
+        assert lines[0]["result"]["name"] == "Lipid Panel"
+        assert lines[0]["result"]["original_filename"] == "first.pdf"
+        assert lines[1]["detail"] == "File must be a PDF"
+        assert mock_chatgpt.call_count == 2
+
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_batch_reports_pipeline_errors_per_file(self, mock_chatgpt, chat_response):
+        """Test that a file failing in the AI step does not fail the whole batch"""
+        mock_chatgpt.return_value = chat_response("This is not valid JSON")
+
+        files = [("files", ("first.pdf", io.BytesIO(b"first pdf"), "application/pdf"))]
+
+        response = client.post("/parse-pdf/batch", files=files)
+
+        assert response.status_code == 200
+        [line] = read_ndjson(response)
+        assert line["status_code"] == 400
+        assert "Failed to parse JSON response" in line["detail"]
+
+    @patch("controllers.appointments.MAX_BATCH_FILES", 1)
+    def test_too_many_files(self):
+        """Test that batches above the file limit are rejected upfront"""
+        files = [
+            ("files", ("first.pdf", io.BytesIO(b"first pdf"), "application/pdf")),
+            ("files", ("second.pdf", io.BytesIO(b"second pdf"), "application/pdf")),
+        ]
+
+        response = client.post("/parse-pdf/batch", files=files)
+
+        assert response.status_code == 413
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,154 @@
+import hashlib
+import io
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services import blob_store as blob_store_module
+from services.blob_store import (
+    BlobNotFoundError,
+    LocalBlobStore,
+    RangeNotSatisfiableError,
+    blob_store,
+    parse_range,
+)
+
+client = TestClient(app)
+
+
+def write_file(tmp_path, content: bytes):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(content)
+    return path, hashlib.sha256(content).hexdigest()
+
+
+class TestLocalBlobStore:
+    def test_put_stores_sharded_by_hash(self, tmp_path):
+        """Test that a blob is stored under a sharded content-addressed path"""
+        store = LocalBlobStore(tmp_path / "blobs")
+        source, sha256 = write_file(tmp_path, b"%PDF-1.4 report")
+
+        assert store.put(source, sha256) is True
+        assert store.path(sha256) == tmp_path / "blobs" / sha256[:2] / sha256[2:4] / sha256
+        assert store.path(sha256).read_bytes() == b"%PDF-1.4 report"
+
+    def test_identical_content_is_stored_once(self, tmp_path):
+        """Test that putting the same content again is deduplicated"""
+        store = LocalBlobStore(tmp_path / "blobs")
+        source, sha256 = write_file(tmp_path, b"%PDF-1.4 report")
+
+        store.put(source, sha256)
+        assert store.put(source, sha256) is False
+        assert store.stats() == {"stored": 1, "deduplicated": 1}
+        assert len([path for path in (tmp_path / "blobs").rglob("*") if path.is_file()]) == 1
+
+    def test_missing_and_invalid_hashes(self, tmp_path):
+        """Test that unknown hashes raise and non-hash keys are rejected"""
+        store = LocalBlobStore(tmp_path / "blobs")
+        with pytest.raises(BlobNotFoundError):
+            store.path("0" * 64)
+        with pytest.raises(ValueError):
+            store.path("../../etc/passwd")
+
+
+class TestParseRange:
+    @pytest.mark.parametrize(
+        ("header", "expected"),
+        [
+            (None, None),
+            ("bytes=0-9", (0, 9)),
+            ("bytes=90-", (90, 99)),
+            ("bytes=-10", (90, 99)),
+            ("bytes=95-200", (95, 99)),
+            ("bytes=0-1,5-6", None),
+            ("items=0-1", None),
+        ],
+    )
+    def test_ranges(self, header, expected):
+        """Test parsing of single byte ranges against a 100 byte file"""
+        assert parse_range(header, 100) == expected
+
+    def test_unsatisfiable_range(self):
+        """Test that a range starting after the end of the file is rejected"""
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_range("bytes=100-", 100)
+
+
+class TestFileDownload:
+    @pytest.fixture
+    def appointment(self, mock_pdf_reader, mock_chatgpt):
+        """A parsed appointment stored through POST /parse-pdf"""
+        content = b"%PDF-1.4 " + bytes(range(256)) * 8
+        response = client.post(
+            "/parse-pdf",
+            files={"file": ("wyniki badań.pdf", io.BytesIO(content), "application/pdf")},
+        )
+        assert response.status_code == 200
+        assert mock_pdf_reader.called
+        assert mock_chatgpt.call_count == 1
+        return response.json()["id"], content
+
+    def test_full_download(self, appointment):
+        """Test that the stored PDF is downloaded with its content hash as ETag"""
+        appointment_id, content = appointment
+        response = client.get(f"/parsed-appointments/{appointment_id}/file")
+
+        assert response.status_code == 200
+        assert response.content == content
+        assert response.headers["content-type"] == "application/pdf"
+        assert response.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+        assert response.headers["accept-ranges"] == "bytes"
+        assert "filename*=UTF-8''wyniki%20bada%C5%84.pdf" in response.headers["content-disposition"]
+
+    def test_range_download(self, appointment):
+        """Test that a byte range is answered with 206 and only those bytes"""
+        appointment_id, content = appointment
+        response = client.get(
+            f"/parsed-appointments/{appointment_id}/file", headers={"Range": "bytes=9-18"}
+        )
+
+        assert response.status_code == 206
+        assert response.content == content[9:19]
+        assert response.headers["content-range"] == f"bytes 9-18/{len(content)}"
+
+    def test_unsatisfiable_range_download(self, appointment):
+        """Test that a range outside the file gets 416"""
+        appointment_id, content = appointment
+        response = client.get(
+            f"/parsed-appointments/{appointment_id}/file",
+            headers={"Range": f"bytes={len(content)}-"},
+        )
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+    def test_not_modified(self, appointment):
+        """Test that a matching If-None-Match gets 304"""
+        appointment_id, content = appointment
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        response = client.get(
+            f"/parsed-appointments/{appointment_id}/file", headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 304
+
+    def test_accel_redirect(self, appointment):
+        """Test that the file is handed to nginx when BLOB_ACCEL_REDIRECT_PREFIX is set"""
+        appointment_id, content = appointment
+        sha256 = hashlib.sha256(content).hexdigest()
+        with patch.object(blob_store_module, "BLOB_ACCEL_REDIRECT_PREFIX", "/protected-blobs/"):
+            response = client.get(f"/parsed-appointments/{appointment_id}/file")
+
+        assert response.headers["x-accel-redirect"] == f"/protected-blobs/{blob_store.key(sha256)}"
+        assert response.content == b""
+
+    def test_unknown_appointment(self):
+        """Test that downloading the file of an unknown appointment gets 404"""
+        response = client.get("/parsed-appointments/550e8400-e29b-41d4-a716-446655440000/file")
+        assert response.status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
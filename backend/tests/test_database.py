@@ -0,0 +1,239 @@
+import io
+import json
+import uuid
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from controllers.appointments import save_appointment, save_appointments
+from main import app
+from services import database
+from services.database import ParsedAppointment, SessionLocal, bulk_insert_appointments
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def parse_result(complete_data):
+    """Factory of process_upload results for a filename"""
+
+    def make(filename: str) -> dict:
+        return {**complete_data, "file_size": 1024, "original_filename": filename}
+
+    return make
+
+
+def stored(appointment_id: str) -> ParsedAppointment | None:
+    session = SessionLocal()
+    try:
+        return session.get(ParsedAppointment, uuid.UUID(appointment_id))
+    finally:
+        session.close()
+
+
+class TestDatabase:
+    def test_save_appointment(self, parse_result):
+        """Test that a parse result is stored with its server-side defaults"""
+        appointment_id = save_appointment(parse_result("single.pdf"))
+
+        appointment = stored(appointment_id)
+        assert appointment.original_filename == "single.pdf"
+        assert appointment.date.isoformat() == "2025-01-15"
+        assert appointment.processing_status == "completed"
+        assert appointment.created_at is not None
+
+    def test_save_appointments_in_chunks(self, parse_result):
+        """Test that bulk inserts store every row across several statements"""
+        results = [parse_result(f"bulk-{index}.pdf") for index in range(5)]
+        with patch.object(database, "DB_BULK_CHUNK_SIZE", 2):
+            ids = save_appointments(results)
+
+        assert len(set(ids)) == 5
+        assert [stored(appointment_id).original_filename for appointment_id in ids] == [
+            f"bulk-{index}.pdf" for index in range(5)
+        ]
+
+    def test_listing_index_matches_the_order(self):
+        """Test that the listing index is created in the (date DESC, id) order of the query"""
+        with database.engine.connect() as connection:
+            sql = connection.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE name = 'ix_parsed_appointments_date_id'"
+            ).scalar_one()
+
+        assert "(date DESC, id)" in sql
+
+
+class TestPersistence:
+    @pytest.mark.usefixtures("mock_pdf_reader", "mock_chatgpt")
+    def test_parsed_upload_is_stored(self):
+        """Test that a parsed upload is stored under the returned id"""
+
+        response = client.post(
+            "/parse-pdf", files={"file": ("stored.pdf", io.BytesIO(b"stored"), "application/pdf")}
+        )
+        assert response.status_code == 200
+        appointment_id = response.json()["id"]
+
+        appointment = stored(appointment_id)
+        assert appointment.original_filename == "stored.pdf"
+        assert appointment.confidence_score == 90
+
+    @pytest.mark.usefixtures("mock_pdf_reader", "mock_chatgpt")
+    def test_batch_results_are_stored(self):
+        """Test that every parsed file of a batch is stored and carries its id"""
+        files = [
+            ("files", ("batch-a.pdf", io.BytesIO(b"batch a"), "application/pdf")),
+            ("files", ("batch-b.pdf", io.BytesIO(b"batch b"), "application/pdf")),
+        ]
+
+        response = client.post("/parse-pdf/batch", files=files)
+
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        for line in lines:
+            assert stored(line["result"]["id"]).original_filename == line["filename"]
+
+    @pytest.mark.usefixtures("mock_pdf_reader", "mock_chatgpt")
+    @patch("controllers.appointments.save_appointments", side_effect=RuntimeError("db down"))
+    def test_batch_storage_failure(self, mock_save):
+        """Test that files whose result could not be stored are reported as failed"""
+        files = [("files", ("lost.pdf", io.BytesIO(b"lost"), "application/pdf"))]
+
+        response = client.post("/parse-pdf/batch", files=files)
+
+        [line] = [json.loads(line) for line in response.text.splitlines() if line]
+        assert line["status_code"] == 500
+        assert line["detail"] == "Failed to store parsed appointment"
+        assert "result" not in line
+        mock_save.assert_called_once()
+
+
+@pytest.fixture
+def family_appointments(parse_result):
+    """Five appointments of a new family member, two of them on the same day"""
+    family_member_id = uuid.uuid4()
+    rows = [
+        {
+            **appointment_row,
+            "family_member_id": family_member_id,
+            "date": date.fromisoformat(appointment_row["date"]),
+        }
+        for appointment_row in (
+            {**parse_result("a.pdf"), "date": "2025-01-10"},
+            {**parse_result("b.pdf"), "date": "2025-03-01", "appointment_type": "Dental"},
+            {**parse_result("c.pdf"), "date": "2025-02-01"},
+            {**parse_result("d.pdf"), "date": "2025-03-01"},
+            {**parse_result("e.pdf"), "date": "2024-12-24", "appointment_type": "Dental"},
+        )
+    ]
+    session = SessionLocal()
+    try:
+        ids = bulk_insert_appointments(session, rows)
+        session.commit()
+    finally:
+        session.close()
+    expected = sorted(zip(rows, ids, strict=True), key=lambda item: (item[0]["date"], -item[1].int))
+    return str(family_member_id), [
+        str(appointment_id) for _row, appointment_id in reversed(expected)
+    ]
+
+
+class TestParsedAppointmentsPagination:
+    def test_pages_follow_cursor(self, family_appointments):
+        """Test that following X-Next-Cursor returns every row once in (date DESC, id) order"""
+        family_member_id, expected_ids = family_appointments
+        params = {"family_member_id": family_member_id, "limit": 2}
+        seen = []
+        pages = 0
+        while True:
+            response = client.get("/parsed-appointments", params=params)
+            assert response.status_code == 200
+            seen.extend(item["id"] for item in response.json())
+            pages += 1
+            if "x-next-cursor" not in response.headers:
+                break
+            assert 'rel="next"' in response.headers["link"]
+            params["cursor"] = response.headers["x-next-cursor"]
+
+        assert seen == expected_ids
+        assert pages == 3
+
+    def test_filters(self, family_appointments):
+        """Test filtering by appointment type and date range"""
+        family_member_id, _expected_ids = family_appointments
+        response = client.get(
+            "/parsed-appointments",
+            params={
+                "family_member_id": family_member_id,
+                "appointment_type": "Dental",
+                "date_from": "2025-01-01",
+                "date_to": "2025-12-31",
+            },
+        )
+
+        assert [item["original_filename"] for item in response.json()] == ["b.pdf"]
+
+    def test_field_projection(self, family_appointments):
+        """Test that only the requested fields are returned"""
+        family_member_id, _expected_ids = family_appointments
+        response = client.get(
+            "/parsed-appointments",
+            params={"family_member_id": family_member_id, "fields": "id,name,date"},
+        )
+
+        assert {tuple(sorted(item)) for item in response.json()} == {("date", "id", "name")}
+
+    def test_invalid_parameters(self):
+        """Test that unknown or no fields and malformed cursors are rejected"""
+        assert client.get("/parsed-appointments", params={"fields": "secret"}).status_code == 400
+        assert client.get("/parsed-appointments", params={"fields": ""}).status_code == 400
+        assert client.get("/parsed-appointments", params={"fields": ","}).status_code == 400
+        assert client.get("/parsed-appointments", params={"cursor": "bm9wZQ"}).status_code == 400
+
+    def test_openapi_documents_the_projection(self):
+        """Test that the schema allows the partial items returned for a field selection"""
+        operation = app.openapi()["paths"]["/parsed-appointments"]["get"]
+
+        schema = operation["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema["items"]["$ref"].endswith("/ParsedAppointmentFields")
+        assert not app.openapi()["components"]["schemas"]["ParsedAppointmentFields"].get("required")
+        assert "304" in operation["responses"]
+
+    def test_unchanged_page_is_not_modified(self, family_appointments, parse_result):
+        """Test that a matching If-None-Match gets 304 until the page changes"""
+        family_member_id, _expected_ids = family_appointments
+        params = {"family_member_id": family_member_id}
+        etag = client.get("/parsed-appointments", params=params).headers["etag"]
+
+        response = client.get(
+            "/parsed-appointments", params=params, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+        session = SessionLocal()
+        try:
+            bulk_insert_appointments(
+                session,
+                [
+                    {
+                        **parse_result("new.pdf"),
+                        "date": date(2025, 6, 1),
+                        "family_member_id": uuid.UUID(family_member_id),
+                    }
+                ],
+            )
+            session.commit()
+        finally:
+            session.close()
+
+        response = client.get(
+            "/parsed-appointments", params=params, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.json()[0]["original_filename"] == "new.pdf"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
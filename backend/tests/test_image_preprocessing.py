@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from services import image_preprocessing
+from services.image_preprocessing import is_blank, line_height, otsu_threshold, prepare
+
+PAGE_SIZE = (2480, 3508)  # A4 at 300 DPI
+
+
+def page_with_lines(line_height_px: int, lines: int = 10, paper: int = 235, ink: int = 20):
+    """A grayscale page with text lines drawn as bars of the given height, 2.5x apart"""
+    page = Image.new("L", PAGE_SIZE, paper)
+    draw = ImageDraw.Draw(page)
+    for index in range(lines):
+        top = 400 + index * int(line_height_px * 2.5)
+        draw.rectangle((300, top, 1799, top + line_height_px - 1), fill=ink)
+    return page
+
+
+class TestBlankPages:
+    def test_empty_page_is_blank(self):
+        """Test that an empty scan is detected as blank"""
+        assert is_blank(Image.new("L", PAGE_SIZE, 230))
+
+    def test_show_through_is_blank(self):
+        """Test that faint text showing through from the back side does not count as ink"""
+        page = page_with_lines(40, paper=235, ink=190)
+
+        assert is_blank(page)
+
+    def test_single_text_line_is_not_blank(self):
+        """Test that a page with one short line of text is OCRed"""
+        page = Image.new("L", PAGE_SIZE, 235)
+        ImageDraw.Draw(page).rectangle((300, 400, 1000, 430), fill=20)
+
+        assert not is_blank(page)
+
+    def test_dark_page_is_not_blank(self):
+        """Test that pages with a dark background are never skipped"""
+        assert not is_blank(Image.new("L", PAGE_SIZE, 30))
+
+
+class TestPrepare:
+    def test_page_is_cropped_to_its_ink_and_binarized(self):
+        """Test that margins are cut to CROP_MARGIN and only black and white pixels remain"""
+        prepared = prepare(page_with_lines(40, lines=2).convert("RGB"))
+
+        margin = image_preprocessing.CROP_MARGIN
+        assert prepared.mode == "L"
+        assert prepared.size == (1500 + 2 * margin, 140 + 2 * margin)
+        assert set(np.unique(np.asarray(prepared))) == {0, 255}
+
+    def test_large_text_is_scaled_down(self):
+        """Test that pages with large text are downscaled to the target line height"""
+        prepared = prepare(page_with_lines(80, lines=2))
+
+        assert line_height(np.asarray(prepared) == 0) == pytest.approx(40, abs=2)
+
+    def test_small_text_is_scaled_up_within_bounds(self):
+        """Test that small text is upscaled, at most by MAX_SCALE"""
+        prepared = prepare(page_with_lines(10, lines=2))
+
+        assert line_height(np.asarray(prepared) == 0) == pytest.approx(20, abs=2)
+
+    def test_dark_page_is_left_alone(self):
+        """Test that dark pages are returned unchanged in grayscale"""
+        page = Image.new("L", (100, 100), 30)
+
+        assert np.array_equal(np.asarray(prepare(page)), np.asarray(page))
+
+
+class TestHelpers:
+    def test_line_height_ignores_rules(self):
+        """Test that thin horizontal rules do not count as text lines"""
+        ink = np.zeros((500, 1000), dtype=bool)
+        ink[100:130, :] = True
+        ink[200:230, :] = True
+        ink[300:302, :] = True  # table rule
+
+        assert line_height(ink) == 30
+
+    def test_otsu_threshold_separates_text_from_paper(self):
+        """Test that the threshold falls between the ink and paper brightness"""
+        histogram = [0] * 256
+        histogram[20] = 1_000
+        histogram[235] = 50_000
+
+        assert 20 <= otsu_threshold(histogram) < 235
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,151 @@
+import asyncio
+import io
+import time
+from unittest.mock import Mock
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from main import app
+from services.jobs import COMPLETED, DEAD_LETTER, FAILED, JobQueue
+from services.upload import SpooledUpload
+
+
+def make_upload(tmp_path, content: bytes = b"pdf") -> SpooledUpload:
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(content)
+    return SpooledUpload(path=path, size=len(content), sha256="0" * 64)
+
+
+async def wait_for_status(queue: JobQueue, job_id: str, statuses: set[str]) -> dict:
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job stayed in status {job['status']}")
+
+
+class TestJobQueue:
+    @pytest.mark.asyncio
+    async def test_completed_job_stores_result(self, tmp_path):
+        """Test that a successful job is completed with the handler result"""
+        queue = JobQueue(tmp_path / "jobs", workers=1, max_attempts=3, retry_backoff=0)
+
+        async def handler(upload, filename):
+            return {"filename": filename, "size": upload.size}
+
+        await queue.start(handler)
+        try:
+            job_id = await queue.submit(make_upload(tmp_path), "report.pdf")
+            job = await wait_for_status(queue, job_id, {COMPLETED})
+        finally:
+            await queue.stop()
+
+        assert job["result"] == {"filename": "report.pdf", "size": 3}
+        assert job["attempts"] == 1
+        # The spooled PDF is removed once the job is finished
+        assert not list((tmp_path / "jobs").glob("*.pdf"))
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self, tmp_path):
+        """Test that a 4xx error fails the job without retrying"""
+        queue = JobQueue(tmp_path / "jobs", workers=1, max_attempts=3, retry_backoff=0)
+        handler = Mock(side_effect=HTTPException(status_code=400, detail="Low confidence"))
+
+        async def async_handler(upload, filename):
+            return handler(upload, filename)
+
+        await queue.start(async_handler)
+        try:
+            job_id = await queue.submit(make_upload(tmp_path), "report.pdf")
+            job = await wait_for_status(queue, job_id, {FAILED})
+        finally:
+            await queue.stop()
+
+        assert job["error"] == {"status_code": 400, "detail": "Low confidence"}
+        assert handler.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried_then_dead_lettered(self, tmp_path):
+        """Test that 5xx errors are retried up to max_attempts and then dead-lettered"""
+        queue = JobQueue(
+            tmp_path / "jobs", workers=1, max_attempts=3, retry_backoff=0, poll_interval=0.01
+        )
+        calls = 0
+
+        async def handler(_upload, _filename):
+            nonlocal calls
+            calls += 1
+            raise RuntimeError("AI service unavailable")
+
+        await queue.start(handler)
+        try:
+            job_id = await queue.submit(make_upload(tmp_path), "report.pdf")
+            job = await wait_for_status(queue, job_id, {DEAD_LETTER})
+            metrics = await queue.metrics()
+        finally:
+            await queue.stop()
+
+        assert calls == 3
+        assert job["attempts"] == 3
+        assert job["error"]["status_code"] == 500
+        assert metrics["dead_letter"] == 1
+        assert metrics["depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_interrupted_jobs_are_requeued_on_start(self, tmp_path):
+        """Test that jobs left processing by a stopped worker run again after a restart"""
+        queue = JobQueue(tmp_path / "jobs", workers=1, max_attempts=3, retry_backoff=0)
+        job_id = await queue.submit(make_upload(tmp_path), "report.pdf")
+        # Simulate a crash right after a worker claimed the job
+        await asyncio.to_thread(queue._claim)
+
+        async def handler(_upload, _filename):
+            return {"ok": True}
+
+        await queue.start(handler)
+        try:
+            job = await wait_for_status(queue, job_id, {COMPLETED})
+        finally:
+            await queue.stop()
+
+        assert job["attempts"] == 2
+
+
+class TestParsePdfAsync:
+    @pytest.mark.usefixtures("mock_pdf_reader", "mock_chatgpt")
+    def test_submit_and_poll(self):
+        """Test that async parsing returns a job id and the result can be polled"""
+        with TestClient(app) as client:
+            files = {"file": ("test.pdf", io.BytesIO(b"async pdf content"), "application/pdf")}
+            response = client.post("/parse-pdf?async=true", files=files)
+
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+            assert response.json()["status_url"] == f"/jobs/{job_id}"
+
+            for _ in range(200):
+                job = client.get(f"/jobs/{job_id}").json()
+                if job["status"] == COMPLETED:
+                    break
+                time.sleep(0.01)
+
+            assert job["status"] == COMPLETED
+            assert job["result"]["name"] == "Lipid Panel"
+            assert job["result"]["original_filename"] == "test.pdf"
+
+            metrics = client.get("/jobs/metrics").json()
+            assert metrics["completed"] >= 1
+            assert metrics["workers"] > 0
+
+    def test_unknown_job(self):
+        """Test polling a job that does not exist - should return 404 error"""
+        response = TestClient(app).get("/jobs/does-not-exist")
+
+        assert response.status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,112 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+from unittest.mock import patch
+
+import pytest
+
+from services.llm_client import create_http_client, create_openai_client
+
+COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 1700000000,
+    "model": "gpt-4o-mini",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": '{"summary": "ok"}'},
+            "finish_reason": "stop",
+        }
+    ],
+}
+
+
+class ChatCompletionsStub(BaseHTTPRequestHandler):
+    """Mimics POST /v1/chat/completions; fails with the queued status codes first."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    failures: ClassVar[list[int]] = []
+    requests: ClassVar[list[tuple[str, int]]] = []
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.rfile.read(length)
+        type(self).requests.append((self.path, self.client_address[1]))
+
+        if type(self).failures:
+            status, body = type(self).failures.pop(0), {"error": {"message": "Slow down"}}
+        else:
+            status, body = 200, COMPLETION
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("retry-after-ms", "10")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    ChatCompletionsStub.failures = []
+    ChatCompletionsStub.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatCompletionsStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def create_completion(client):
+    return client.chat.completions.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}]
+    )
+
+
+class TestLLMClient:
+    def test_connections_are_reused(self, stub_server):
+        """Test that consecutive calls reuse one keep-alive connection"""
+        client = create_openai_client("test-key", base_url=stub_server)
+        try:
+            for _ in range(3):
+                response = create_completion(client)
+        finally:
+            client.close()
+
+        assert response.choices[0].message.content == '{"summary": "ok"}'
+        paths = {path for path, _port in ChatCompletionsStub.requests}
+        ports = {port for _path, port in ChatCompletionsStub.requests}
+        assert paths == {"/v1/chat/completions"}
+        assert len(ports) == 1
+
+    def test_rate_limits_and_server_errors_are_retried(self, stub_server):
+        """Test that 429 and 5xx responses are retried before succeeding"""
+        ChatCompletionsStub.failures = [429, 503]
+        client = create_openai_client("test-key", base_url=stub_server, max_retries=2)
+        try:
+            response = create_completion(client)
+        finally:
+            client.close()
+
+        assert response.id == "chatcmpl-test"
+        assert len(ChatCompletionsStub.requests) == 3
+
+    def test_http2_falls_back_without_h2(self):
+        """Test that HTTP/2 is disabled when the h2 package is missing"""
+        with patch("services.llm_client.importlib.util.find_spec", return_value=None):
+            http_client = create_http_client(http2=True)
+
+        try:
+            assert http_client._transport._pool._http2 is False
+        finally:
+            http_client.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
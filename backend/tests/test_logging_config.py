@@ -0,0 +1,166 @@
+import io
+import json
+import logging
+import queue
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from main import app
+from services import logging_config
+from services.logging_config import (
+    JsonFormatter,
+    RequestContextFilter,
+    _DeferredQueueHandler,
+    configure_logging,
+    debug_sampled_var,
+    redact,
+    request_id_var,
+    shutdown_logging,
+    start_request,
+)
+
+client = TestClient(app)
+
+
+def make_record(level=logging.INFO, msg="Parsed %s", args=("report",), **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestRequestContext:
+    def test_start_request_binds_id_and_sampling(self):
+        """Test that start_request sets the correlation id and the debug sampling decision"""
+        with patch.object(logging_config, "LOG_DEBUG_SAMPLE_RATE", 1.0):
+            assert start_request("abc") == "abc"
+        assert request_id_var.get() == "abc"
+        assert debug_sampled_var.get() is True
+
+        with patch.object(logging_config, "LOG_DEBUG_SAMPLE_RATE", 0.0):
+            generated = start_request()
+        assert len(generated) == 32
+        assert debug_sampled_var.get() is False
+
+    def test_filter_drops_unsampled_debug(self):
+        """Test that DEBUG records are kept only for sampled requests"""
+        log_filter = RequestContextFilter()
+        with patch.object(logging_config, "LOG_DEBUG_SAMPLE_RATE", 0.0):
+            start_request("unsampled")
+        assert log_filter.filter(make_record(logging.DEBUG)) is False
+
+        info = make_record(logging.INFO)
+        assert log_filter.filter(info) is True
+        assert info.request_id == "unsampled"
+
+        with patch.object(logging_config, "LOG_DEBUG_SAMPLE_RATE", 1.0):
+            start_request("sampled")
+        assert log_filter.filter(make_record(logging.DEBUG)) is True
+
+    def test_keep_all_debug(self):
+        """Test that LOG_LEVEL=DEBUG keeps every DEBUG record"""
+        with patch.object(logging_config, "LOG_DEBUG_SAMPLE_RATE", 0.0):
+            start_request()
+        assert RequestContextFilter(keep_all_debug=True).filter(make_record(logging.DEBUG))
+
+
+class TestFormatting:
+    def test_json_formatter(self):
+        """Test that records are formatted as JSON with the request id and extra fields"""
+        record = make_record(request_id="abc", pages=3)
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["message"] == "Parsed report"
+        assert entry["level"] == "INFO"
+        assert entry["request_id"] == "abc"
+        assert entry["pages"] == 3
+
+    def test_redact_hides_content(self):
+        """Test that redacted values only show their length unless LOG_REDACT=false"""
+        record = make_record(args=(redact("Jan Kowalski badanie.pdf"),))
+        assert record.getMessage() == "Parsed <redacted 24 chars>"
+
+        with patch.object(logging_config, "LOG_REDACT", False):
+            assert record.getMessage() == "Parsed Jan Kowalski badanie.pdf"
+
+    def test_queue_handler_defers_formatting(self):
+        """Test that records are queued without formatting the message"""
+        handler = _DeferredQueueHandler(queue.Queue(1))
+        record = make_record()
+        handler.emit(record)
+
+        queued = handler.queue.get_nowait()
+        assert queued.msg == "Parsed %s"
+        assert queued.args == ("report",)
+
+    def test_full_queue_drops_records(self):
+        """Test that a full queue drops records instead of blocking"""
+        handler = _DeferredQueueHandler(queue.Queue(1))
+        handler.emit(make_record())
+        handler.emit(make_record())
+        assert handler.queue.qsize() == 1
+
+
+class TestConfigureLogging:
+    def test_records_are_written_as_json(self):
+        """Test that configured logging writes JSON lines from the listener thread"""
+        stream = io.StringIO()
+        try:
+            configure_logging(stream)
+            start_request("configured")
+            logging.getLogger("test").warning("Job %s failed", "42")
+            shutdown_logging()
+        finally:
+            configure_logging()
+
+        entry = json.loads(stream.getvalue().splitlines()[-1])
+        assert entry["message"] == "Job 42 failed"
+        assert entry["request_id"] == "configured"
+
+
+class TestRequestIdMiddleware:
+    def test_request_id_is_echoed(self):
+        """Test that a supplied X-Request-ID is returned in the response"""
+        response = client.get("/metrics", headers={"X-Request-ID": "frontend-123"})
+        assert response.headers["x-request-id"] == "frontend-123"
+
+    def test_request_id_is_generated(self):
+        """Test that a request id is generated when none is supplied"""
+        response = client.get("/metrics")
+        assert len(response.headers["x-request-id"]) == 32
+
+
+class TestParseLogs:
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_invalid_appointment_data_is_logged_without_values(
+        self, mock_chatgpt, chat_response, complete_data, caplog
+    ):
+        """Test that a rejected field is logged by name, not with the value from the document"""
+
+        class NumericName(BaseModel):
+            name: int
+
+        mock_chatgpt.return_value = chat_response(
+            json.dumps({**complete_data, "name": "Kowalski Jan cardiology"})
+        )
+
+        files = {"file": ("test.pdf", io.BytesIO(b"logged pdf content"), "application/pdf")}
+        with (
+            patch("controllers.appointments.AppointmentData", NumericName),
+            caplog.at_level("ERROR", logger="controllers.appointments"),
+        ):
+            assert client.post("/parse-pdf", files=files).status_code == 400
+
+        message = next(
+            record.getMessage()
+            for record in caplog.records
+            if record.getMessage().startswith("Failed to build appointment data")
+        )
+        assert "1 invalid fields (name)" in message
+        assert "Kowalski" not in message
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
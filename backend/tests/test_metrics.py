@@ -0,0 +1,112 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services import metrics
+from services.metrics import STAGE_SECONDS, collect_spans, record_spans, span
+
+client = TestClient(app)
+
+
+def stage_count(stage: str) -> float:
+    for sample in STAGE_SECONDS.collect()[0].samples:
+        if sample.name.endswith("_count") and sample.labels["stage"] == stage:
+            return sample.value
+    return 0.0
+
+
+class TestStageMetrics:
+    def test_span_observes_histogram(self):
+        """Test that a span records one observation for its stage"""
+        before = stage_count("test_span")
+        with span("test_span"):
+            pass
+        assert stage_count("test_span") == before + 1
+
+    def test_span_records_on_error(self):
+        """Test that a span is recorded when the block raises"""
+        before = stage_count("test_error")
+        with pytest.raises(RuntimeError), span("test_error"):
+            raise RuntimeError("boom")
+        assert stage_count("test_error") == before + 1
+
+    def test_disabled_metrics_record_nothing(self):
+        """Test that METRICS_ENABLED=false turns span into a no-op"""
+        before = stage_count("test_disabled")
+        with patch.object(metrics, "METRICS_ENABLED", False), span("test_disabled"):
+            pass
+        assert stage_count("test_disabled") == before
+
+    def test_collect_spans_in_main_process(self):
+        """Test that collect_spans records directly when not in a worker process"""
+        before = stage_count("test_collect")
+
+        def work(value):
+            with span("test_collect"):
+                return value * 2
+
+        # The app process is itself a child process under uvicorn --reload or --workers
+        with patch("multiprocessing.parent_process", return_value=Mock()):
+            result, spans, _peak_rss = collect_spans(work, 21)
+        assert (result, spans) == (42, [])
+        assert stage_count("test_collect") == before + 1
+
+    def test_collect_spans_in_worker_process(self):
+        """Test that collect_spans buffers spans in a worker and record_spans replays them"""
+        before = stage_count("test_worker")
+
+        def work():
+            with span("test_worker"):
+                return "done"
+
+        with patch("services.metrics._in_worker_process", True):
+            result, spans, _peak_rss = collect_spans(work)
+
+        assert result == "done"
+        assert [stage for stage, _start, _duration in spans] == ["test_worker"]
+        assert stage_count("test_worker") == before
+
+        record_spans(spans)
+        assert stage_count("test_worker") == before + 1
+
+    def test_collect_spans_measures_the_peak_rss_of_the_task(self):
+        """Test that a worker reports how far its task raised the peak resident memory"""
+        size = 64 * 1024 * 1024
+
+        def work():
+            # Written, so the pages are resident
+            return len(b"x" * size)
+
+        with patch("services.metrics._in_worker_process", True):
+            _result, _spans, peak_rss = collect_spans(work)
+            _result, _spans, second_peak_rss = collect_spans(work)
+
+        assert peak_rss >= size * 0.9
+        # The peak is reset before each task, so a later task is not hidden by an earlier one
+        assert second_peak_rss >= size * 0.9
+
+
+class TestMetricsEndpoint:
+    @pytest.mark.usefixtures("mock_chatgpt")
+    def test_metrics_include_parse_stages(self, mock_pdf_reader):
+        """Test that /metrics exposes stage timings after a parse"""
+        mock_pdf_reader.return_value.pages[
+            0
+        ].extract_text.return_value = "Mock PDF content for metrics"
+
+        response = client.post(
+            "/parse-pdf", files={"file": ("metrics.pdf", b"metrics pdf", "application/pdf")}
+        )
+        assert response.status_code == 200
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        for stage in ("read", "extract", "text_layer", "prompt_build", "llm_call", "validation"):
+            assert f'pdf_parse_stage_seconds_count{{stage="{stage}"}}' in response.text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
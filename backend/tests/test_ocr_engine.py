@@ -0,0 +1,140 @@
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from services import ocr_engine
+from services.ocr_engine import PytesseractEngine, TesserocrEngine, create_engine
+
+
+def fake_tesserocr(orientation=None, recognize=None):
+    """A tesserocr module whose handles return orientation from DetectOrientationScript"""
+    handles = []
+
+    def create_handle(**kwargs):
+        handle = MagicMock()
+        handle.kwargs = kwargs
+        handle.DetectOrientationScript.return_value = orientation
+        handle.GetUTF8Text.side_effect = recognize or (lambda: f"text in {kwargs['lang']}")
+        handles.append(handle)
+        return handle
+
+    module = SimpleNamespace(
+        PyTessBaseAPI=MagicMock(side_effect=create_handle),
+        PSM=SimpleNamespace(OSD_ONLY=0),
+    )
+    return module, handles
+
+
+class TestCreateEngine:
+    def test_auto_without_tesserocr_uses_pytesseract(self):
+        """Test that auto falls back to pytesseract when tesserocr is not installed"""
+        with patch("services.ocr_engine.tesserocr", None):
+            assert isinstance(create_engine("auto", "pol+eng"), PytesseractEngine)
+
+    def test_auto_prefers_warm_tesserocr(self):
+        """Test that auto selects tesserocr and loads the OSD and language handles up front"""
+        module, handles = fake_tesserocr()
+        with patch("services.ocr_engine.tesserocr", module):
+            engine = create_engine("auto", "pol+eng")
+
+        assert isinstance(engine, TesserocrEngine)
+        assert sorted(handle.kwargs["lang"] for handle in handles) == ["osd", "pol+eng"]
+
+    def test_auto_falls_back_when_models_are_missing(self):
+        """Test that auto uses pytesseract when tesserocr cannot load the traineddata"""
+        module = SimpleNamespace(
+            PyTessBaseAPI=MagicMock(side_effect=RuntimeError("Failed to init API")),
+            PSM=SimpleNamespace(OSD_ONLY=0),
+        )
+        with patch("services.ocr_engine.tesserocr", module):
+            assert isinstance(create_engine("auto", "pol+eng"), PytesseractEngine)
+
+    def test_forced_tesserocr_must_be_installed(self):
+        """Test that OCR_ENGINE=tesserocr fails loudly instead of falling back"""
+        with (
+            patch("services.ocr_engine.tesserocr", None),
+            pytest.raises(RuntimeError, match="not installed"),
+        ):
+            create_engine("tesserocr", "pol+eng")
+
+    def test_unknown_engine(self):
+        """Test that an unknown OCR_ENGINE value is rejected"""
+        with pytest.raises(ValueError, match="Unknown OCR_ENGINE"):
+            create_engine("easyocr", "pol+eng")
+
+
+class TestTesserocrEngine:
+    @pytest.mark.parametrize(("orient_deg", "rotation"), [(0, 0), (90, 270), (180, 180), (270, 90)])
+    def test_orientation_is_the_rotation_that_makes_the_page_upright(self, orient_deg, rotation):
+        """Test that DetectOrientationScript results use the same convention as tesseract OSD"""
+        module, _handles = fake_tesserocr({"orient_deg": orient_deg, "orient_conf": 10.0})
+        with patch("services.ocr_engine.tesserocr", module):
+            engine = TesserocrEngine()
+            assert engine.detect_orientation(Image.new("L", (100, 200))) == rotation
+
+    def test_too_little_text_assumes_upright(self):
+        """Test that a page without a detectable orientation is not rotated"""
+        module, _handles = fake_tesserocr(None)
+        with patch("services.ocr_engine.tesserocr", module):
+            assert TesserocrEngine().detect_orientation(Image.new("L", (100, 200))) == 0
+
+    def test_handles_are_reused_per_language_set(self):
+        """Test that models are loaded once per language set, not once per page"""
+        module, handles = fake_tesserocr()
+        image = Image.new("L", (100, 200))
+        with patch("services.ocr_engine.tesserocr", module):
+            engine = TesserocrEngine()
+            texts = [engine.image_to_string(image, "pol+eng") for _ in range(5)]
+            engine.image_to_string(image, "eng")
+
+        assert texts == ["text in pol+eng"] * 5
+        assert [handle.kwargs["lang"] for handle in handles] == ["pol+eng", "eng"]
+        # The page image is released after every page
+        assert handles[0].Clear.call_count == 5
+
+    def test_concurrent_pages_get_separate_handles(self):
+        """Test that a handle is never used by two threads at once"""
+        started = threading.Barrier(3)
+
+        def wait_for_others():
+            started.wait(timeout=5)
+            return "text"
+
+        module, handles = fake_tesserocr(recognize=wait_for_others)
+        with patch("services.ocr_engine.tesserocr", module):
+            engine = TesserocrEngine()
+            threads = [
+                threading.Thread(
+                    target=engine.image_to_string, args=(Image.new("L", (10, 10)), "pol+eng")
+                )
+                for _ in range(3)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        # All three recognitions were in flight together, so a handle per thread was needed
+        assert not started.broken
+        assert len(handles) == 3
+
+
+class TestGetEngine:
+    def test_engine_is_selected_once_per_process(self):
+        """Test that the engine is created on first use and then reused"""
+        with (
+            patch("services.ocr_engine._engine", None),
+            patch("services.ocr_engine.create_engine", return_value=PytesseractEngine()) as create,
+        ):
+            first = ocr_engine.get_engine("pol+eng")
+            second = ocr_engine.get_engine("pol+eng")
+
+        assert first is second
+        create.assert_called_once_with(ocr_engine.OCR_ENGINE, "pol+eng")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,148 @@
+import io
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from controllers.appointments import EXTRACTION_FINGERPRINT, PROMPT_FINGERPRINT
+from main import app
+from services.parse_cache import ParseCache, hash_bytes
+from services.pdf_extraction import extraction_fingerprint
+
+client = TestClient(app)
+
+
+class TestParseCache:
+    def test_text_and_result_round_trip(self, tmp_path):
+        """Test storing and reading extracted text and parsed results"""
+        cache = ParseCache(tmp_path, max_bytes=1024 * 1024)
+        pdf_hash = hash_bytes(b"pdf")
+
+        assert cache.get_text(pdf_hash, "x1") is None
+        cache.set_text(pdf_hash, "x1", "Wynik badania")
+        cache.set_result(pdf_hash, "v1", {"name": "Report"})
+
+        assert cache.get_text(pdf_hash, "x1") == "Wynik badania"
+        assert cache.get_result(pdf_hash, "v1") == {"name": "Report"}
+        assert cache.get_result(pdf_hash, "v2") is None
+
+        stats = cache.stats()
+        assert stats["text_hits"] == 1
+        assert stats["text_misses"] == 1
+        assert stats["result_hits"] == 1
+        assert stats["result_misses"] == 1
+
+    def test_entries_survive_restart(self, tmp_path):
+        """Test that a new cache instance picks up entries already on disk"""
+        ParseCache(tmp_path, max_bytes=1024 * 1024).set_text("ab" * 32, "x1", "text")
+
+        cache = ParseCache(tmp_path, max_bytes=1024 * 1024)
+        # The directory is not scanned on construction
+        assert cache.stats()["entries"] == 0
+
+        assert cache.get_text("ab" * 32, "x1") == "text"
+        assert cache.stats()["entries"] == 1
+
+    def test_lru_eviction(self, tmp_path):
+        """Test that the least recently used entry is evicted when over the size limit"""
+        entry_size = len(json.dumps({"text": "x" * 100}))
+        cache = ParseCache(tmp_path, max_bytes=entry_size * 2)
+
+        cache.set_text("aa" * 32, "x1", "x" * 100)
+        cache.set_text("bb" * 32, "x1", "x" * 100)
+        # Touch the first entry so the second one becomes least recently used
+        cache.get_text("aa" * 32, "x1")
+        cache.set_text("cc" * 32, "x1", "x" * 100)
+
+        assert cache.get_text("aa" * 32, "x1") is not None
+        assert cache.get_text("bb" * 32, "x1") is None
+        assert cache.get_text("cc" * 32, "x1") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_results_keeps_text(self, tmp_path):
+        """Test that invalidating stale results keeps extracted text and current results"""
+        cache = ParseCache(tmp_path, max_bytes=1024 * 1024)
+        cache.set_text("aa" * 32, "x1", "text")
+        cache.set_result("aa" * 32, "old", {"name": "Old"})
+        cache.set_result("aa" * 32, "new", {"name": "New"})
+
+        removed = cache.invalidate_results(keep_fingerprint="new")
+
+        assert removed == 1
+        assert cache.get_result("aa" * 32, "old") is None
+        assert cache.get_result("aa" * 32, "new") == {"name": "New"}
+        assert cache.get_text("aa" * 32, "x1") == "text"
+
+    def test_invalidate_text_of_other_extractors(self, tmp_path):
+        """Test that text from another extractor (or the layout without one) is dropped"""
+        legacy = tmp_path / "text" / "aa" / f"{'aa' * 32}.json"
+        legacy.parent.mkdir(parents=True)
+        legacy.write_text(json.dumps({"text": "old layout"}))
+        cache = ParseCache(tmp_path, max_bytes=1024 * 1024)
+        cache.set_text("aa" * 32, "pypdf2", "cells on lines")
+        cache.set_text("aa" * 32, "pdfium", "rows on lines")
+        cache.set_result("aa" * 32, "v1", {"name": "Report"})
+
+        removed = cache.invalidate_text(keep_fingerprint="pdfium")
+
+        assert removed == 2
+        assert cache.get_text("aa" * 32, "pypdf2") is None
+        assert cache.get_text("aa" * 32, "pdfium") == "rows on lines"
+        assert cache.get_result("aa" * 32, "v1") == {"name": "Report"}
+        assert not legacy.exists()
+
+    def test_disabled_cache_stores_nothing(self, tmp_path):
+        """Test that a disabled cache never returns entries"""
+        cache = ParseCache(tmp_path, max_bytes=1024 * 1024, enabled=False)
+        cache.set_text("aa" * 32, "x1", "text")
+
+        assert cache.get_text("aa" * 32, "x1") is None
+        assert not any(tmp_path.iterdir())
+
+
+class TestParsePdfCaching:
+    def test_repeat_upload_skips_extraction_and_llm(self, mock_pdf_reader, mock_chatgpt, tmp_path):
+        """Test that uploading the same PDF twice only calls the extractor and the LLM once"""
+        cache = ParseCache(tmp_path, max_bytes=1024 * 1024)
+        with patch("controllers.appointments.parse_cache", cache):
+            for filename in ("first.pdf", "second.pdf"):
+                files = {"file": (filename, io.BytesIO(b"cached pdf content"), "application/pdf")}
+                response = client.post("/parse-pdf", files=files)
+                assert response.status_code == 200
+                assert response.json()["original_filename"] == filename
+
+        assert mock_chatgpt.call_count == 1
+        assert mock_pdf_reader.call_count == 1
+        cached = cache.get_result(hash_bytes(b"cached pdf content"), PROMPT_FINGERPRINT)
+        assert cached["name"] == "Lipid Panel"
+
+    @pytest.mark.usefixtures("mock_pdf_reader", "mock_chatgpt")
+    def test_text_is_keyed_by_the_engine_that_extracted_it(self, tmp_path):
+        """Test that text from a worker that fell back to another OCR engine is cached apart"""
+        cache = ParseCache(tmp_path, max_bytes=1024 * 1024)
+        files = {"file": ("test.pdf", io.BytesIO(b"fallback engine content"), "application/pdf")}
+        with (
+            patch("controllers.appointments.parse_cache", cache),
+            patch("services.ocr_engine._engine", SimpleNamespace(name="fallback")),
+        ):
+            assert client.post("/parse-pdf", files=files).status_code == 200
+            fallback_fingerprint = extraction_fingerprint()
+
+        pdf_hash = hash_bytes(b"fallback engine content")
+        assert fallback_fingerprint != EXTRACTION_FINGERPRINT
+        assert cache.get_text(pdf_hash, EXTRACTION_FINGERPRINT) is None
+        assert cache.get_text(pdf_hash, fallback_fingerprint) is not None
+
+    def test_cache_stats_endpoint(self):
+        """Test that cache statistics are exposed"""
+        response = client.get("/parse-pdf/cache")
+
+        assert response.status_code == 200
+        assert "result_hits" in response.json()
+        assert set(response.json()["blob_store"]) == {"stored", "deduplicated"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
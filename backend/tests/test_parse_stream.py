@@ -0,0 +1,273 @@
+import asyncio
+import io
+import json
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from controllers.appointments import process_upload, stream_completion
+from main import app
+from services import parse_events
+from services.parse_cache import ParseCache
+from services.structured_output import StreamedStringField
+from services.upload import SpooledUpload
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def complete_data(complete_data):
+    """The shared response with a summary that needs escaping when streamed"""
+    return {**complete_data, "summary": 'Cholesterol is "fine".\nRepeat in a year.'}
+
+
+def pieces(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class FakeStream(list):
+    """Streamed chat completion: iterates over chunks with content deltas"""
+
+    def __init__(self, content: str, size: int = 7):
+        chunks = []
+        for piece in pieces(content, size):
+            chunk = Mock()
+            chunk.choices = [Mock()]
+            chunk.choices[0].delta.content = piece
+            chunks.append(chunk)
+        # The last chunk of a stream has a finish reason and no content
+        chunks.append(Mock(choices=[]))
+        super().__init__(chunks)
+        self.close = Mock()
+
+
+def read_events(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+class TestStreamedStringField:
+    @pytest.mark.parametrize("size", [1, 2, 5, 1000])
+    def test_decodes_the_field_in_any_split(self, complete_data, size):
+        """Test that the field is decoded exactly, wherever the pieces split keys and escapes"""
+        data = {**complete_data, "summary": 'Tab\there, quote " slash \\ emoji \U0001f600 ł'}
+        field = StreamedStringField("summary")
+
+        decoded = "".join(field.feed(piece) for piece in pieces(json.dumps(data), size))
+
+        assert decoded == data["summary"]
+        assert field.done
+
+    def test_text_is_returned_before_the_object_is_complete(self):
+        """Test that the summary is available while the response is still being written"""
+        field = StreamedStringField("summary")
+
+        assert field.feed('{"name": "A", "summary": "Take') == "Take"
+        assert field.feed(" one") == " one"
+        assert field.feed(' daily", "doctor": "B"}') == " daily"
+        assert field.feed("more") == ""
+
+    def test_ignores_the_name_inside_other_values(self):
+        """Test that the field name quoted inside another string value is not taken as the key"""
+        content = json.dumps({"name": 'The "summary": "x" page', "summary": "Real"})
+
+        assert StreamedStringField("summary").feed(content) == "Real"
+
+
+class TestEventChannel:
+    def test_events_from_threads_reach_the_loop(self):
+        """Test that events emitted by worker threads arrive in order on the event loop"""
+
+        async def collect() -> list[dict]:
+            channel = parse_events.EventChannel()
+            with parse_events.bind(channel):
+                parse_events.emit("stage", stage="llm")
+                await asyncio.to_thread(parse_events.emit, "summary", delta="text")
+                channel.close()
+            return [event async for event in channel]
+
+        events = asyncio.run(collect())
+
+        assert events == [
+            {"event": "stage", "stage": "llm"},
+            {"event": "summary", "delta": "text"},
+        ]
+
+    def test_emit_without_channel_does_nothing(self):
+        """Test that emitting outside a streamed parse is a no-op"""
+        assert not parse_events.active()
+        parse_events.emit("stage", stage="extract")
+
+
+class TestBroadcast:
+    def test_late_channels_get_the_earlier_events(self):
+        """Test that a channel joining a broadcast first receives the events emitted so far"""
+
+        async def collect() -> tuple[list[dict], list[dict]]:
+            broadcast = parse_events.Broadcast()
+            first, second = parse_events.EventChannel(), parse_events.EventChannel()
+            with parse_events.bind(broadcast):
+                assert not parse_events.active()
+                with broadcast.forward_to(first):
+                    assert parse_events.active()
+                    parse_events.emit("stage", stage="extract")
+                    with broadcast.forward_to(second):
+                        parse_events.emit("stage", stage="llm")
+                    parse_events.emit("stage", stage="store")
+            first.close()
+            second.close()
+            return [event async for event in first], [event async for event in second]
+
+        first, second = asyncio.run(collect())
+
+        assert [event["stage"] for event in first] == ["extract", "llm", "store"]
+        assert [event["stage"] for event in second] == ["extract", "llm"]
+
+
+class TestStreamCompletion:
+    def test_stop_abandons_the_response(self, complete_data, mock_chatgpt):
+        """Test that a stopped completion reads no further chunks and closes the stream"""
+        stream = FakeStream(json.dumps(complete_data))
+        mock_chatgpt.return_value = stream
+        stop = threading.Event()
+        stop.set()
+
+        assert stream_completion(stop, model="gpt") == ""
+        stream.close.assert_called_once()
+
+
+class TestParsePdfStream:
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_streams_stages_summary_and_result(self, complete_data, mock_chatgpt):
+        """Test that stage events and summary deltas precede the validated result"""
+        stream = FakeStream(json.dumps(complete_data))
+        mock_chatgpt.return_value = stream
+
+        files = {"file": ("test.pdf", io.BytesIO(b"streamed pdf content"), "application/pdf")}
+        response = client.post("/parse-pdf?stream=true", files=files)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        events = read_events(response)
+        stages = [event["stage"] for event in events if event["event"] == "stage"]
+        assert stages == ["extract", "llm", "validation", "store"]
+        deltas = [event["delta"] for event in events if event["event"] == "summary"]
+        assert len(deltas) > 1
+        assert "".join(deltas) == complete_data["summary"]
+        # The summary arrives before the validation of the response starts
+        assert events.index({"event": "stage", "stage": "validation"}) > events.index(
+            {"event": "summary", "delta": deltas[-1]}
+        )
+        assert events[-1]["event"] == "result"
+        result = events[-1]["result"]
+        assert result["summary"] == complete_data["summary"]
+        assert result["original_filename"] == "test.pdf"
+        assert result["id"]
+        assert mock_chatgpt.call_args.kwargs["stream"] is True
+        stream.close.assert_called_once()
+
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_memory_is_logged_when_the_parse_finishes(self, complete_data, mock_chatgpt, caplog):
+        """Test that the peak memory of a streamed parse is logged after its extraction"""
+        mock_chatgpt.return_value = FakeStream(json.dumps(complete_data))
+
+        files = {"file": ("test.pdf", io.BytesIO(b"memory logged stream"), "application/pdf")}
+        with caplog.at_level("INFO", logger="controllers.appointments"):
+            events = read_events(client.post("/parse-pdf?stream=true", files=files))
+
+        assert events[-1]["event"] == "result"
+        memory_logs = [r for r in caplog.records if r.getMessage().startswith("Memory:")]
+        assert len(memory_logs) == 1
+        assert "raised the peak rss" in memory_logs[0].getMessage()
+
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_repair_restarts_the_summary(self, complete_data, mock_chatgpt):
+        """Test that a repaired response is streamed after a new llm stage event"""
+        invalid = json.dumps({**complete_data, "confidence_score": None})
+        mock_chatgpt.side_effect = [FakeStream(invalid), FakeStream(json.dumps(complete_data))]
+
+        files = {"file": ("test.pdf", io.BytesIO(b"repaired stream content"), "application/pdf")}
+        events = read_events(client.post("/parse-pdf?stream=true", files=files))
+
+        llm_events = [i for i, event in enumerate(events) if event.get("stage") == "llm"]
+        assert [events[i]["attempt"] for i in llm_events] == [1, 2]
+        second_summary = "".join(
+            event["delta"] for event in events[llm_events[1] :] if event["event"] == "summary"
+        )
+        assert second_summary == complete_data["summary"]
+        assert events[-1]["event"] == "result"
+
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_validation_error_is_an_event(self, complete_data, mock_chatgpt):
+        """Test that a rejected document ends the stream with an error event"""
+        mock_chatgpt.return_value = FakeStream(
+            json.dumps({**complete_data, "confidence_score": 20})
+        )
+
+        files = {"file": ("test.pdf", io.BytesIO(b"low confidence stream"), "application/pdf")}
+        response = client.post("/parse-pdf?stream=true", files=files)
+
+        assert response.status_code == 200
+        event = read_events(response)[-1]
+        assert event["event"] == "error"
+        assert event["status_code"] == 400
+        assert "Low confidence" in event["detail"]
+
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_non_streaming_requests_do_not_stream_the_llm(self, mock_chatgpt):
+        """Test that the LLM is only streamed when a client streams the parse"""
+        files = {"file": ("test.pdf", io.BytesIO(b"plain request content"), "application/pdf")}
+        assert client.post("/parse-pdf", files=files).status_code == 200
+
+        assert "stream" not in mock_chatgpt.call_args.kwargs
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    async def test_coalesced_callers_all_get_events(self, complete_data, mock_chatgpt, tmp_path):
+        """Test that every streaming caller of a shared parse receives its summary"""
+        mock_chatgpt.return_value = FakeStream(json.dumps(complete_data))
+
+        async def stream(name: str) -> list[dict]:
+            path = tmp_path / name
+            path.write_bytes(b"coalesced stream")
+            channel = parse_events.EventChannel()
+            with parse_events.bind(channel):
+                await process_upload(SpooledUpload(path=path, size=16, sha256="ef" * 32), name)
+            channel.close()
+            return [event async for event in channel]
+
+        events = await asyncio.gather(stream("first.pdf"), stream("second.pdf"))
+
+        assert mock_chatgpt.call_count == 1
+        for caller_events in events:
+            summary = "".join(e["delta"] for e in caller_events if e["event"] == "summary")
+            assert summary == complete_data["summary"]
+
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_cached_result_streams_its_summary(self, complete_data, mock_chatgpt, tmp_path):
+        """Test that a parse served from the cache still streams a stage and the summary"""
+        mock_chatgpt.return_value = FakeStream(json.dumps(complete_data))
+
+        files = {"file": ("test.pdf", b"cached stream content", "application/pdf")}
+        with patch(
+            "controllers.appointments.parse_cache", ParseCache(tmp_path, max_bytes=1024 * 1024)
+        ):
+            client.post("/parse-pdf?stream=true", files=files)
+            events = read_events(client.post("/parse-pdf?stream=true", files=files))
+
+        assert mock_chatgpt.call_count == 1
+        assert {"event": "stage", "stage": "cached"} in events
+        assert {"event": "summary", "delta": complete_data["summary"]} in events
+        assert events[-1]["event"] == "result"
+
+    def test_async_and_stream_are_exclusive(self):
+        """Test that a request cannot both queue and stream the parse"""
+        files = {"file": ("test.pdf", io.BytesIO(b"content"), "application/pdf")}
+        response = client.post("/parse-pdf?stream=true&async=true", files=files)
+
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
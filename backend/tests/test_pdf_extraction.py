@@ -0,0 +1,379 @@
+import io
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from PIL import Image, ImageDraw
+
+from services import ocr_engine, pdf_extraction, pdf_text
+from services.pdf_extraction import extract_text_with_rotation
+
+TEST_DATA_DIR = Path(__file__).parent.parent.parent / "Test Data"
+
+
+def mock_reader(*page_texts):
+    pages = []
+    for text in page_texts:
+        page = Mock()
+        page.extract_text.return_value = text
+        pages.append(page)
+    reader = Mock()
+    reader.pages = pages
+    return reader
+
+
+class TestExtractTextWithRotation:
+    @pytest.mark.skipif(not TEST_DATA_DIR.exists(), reason="Test Data folder not available")
+    def test_text_layer_from_real_pdf(self):
+        """Test extracting the text layer from a report in Test Data"""
+        pdf_path = TEST_DATA_DIR / "raport_Anna_Kowalski_panel_lipidowy.pdf"
+
+        text = extract_text_with_rotation(io.BytesIO(pdf_path.read_bytes()))
+
+        assert "Kowalski" in text
+
+    @patch("services.pdf_extraction.convert_from_bytes")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_text_layer_is_read_once(self, mock_pdf_reader, mock_convert):
+        """Test that a PDF with a text layer is parsed once and never rasterized"""
+        mock_pdf_reader.return_value = mock_reader(
+            "Wynik badania krwi", "Podpis lekarza prowadzacego"
+        )
+
+        text = extract_text_with_rotation(io.BytesIO(b"pdf"))
+
+        assert text == "Wynik badania krwi\n\fPodpis lekarza prowadzacego\n"
+        assert mock_pdf_reader.call_count == 1
+        mock_convert.assert_not_called()
+
+    # OCR pages one at a time so the ordered side effects below match page order
+    @patch("services.pdf_extraction.OCR_THREADS", 1)
+    @patch("services.ocr_engine.pytesseract.image_to_string")
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_scanned_pages_are_rasterized_once_and_rotated_upright(
+        self, mock_pdf_reader, mock_convert, mock_osd, mock_ocr
+    ):
+        """Test that OCR rasterizes once and rotates each page by its detected orientation"""
+        mock_pdf_reader.return_value = mock_reader("", "")
+        mock_convert.return_value = [
+            Image.new("RGB", (300, 600), "white"),
+            Image.new("RGB", (300, 600), "white"),
+        ]
+        mock_osd.side_effect = [{"rotate": 90}, {"rotate": 0}]
+        mock_ocr.return_value = "Skierowanie do poradni specjalistycznej"
+
+        text = extract_text_with_rotation(io.BytesIO(b"pdf"))
+
+        assert text.count("Skierowanie") == 2
+        assert mock_convert.call_count == 1
+        assert mock_osd.call_count == 2
+        # First page was rotated by 90 degrees, so its width and height are swapped
+        assert mock_ocr.call_args_list[0].args[0].size == (600, 300)
+        assert mock_ocr.call_args_list[1].args[0].size == (300, 600)
+
+    @patch("services.ocr_engine.pytesseract.image_to_string")
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_failed_orientation_detection_assumes_upright(
+        self, mock_pdf_reader, mock_convert, mock_osd, mock_ocr
+    ):
+        """Test that pages where OSD fails are OCRed without rotation"""
+        mock_pdf_reader.return_value = mock_reader("")
+        mock_convert.return_value = [Image.new("RGB", (300, 600), "white")]
+        mock_osd.side_effect = ocr_engine.pytesseract.TesseractError(1, "Too few characters")
+        mock_ocr.return_value = "Zalecenia: kontrola za miesiac"
+
+        text = extract_text_with_rotation(io.BytesIO(b"pdf"))
+
+        assert "Zalecenia" in text
+        assert mock_ocr.call_args.args[0].size == (300, 600)
+
+    # OCR pages one at a time so the ordered side effects below match page order
+    @patch("services.pdf_extraction.OCR_THREADS", 1)
+    @patch("services.ocr_engine.pytesseract.image_to_string")
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_mixed_document_only_ocrs_image_pages(
+        self, mock_pdf_reader, mock_convert, mock_osd, mock_ocr
+    ):
+        """Test that only image pages are rasterized and results are merged in page order"""
+        mock_pdf_reader.return_value = mock_reader(
+            "Typed cover letter from the clinic", "", "", "Typed signature page", ""
+        )
+        mock_convert.side_effect = lambda _data, **kwargs: [
+            Image.new("RGB", (300, 600), "white")
+            for _ in range(kwargs["first_page"], kwargs["last_page"] + 1)
+        ]
+        mock_osd.return_value = {"rotate": 0}
+        mock_ocr.side_effect = ["Scanned page 2", "Scanned page 3", "Scanned page 5"]
+
+        text = extract_text_with_rotation(io.BytesIO(b"pdf"))
+
+        assert [page.strip() for page in text.split("\f")] == [
+            "Typed cover letter from the clinic",
+            "Scanned page 2",
+            "Scanned page 3",
+            "Typed signature page",
+            "Scanned page 5",
+        ]
+        ranges = [
+            (call.kwargs["first_page"], call.kwargs["last_page"])
+            for call in mock_convert.call_args_list
+        ]
+        assert ranges == [(2, 3), (5, 5)]
+        assert mock_ocr.call_count == 3
+
+    @patch("services.pdf_extraction.OCR_MAX_PAGES", 2)
+    @patch("services.ocr_engine.pytesseract.image_to_string")
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_ocr_page_cap(self, mock_pdf_reader, mock_convert, mock_osd, mock_ocr):
+        """Test that no more than OCR_MAX_PAGES pages are rasterized and OCRed"""
+        mock_pdf_reader.return_value = mock_reader("", "", "", "")
+        mock_convert.return_value = [Image.new("RGB", (300, 600), "white")] * 2
+        mock_osd.return_value = {"rotate": 0}
+        mock_ocr.return_value = "Wynik badania krwi"
+
+        extract_text_with_rotation(io.BytesIO(b"pdf"))
+
+        assert mock_convert.call_args.kwargs["first_page"] == 1
+        assert mock_convert.call_args.kwargs["last_page"] == 2
+        assert mock_ocr.call_count == 2
+
+    @patch("services.pdf_extraction.OCR_AVAILABLE", False)
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_no_text_without_ocr(self, mock_pdf_reader):
+        """Test that an image-only PDF returns empty text when OCR is unavailable"""
+        mock_pdf_reader.return_value = mock_reader("")
+
+        assert extract_text_with_rotation(io.BytesIO(b"pdf")) == ""
+
+
+class TestOcrPages:
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    def test_pages_are_ocred_in_parallel_within_global_slots(self, mock_convert, mock_osd):
+        """Test that pages run concurrently but never above the global OCR slot count"""
+        mock_convert.return_value = [Image.new("RGB", (300, 600), "white")] * 6
+        mock_osd.return_value = {"rotate": 0}
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def slow_ocr(_image, lang):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return lang
+
+        with (
+            patch("services.pdf_extraction._ocr_slots", threading.BoundedSemaphore(2)),
+            patch("services.ocr_engine.pytesseract.image_to_string", side_effect=slow_ocr),
+        ):
+            results = pdf_extraction.ocr_pages(b"pdf", [1, 2, 3, 4, 5, 6], threads=4)
+
+        assert sorted(results) == [1, 2, 3, 4, 5, 6]
+        assert peak == 2
+
+    # Two grayscale A4 pages at 300 DPI (8.3 MB each) fit in the budget, three do not
+    @patch("services.pdf_extraction.OCR_MEMORY_BUDGET_MB", 17)
+    @patch("services.pdf_extraction.RASTER_WINDOW", 1)
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    def test_rendering_waits_for_the_memory_budget(self, mock_convert, mock_osd):
+        """Test that pages are rendered in grayscale and never held above the memory budget"""
+        lock = threading.Lock()
+        in_memory = 0
+        peak = 0
+
+        def render(_data, **_kwargs):
+            nonlocal in_memory, peak
+            with lock:
+                in_memory += 1
+                peak = max(peak, in_memory)
+            return [Image.new("L", (300, 600), "white")]
+
+        def slow_ocr(_image, lang):
+            nonlocal in_memory
+            time.sleep(0.02)
+            with lock:
+                in_memory -= 1
+            return lang
+
+        mock_convert.side_effect = render
+        mock_osd.return_value = {"rotate": 0}
+        with patch("services.ocr_engine.pytesseract.image_to_string", side_effect=slow_ocr):
+            results = pdf_extraction.ocr_pages(b"pdf", [1, 2, 3, 4, 5, 6], threads=4)
+
+        assert sorted(results) == [1, 2, 3, 4, 5, 6]
+        assert peak == 2
+        assert all(call.kwargs["grayscale"] for call in mock_convert.call_args_list)
+
+    @patch("services.pdf_extraction.RASTER_WINDOW", 2)
+    @patch("services.ocr_engine.pytesseract.image_to_string")
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_unreadable_structure_is_rendered_until_the_last_page(
+        self, mock_pdf_reader, mock_convert, mock_osd, mock_ocr
+    ):
+        """Test that a PDF without readable page structure is OCRed page by page up to its end"""
+        mock_pdf_reader.side_effect = ValueError("Invalid xref table")
+        # poppler sees three pages
+        mock_convert.side_effect = lambda _data, **kwargs: [
+            Image.new("L", (300, 600), "white")
+            for _ in range(kwargs["first_page"], min(kwargs["last_page"], 3) + 1)
+        ]
+        mock_osd.return_value = {"rotate": 0}
+        mock_ocr.return_value = "Skierowanie do poradni specjalistycznej"
+
+        pages = pdf_extraction.extract_pages(io.BytesIO(b"pdf"))
+
+        assert len(pages) == 3
+        # The second window came back short, so rendering stopped there
+        assert mock_convert.call_count == 2
+
+    @patch("services.pdf_extraction.OCR_LANG_PROBE", True)
+    @patch("services.pdf_extraction.RASTER_WINDOW", 1)
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    def test_english_first_page_switches_later_pages_to_english(self, mock_convert, mock_osd):
+        """Test that the first page decides the languages without holding back the next pages"""
+        second_started = threading.Event()
+        first_read = threading.Event()
+        english = "Patient was referred for a follow-up visit in the cardiology clinic. " * 4
+        langs = {}
+
+        def render(_data, **kwargs):
+            if kwargs["first_page"] == 3:
+                # Render the last page after the first one decided the languages
+                first_read.wait(timeout=1)
+                time.sleep(0.05)
+            return [Image.new("L", (300 + kwargs["first_page"], 600), "white")]
+
+        def ocr(image, lang):
+            page_number = image.width - 300
+            langs[page_number] = lang
+            if page_number == 1:
+                langs["overlapped"] = second_started.wait(timeout=1)
+                first_read.set()
+            elif page_number == 2:
+                second_started.set()
+            return english
+
+        mock_convert.side_effect = render
+        mock_osd.return_value = {"rotate": 0}
+        with (
+            patch("services.pdf_extraction._ocr_slots", threading.BoundedSemaphore(3)),
+            patch("services.ocr_engine.pytesseract.image_to_string", side_effect=ocr),
+        ):
+            results = pdf_extraction.ocr_pages(b"pdf", [1, 2, 3], threads=3)
+
+        assert sorted(results) == [1, 2, 3]
+        # The second page was read with both languages while the first one was being read
+        assert langs == {1: "pol+eng", 2: "pol+eng", 3: "eng", "overlapped": True}
+
+    @patch("services.pdf_extraction.OCR_PREPROCESS", True)
+    @patch("services.ocr_engine.pytesseract.image_to_string")
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    def test_blank_pages_are_skipped(self, mock_convert, mock_osd, mock_ocr):
+        """Test that blank back sides are neither orientation-checked nor OCRed"""
+        text_page = Image.new("L", (2480, 3508), 235)
+        ImageDraw.Draw(text_page).rectangle((300, 400, 1800, 440), fill=20)
+        mock_convert.side_effect = lambda _data, **kwargs: [
+            text_page if number == 1 else Image.new("L", (2480, 3508), 235)
+            for number in range(kwargs["first_page"], kwargs["last_page"] + 1)
+        ]
+        mock_osd.return_value = {"rotate": 0}
+        mock_ocr.return_value = "Wynik badania krwi"
+
+        results = pdf_extraction.ocr_pages(b"pdf", [1, 2])
+
+        assert results == {1: "Wynik badania krwi", 2: ""}
+        assert mock_ocr.call_count == 1
+        assert mock_osd.call_count == 1
+
+
+@pytest.mark.parametrize(
+    ("probe_text", "lang"),
+    [
+        ("Pacjentka zgłosiła się na wizytę kontrolną w poradni kardiologicznej. " * 4, "pol+eng"),
+        ("Patient was referred for a follow-up visit in the cardiology clinic. " * 4, "eng"),
+        ("Lipid panel", "pol+eng"),
+    ],
+)
+def test_choose_language(probe_text, lang):
+    """Test that only a first page with enough text and no Polish letters switches to English"""
+    assert pdf_extraction.choose_language(probe_text) == lang
+
+
+@pytest.mark.skipif(pdf_text.pdfium is None, reason="pypdfium2 not installed")
+class TestScannedPages:
+    @staticmethod
+    def scanned_pdf() -> bytes:
+        output = io.BytesIO()
+        Image.new("RGB", (1240, 1754), "white").save(output, "PDF", resolution=150)
+        return output.getvalue()
+
+    @patch("services.pdf_text._backend", pdf_text.PdfiumBackend())
+    @patch("services.ocr_engine.pytesseract.image_to_string")
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    def test_embedded_scan_is_ocred_without_rendering(self, mock_convert, mock_osd, mock_ocr):
+        """Test that a single-image page is OCRed from its embedded image at native resolution"""
+        mock_osd.return_value = {"rotate": 0}
+        mock_ocr.return_value = "Skierowanie do poradni specjalistycznej"
+
+        text = extract_text_with_rotation(io.BytesIO(self.scanned_pdf()))
+
+        assert "Skierowanie" in text
+        mock_convert.assert_not_called()
+        image = mock_ocr.call_args.args[0]
+        assert (image.mode, image.size) == ("L", (1240, 1754))
+
+    @patch("services.pdf_text._backend", pdf_text.PdfiumBackend())
+    @patch("services.pdf_text.read_scan_image", side_effect=ValueError("Page 1 has 2 images"))
+    @patch("services.ocr_engine.pytesseract.image_to_string")
+    @patch("services.ocr_engine.pytesseract.image_to_osd")
+    @patch("services.pdf_extraction.convert_from_bytes")
+    def test_undecodable_scan_is_rendered(self, mock_convert, mock_osd, mock_ocr, _read_image):
+        """Test that a page whose embedded image cannot be decoded falls back to rendering"""
+        mock_convert.return_value = [Image.new("L", (2480, 3508), "white")]
+        mock_osd.return_value = {"rotate": 0}
+        mock_ocr.return_value = "Skierowanie do poradni specjalistycznej"
+
+        text = extract_text_with_rotation(io.BytesIO(self.scanned_pdf()))
+
+        assert "Skierowanie" in text
+        assert mock_convert.call_count == 1
+
+
+class TestExtractionFingerprint:
+    def test_changes_with_what_produces_the_text(self):
+        """Test that the text backend, OCR settings and extraction version change the fingerprint"""
+        current = pdf_extraction.extraction_fingerprint()
+        with patch("services.pdf_text._backend", pdf_text.PdfiumBackend()):
+            other_backend = pdf_extraction.extraction_fingerprint()
+        with patch("services.pdf_extraction.OCR_PREPROCESS", not pdf_extraction.OCR_PREPROCESS):
+            other_preprocess = pdf_extraction.extraction_fingerprint()
+        with patch("services.pdf_extraction.EXTRACTION_VERSION", -1):
+            other_version = pdf_extraction.extraction_fingerprint()
+
+        assert pdf_extraction.extraction_fingerprint() == current
+        assert len({current, other_backend, other_preprocess, other_version}) == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -53,7 +53,7 @@ MISSING_FIELDS_DATA = {
 class TestPDFParser:
     @patch("controllers.appointments.SessionLocal")
     @patch("controllers.appointments.client.chat.completions.create")
-    @patch("controllers.appointments.PyPDF2.PdfReader")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
     def test_high_confidence_complete_data(self, mock_pdf_reader, mock_chatgpt, mock_session_local):
         """Test parsing with high confidence and complete data"""
         # Mock the PDF reader
@@ -99,7 +99,7 @@ class TestPDFParser:
 
     @patch("controllers.appointments.SessionLocal")
     @patch("controllers.appointments.client.chat.completions.create")
-    @patch("controllers.appointments.PyPDF2.PdfReader")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
     def test_high_confidence_missing_appointment_type(
         self, mock_pdf_reader, mock_chatgpt, mock_session_local
     ):
@@ -135,7 +135,7 @@ class TestPDFParser:
         assert data["confidence_score"] == 78
 
     @patch("controllers.appointments.client.chat.completions.create")
-    @patch("controllers.appointments.PyPDF2.PdfReader")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
     def test_low_confidence_data(self, mock_pdf_reader, mock_chatgpt):
         """Test parsing with low confidence score - should return 400 error"""
         # Mock the PDF reader
@@ -157,7 +157,7 @@ class TestPDFParser:
         assert "Low confidence score" in response.json()["detail"]
 
     @patch("controllers.appointments.client.chat.completions.create")
-    @patch("controllers.appointments.PyPDF2.PdfReader")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
     def test_missing_required_fields(self, mock_pdf_reader, mock_chatgpt):
         """Test parsing with missing required fields - should return 400 error"""
         # Mock the PDF reader
@@ -179,7 +179,7 @@ class TestPDFParser:
         assert "Missing required fields" in response.json()["detail"]
 
     @patch("controllers.appointments.client.chat.completions.create")
-    @patch("controllers.appointments.PyPDF2.PdfReader")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
     def test_invalid_json_response(self, mock_pdf_reader, mock_chatgpt):
         """Test parsing when ChatGPT returns invalid JSON - should return 400 error"""
         # Mock the PDF reader
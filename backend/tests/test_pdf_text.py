@@ -0,0 +1,126 @@
+import io
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from PIL import Image
+
+from services import pdf_text
+from services.pdf_text import PdfiumBackend, PyPDF2Backend, create_backend, read_scan_image
+
+TEST_DATA_DIR = Path(__file__).parent.parent.parent / "Test Data"
+REPORT = TEST_DATA_DIR / "raport_Anna_Kowalski_panel_lipidowy.pdf"
+
+
+def scanned_pdf(*sizes) -> bytes:
+    """A PDF with one full-page RGB image per size, like scanner output at 150 DPI"""
+    images = [Image.new("RGB", size, "white") for size in sizes]
+    output = io.BytesIO()
+    images[0].save(output, "PDF", resolution=150, save_all=True, append_images=images[1:])
+    return output.getvalue()
+
+
+@pytest.mark.skipif(not TEST_DATA_DIR.exists(), reason="Test Data folder not available")
+class TestBackendsOnRealPdf:
+    @pytest.mark.skipif(pdf_text.pdfium is None, reason="pypdfium2 not installed")
+    def test_pdfium_reads_text_and_metadata(self):
+        """Test that PDFium returns the text layer with \\n line ends and the page metadata"""
+        (page,) = PdfiumBackend().read_pages(io.BytesIO(REPORT.read_bytes()))
+
+        assert "Kowalski" in page.text
+        assert "\r" not in page.text
+        assert round(page.width) == 595
+        assert round(page.height) == 842
+        assert page.rotation == 0
+        assert page.image_count == 0
+
+    def test_pypdf2_reads_text_and_metadata(self):
+        """Test that the PyPDF2 fallback returns the same metadata"""
+        (page,) = PyPDF2Backend().read_pages(io.BytesIO(REPORT.read_bytes()))
+
+        assert "Kowalski" in page.text
+        assert (round(page.width), round(page.height)) == (595, 842)
+        assert page.image_count == 0
+
+    @pytest.mark.skipif(pdf_text.pdfium is None, reason="pypdfium2 not installed")
+    def test_backends_agree_on_text(self):
+        """Test that both backends produce the same words for every Test Data report"""
+        for path in sorted(TEST_DATA_DIR.glob("*.pdf")):
+            content = path.read_bytes()
+            pdfium_pages = PdfiumBackend().read_pages(io.BytesIO(content))
+            pypdf2_pages = PyPDF2Backend().read_pages(io.BytesIO(content))
+
+            assert [page.text.split() for page in pdfium_pages] == [
+                page.text.split() for page in pypdf2_pages
+            ], path.name
+
+
+@pytest.mark.skipif(pdf_text.pdfium is None, reason="pypdfium2 not installed")
+class TestScanImages:
+    def test_single_image_pages_are_flagged(self):
+        """Test that pages consisting of one full-page image report the image's pixel size"""
+        pages = PdfiumBackend().read_pages(io.BytesIO(scanned_pdf((1240, 1754), (1754, 1240))))
+
+        assert [page.scan_image_size for page in pages] == [(1240, 1754), (1754, 1240)]
+        assert [page.image_count for page in pages] == [1, 1]
+
+    @pytest.mark.skipif(not TEST_DATA_DIR.exists(), reason="Test Data folder not available")
+    def test_text_pages_are_not_flagged(self):
+        """Test that generated reports without images are not treated as scans"""
+        (page,) = PdfiumBackend().read_pages(io.BytesIO(REPORT.read_bytes()))
+
+        assert page.scan_image_size is None
+
+    def test_scan_image_is_decoded_at_native_resolution(self):
+        """Test that the embedded image is returned in grayscale at its own pixel size"""
+        image = read_scan_image(scanned_pdf((1240, 1754), (1754, 1240)), 2)
+
+        assert image.mode == "L"
+        assert image.size == (1754, 1240)
+
+    def test_pages_without_a_single_image_are_rejected(self):
+        """Test that read_scan_image refuses pages it would have to render"""
+        with pytest.raises(ValueError, match="0 images"):
+            read_scan_image(REPORT.read_bytes(), 1)
+
+
+class TestPyPDF2Backend:
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_unreadable_metadata_keeps_text(self, mock_pdf_reader):
+        """Test that a page whose dictionary cannot be read still returns its text"""
+        page = Mock()
+        page.extract_text.return_value = "Wynik badania krwi"
+        mock_pdf_reader.return_value = Mock(pages=[page])
+
+        (result,) = PyPDF2Backend().read_pages(io.BytesIO(b"pdf"))
+
+        assert result == pdf_text.PageText(text="Wynik badania krwi")
+
+
+class TestCreateBackend:
+    def test_auto_prefers_pdfium(self):
+        """Test that auto selects PDFium when pypdfium2 is installed"""
+        with patch("services.pdf_text.pdfium", Mock()):
+            assert isinstance(create_backend("auto"), PdfiumBackend)
+
+    def test_auto_without_pdfium_uses_pypdf2(self):
+        """Test that auto falls back to PyPDF2 when pypdfium2 is not installed"""
+        with patch("services.pdf_text.pdfium", None):
+            assert isinstance(create_backend("auto"), PyPDF2Backend)
+
+    def test_forced_pdfium_must_be_installed(self):
+        """Test that PDF_TEXT_BACKEND=pdfium fails instead of silently falling back"""
+        with (
+            patch("services.pdf_text.pdfium", None),
+            pytest.raises(RuntimeError, match="not installed"),
+        ):
+            create_backend("pdfium")
+
+    def test_unknown_backend(self):
+        """Test that an unknown PDF_TEXT_BACKEND value is rejected"""
+        with pytest.raises(ValueError, match="Unknown PDF_TEXT_BACKEND"):
+            create_backend("pdfminer")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from controllers.appointments import process_upload
+from services.single_flight import SingleFlight
+from services.upload import SpooledUpload
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test that concurrent calls with the same key run the function once"""
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def compute(value):
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return value * 2
+
+        waiters = [asyncio.create_task(flights.run("key", compute, 21)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*waiters) == [42, 42, 42]
+        assert calls == 1
+        stats = flights.stats()
+        assert stats["executions"] == 1
+        assert stats["coalesced"] == 2
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared_and_not_cached(self):
+        """Test that all waiters get the error and the next call runs again"""
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise HTTPException(status_code=400, detail="Low confidence")
+
+        waiters = [asyncio.create_task(flights.run("key", fail)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+
+        assert [result.detail for result in results] == ["Low confidence", "Low confidence"]
+        with pytest.raises(HTTPException):
+            await flights.run("key", fail)
+        assert flights.stats()["executions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that the computation survives the cancellation of the first caller"""
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(flights.run("key", compute))
+        second = asyncio.create_task(flights.run("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_computation_is_cancelled_when_every_caller_left(self):
+        """Test that the computation stops once its last caller is cancelled"""
+        flights = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def compute():
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.create_task(flights.run("key", compute)) for _ in range(2)]
+        await started.wait()
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert not cancelled.is_set()
+
+        callers[1].cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert flights.stats()["in_flight"] == 0
+
+
+class TestProcessUploadCoalescing:
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    async def test_identical_uploads_are_parsed_once(self, mock_chatgpt, tmp_path):
+        """Test that identical concurrent uploads share one parse but keep their filenames"""
+        uploads = []
+        for name in ("first.pdf", "second.pdf"):
+            path = tmp_path / name
+            path.write_bytes(b"same pdf content")
+            uploads.append(SpooledUpload(path=path, size=16, sha256="ab" * 32))
+
+        results = await asyncio.gather(
+            process_upload(uploads[0], "first.pdf"), process_upload(uploads[1], "second.pdf")
+        )
+
+        assert mock_chatgpt.call_count == 1
+        assert [result["original_filename"] for result in results] == ["first.pdf", "second.pdf"]
+        assert results[0]["name"] == results[1]["name"] == "Lipid Panel"
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    async def test_shared_parse_survives_the_first_upload(self, mock_chatgpt, tmp_path):
+        """Test that a coalesced upload succeeds after the first caller went away with its file"""
+        uploads = []
+        for name in ("first.pdf", "second.pdf"):
+            path = tmp_path / name
+            path.write_bytes(b"shared pdf content")
+            uploads.append(SpooledUpload(path=path, size=18, sha256="cd" * 32))
+
+        first = asyncio.create_task(process_upload(uploads[0], "first.pdf"))
+        await asyncio.sleep(0)
+        # The client disconnects before extraction starts and its spooled file is removed
+        first.cancel()
+        uploads[0].cleanup()
+        result = await process_upload(uploads[1], "second.pdf")
+
+        assert result["name"] == "Lipid Panel"
+        assert mock_chatgpt.call_count == 1
+        # The handle of the shared parse is removed with it
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["second.pdf"]
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,119 @@
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from controllers.appointments import AppointmentExtraction
+from main import app
+from services.structured_output import (
+    StructuredOutputError,
+    StructuredOutputStats,
+    json_schema_response_format,
+    parse_structured_response,
+)
+
+client = TestClient(app)
+
+
+class TestStructuredOutput:
+    def test_response_format_is_strict_schema(self, complete_data):
+        """Test that the schema requires every extracted field and forbids extra ones"""
+        response_format = json_schema_response_format(AppointmentExtraction)
+
+        schema = response_format["json_schema"]["schema"]
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["strict"] is True
+        assert schema["additionalProperties"] is False
+        assert sorted(schema["required"]) == sorted(complete_data)
+        assert "file_size" not in schema["properties"]
+
+    def test_parses_fenced_json(self, complete_data):
+        """Test that JSON wrapped in a markdown code fence is accepted"""
+        content = f"```json\n{json.dumps(complete_data)}\n```"
+
+        extraction = parse_structured_response(content, AppointmentExtraction)
+
+        assert extraction.model_dump() == complete_data
+
+    @pytest.mark.parametrize(
+        ("content", "message"),
+        [
+            (None, "empty"),
+            ("This is not valid JSON", "Invalid JSON"),
+            ({"doctor": None}, "doctor"),
+            ({"extra": 1}, "extra"),
+        ],
+    )
+    def test_invalid_responses(self, complete_data, content, message):
+        """Test that invalid responses raise an error describing the problem"""
+        if isinstance(content, dict):
+            content = json.dumps({**complete_data, **content})
+        with pytest.raises(StructuredOutputError, match=message):
+            parse_structured_response(content, AppointmentExtraction)
+
+    def test_stats_rates(self):
+        """Test that failure rates are computed from the counters"""
+        stats = StructuredOutputStats()
+        for counter in ["requests", "responses", "parse_failures", "responses", "repaired"]:
+            stats.record(counter)
+
+        result = stats.stats()
+
+        assert result["parse_failure_rate"] == 0.5
+        assert result["unrecoverable_rate"] == 0.0
+
+
+class TestParsePdfRepair:
+    @patch("controllers.appointments.llm_output_stats", new_callable=StructuredOutputStats)
+    def test_invalid_response_is_repaired(
+        self, mock_stats, mock_pdf_reader, mock_chatgpt, chat_response, complete_data
+    ):
+        """Test that an invalid response is sent back for repair instead of failing"""
+        mock_chatgpt.side_effect = [
+            chat_response('{"name": "Lipid Panel"'),
+            chat_response(json.dumps(complete_data)),
+        ]
+
+        files = {"file": ("test.pdf", io.BytesIO(b"repair pdf content"), "application/pdf")}
+        response = client.post("/parse-pdf", files=files)
+
+        assert response.status_code == 200
+        assert response.json()["name"] == "Lipid Panel"
+        # The document is extracted once, only the LLM call is repeated
+        assert mock_pdf_reader.call_count == 1
+        assert mock_chatgpt.call_count == 2
+        first_call, repair_call = mock_chatgpt.call_args_list
+        assert first_call.kwargs["response_format"]["type"] == "json_schema"
+        repair_messages = repair_call.kwargs["messages"]
+        assert repair_messages[2] == {"role": "assistant", "content": '{"name": "Lipid Panel"'}
+        assert "could not be used" in repair_messages[3]["content"]
+
+        stats = client.get("/parse-pdf/llm-stats").json()
+        assert stats["responses"] == 2
+        assert stats["parse_failures"] == 1
+        assert stats["repair_attempts"] == 1
+        assert stats["repaired"] == 1
+        assert stats["unrecoverable"] == 0
+        assert mock_stats.counters["requests"] == 1
+
+    @patch("controllers.appointments.LLM_REPAIR_ATTEMPTS", 2)
+    @patch("controllers.appointments.llm_output_stats", new_callable=StructuredOutputStats)
+    @pytest.mark.usefixtures("mock_pdf_reader")
+    def test_repair_attempts_are_bounded(self, mock_stats, mock_chatgpt, chat_response):
+        """Test that repeated invalid responses fail after LLM_REPAIR_ATTEMPTS repairs"""
+        mock_chatgpt.return_value = chat_response("This is not valid JSON")
+
+        files = {"file": ("test.pdf", io.BytesIO(b"bounded pdf content"), "application/pdf")}
+        response = client.post("/parse-pdf", files=files)
+
+        assert response.status_code == 400
+        assert "Failed to parse JSON response" in response.json()["detail"]
+        assert mock_chatgpt.call_count == 3
+        assert mock_stats.counters["repair_attempts"] == 2
+        assert mock_stats.counters["unrecoverable"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,151 @@
+import io
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services.template_extraction import classify_report, match_template, parse_date
+
+client = TestClient(app)
+
+# Text layer of a lab report as extracted by PyPDF2: table values follow their label line
+LAB_REPORT = """Raport medyczny - Panel lipidowy
+
+Dane pacjenta
+Imię
+Anna
+Data urodzenia
+1983-03-15
+Dane medyczne
+Placówka
+Diagnostyka Medyczna Sp. z o.o.
+Lekarz
+dr Anna Nowak
+Data badania
+2025-10-03
+Rodzaj badania
+Panel lipidowy
+Wyniki badań
+Cholesterol całkowity
+204.1
+"""
+
+SPECIALIST_REPORT = """Raport medyczny \u2013 Dermatologia
+Placówka: Specjalistyczne Centrum Zdrowia
+Lekarz prowadzący: dr Wiśniewski
+Data wizyty: 3 października 2025 r.
+Opis: Skóra czysta, bez cech infekcji.
+"""
+
+
+class TestTemplateRules:
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [
+            ("2025-10-03", "2025-10-03"),
+            ("03.10.2025", "2025-10-03"),
+            ("3/10/2025", "2025-10-03"),
+            ("3 października 2025 r.", "2025-10-03"),
+            ("12 Grudnia 2024", "2024-12-12"),
+            ("31.02.2025", None),
+            ("wkrótce", None),
+        ],
+    )
+    def test_parse_date(self, value, expected):
+        """Test parsing numeric and Polish month name dates"""
+        assert parse_date(value) == expected
+
+    @pytest.mark.parametrize(
+        ("kind", "expected"),
+        [
+            ("Dermatologia", ("Specialist", "Dermatology Consultation")),
+            ("Poradnia dermatologiczna", ("Specialist", "Dermatology Consultation")),
+            ("Panel  wątrobowy", ("Lab Work", "Liver Function Panel")),
+            ("Okulistyka", ("Vision", "Eye Examination")),
+            ("Stomatologia", ("Dental", "Dental Examination")),
+            ("Chirurgia", None),
+        ],
+    )
+    def test_classify_report(self, kind, expected):
+        """Test mapping Polish report kinds and specialties to appointment types"""
+        assert classify_report(kind) == expected
+
+    def test_matches_lab_report(self):
+        """Test reading fields whose values are on the line after the label"""
+        match = match_template(LAB_REPORT)
+
+        assert match.fields() == {
+            "name": "Lipid Panel",
+            "date": "2025-10-03",
+            "appointment_type": "Lab Work",
+            "doctor": "dr Anna Nowak",
+            "confidence_score": 95,
+        }
+
+    def test_matches_inline_labels(self):
+        """Test reading "Label: value" fields and falling back to the title for the kind"""
+        match = match_template(SPECIALIST_REPORT)
+
+        assert match.name == "Dermatology Consultation"
+        assert match.appointment_type == "Specialist"
+        assert match.date == "2025-10-03"
+        assert match.doctor == "dr Wiśniewski"
+        assert match.facility == "Specjalistyczne Centrum Zdrowia"
+
+    def test_incomplete_report_is_not_matched(self):
+        """Test that documents missing a field are left to the LLM"""
+        assert match_template(LAB_REPORT.replace("2025-10-03", "nieznana")) is None
+        assert match_template("Wypis ze szpitala\nLekarz\ndr Nowak") is None
+
+
+class TestParsePdfFastPath:
+    @patch("controllers.appointments.client.chat.completions.create")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_llm_only_writes_summary(self, mock_pdf_reader, mock_chatgpt):
+        """Test that for template reports the LLM is only asked for the summary"""
+        mock_page = Mock()
+        mock_page.extract_text.return_value = LAB_REPORT
+        mock_pdf_reader.return_value.pages = [mock_page]
+
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = json.dumps(
+            {"summary": "Your cholesterol is slightly elevated."}
+        )
+        mock_chatgpt.return_value = mock_response
+
+        files = {"file": ("lipid.pdf", io.BytesIO(b"lipid panel pdf"), "application/pdf")}
+        response = client.post("/parse-pdf", files=files)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == "Lipid Panel"
+        assert data["appointment_type"] == "Lab Work"
+        assert data["summary"] == "Your cholesterol is slightly elevated."
+        response_format = mock_chatgpt.call_args.kwargs["response_format"]
+        assert list(response_format["json_schema"]["schema"]["properties"]) == ["summary"]
+
+    @patch("controllers.appointments.FAST_PATH_LLM_SUMMARY", False)
+    @patch("controllers.appointments.client.chat.completions.create")
+    @patch("services.pdf_text.PyPDF2.PdfReader")
+    def test_no_llm_call_without_llm_summary(self, mock_pdf_reader, mock_chatgpt):
+        """Test that template reports are parsed without any LLM call when configured"""
+        mock_page = Mock()
+        mock_page.extract_text.return_value = LAB_REPORT
+        mock_pdf_reader.return_value.pages = [mock_page]
+
+        files = {"file": ("lipid.pdf", io.BytesIO(b"rules only pdf"), "application/pdf")}
+        response = client.post("/parse-pdf", files=files)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["date"] == "2025-10-03"
+        assert data["doctor"] == "dr Anna Nowak"
+        assert data["summary"].startswith("Lipid Panel on 2025-10-03")
+        mock_chatgpt.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,132 @@
+import io
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services import text_condenser
+from services.text_condenser import TRUNCATION_MARKER, condense_text, count_tokens
+
+client = TestClient(app)
+
+MODEL = "gpt-3.5-turbo"
+
+
+def make_page(number: int, body: str) -> str:
+    return f"Przychodnia Zdrowie Sp. z o.o., ul. Lipowa 5, Warszawa\n{body}\nStrona {number} z 3\n"
+
+
+class TestCondenseText:
+    def test_normalizes_whitespace_and_blank_lines(self):
+        """Test that whitespace runs and empty lines are collapsed"""
+        result = condense_text(
+            "Wynik    badania\t\tkrwi\n\n\n   \nHemoglobina   w normie  ", 1000, MODEL
+        )
+
+        assert result.text == "Wynik badania krwi\nHemoglobina w normie"
+        assert not result.truncated
+
+    def test_strips_repeated_page_headers_and_footers(self):
+        """Test that per-page headers and numbered footers are kept only once"""
+        text = "\f".join(
+            [
+                make_page(1, "Wywiad: pacjent zglasza bol glowy"),
+                make_page(2, "Badanie: cisnienie 120/80"),
+                make_page(3, "Zalecenia: kontrola za miesiac"),
+            ]
+        )
+
+        result = condense_text(text, 1000, MODEL)
+
+        assert result.text.split("\n") == [
+            "Przychodnia Zdrowie Sp. z o.o., ul. Lipowa 5, Warszawa",
+            "Wywiad: pacjent zglasza bol glowy",
+            "Strona 1 z 3",
+            "Badanie: cisnienie 120/80",
+            "Zalecenia: kontrola za miesiac",
+        ]
+        assert result.tokens_saved > 0
+
+    def test_deduplicates_repeated_lines(self):
+        """Test that consecutive duplicates and repeated long lines are dropped"""
+        long_line = "Pacjent poinformowany o mozliwych dzialaniach niepozadanych leku"
+        text = f"Ocena\nOcena\n{long_line}\nWynik dodatni\n{long_line}\nTak\nNie\nTak"
+
+        result = condense_text(text, 1000, MODEL)
+
+        # Short lines may legitimately repeat, only consecutive copies are removed
+        assert result.text.split("\n") == ["Ocena", long_line, "Wynik dodatni", "Tak", "Nie", "Tak"]
+
+    def test_keeps_head_and_tail_within_budget(self):
+        """Test that long documents keep their beginning and end within the token budget"""
+        lines = [f"Linia {i}: opis przebiegu leczenia pacjenta" for i in range(500)]
+        text = "Data wizyty: 2025-01-15\n" + "\n".join(lines) + "\nPodpis: dr Anna Nowak"
+
+        result = condense_text(text, 300, MODEL)
+
+        assert result.truncated
+        assert result.tokens <= 300
+        assert result.tokens == count_tokens(result.text, MODEL)
+        assert result.text.startswith("Data wizyty: 2025-01-15\n")
+        assert result.text.endswith("\nPodpis: dr Anna Nowak")
+        assert TRUNCATION_MARKER in result.text
+
+    def test_truncates_single_long_line(self):
+        """Test that text without line breaks is still cut to the budget"""
+        text = " ".join(f"slowo{i}" for i in range(5000))
+
+        result = condense_text(text, 200, MODEL)
+
+        assert result.truncated
+        assert result.tokens <= 200
+        assert result.text.startswith("slowo0 slowo1")
+        assert result.text.endswith("slowo4999")
+
+
+class TestLoadEncoding:
+    @patch.dict(text_condenser._encodings, clear=True)
+    @patch.dict(text_condenser._encoding_failures, clear=True)
+    def test_failed_load_is_retried(self):
+        """Test that tokens are estimated after a failed load, which is tried again later"""
+        encoding = Mock()
+        encoding.encode.return_value = [1, 2]
+        with patch.object(
+            text_condenser.tiktoken,
+            "encoding_for_model",
+            side_effect=[OSError("download failed"), encoding],
+        ) as mock_load:
+            assert text_condenser.load_encoding("test-model") is None
+            # Estimated without another download until the retry interval passed
+            assert count_tokens("x" * 40, "test-model") == 10
+            assert mock_load.call_count == 1
+
+            with patch.object(text_condenser, "TOKENIZER_RETRY_SECONDS", 0):
+                assert count_tokens("x" * 40, "test-model") == 2
+            assert count_tokens("x" * 40, "test-model") == 2
+
+        assert mock_load.call_count == 2
+
+
+class TestParsePdfCondensation:
+    @patch("controllers.appointments.LLM_DOCUMENT_TOKEN_BUDGET", 300)
+    def test_prompt_keeps_end_of_long_document(self, mock_pdf_reader, mock_chatgpt):
+        """Test that the prompt contains the signature block at the end of a long report"""
+        mock_pdf_reader.return_value.pages[0].extract_text.return_value = (
+            "Data wizyty: 2025-01-15\n"
+            + "\n".join(f"Linia {i}: opis przebiegu leczenia" for i in range(2000))
+            + "\nPodpis: dr Anna Nowak"
+        )
+
+        files = {"file": ("long.pdf", io.BytesIO(b"long pdf content"), "application/pdf")}
+        response = client.post("/parse-pdf", files=files)
+
+        assert response.status_code == 200
+        prompt = mock_chatgpt.call_args.kwargs["messages"][1]["content"]
+        assert "Data wizyty: 2025-01-15" in prompt
+        assert "Podpis: dr Anna Nowak" in prompt
+        assert "Linia 1000:" not in prompt
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,145 @@
+import hashlib
+import io
+from unittest.mock import patch
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from main import app
+from services.upload import UploadSizeLimitMiddleware, UploadTooLargeError, spool_upload
+
+client = TestClient(app)
+
+
+class TestSpoolUpload:
+    @pytest.mark.asyncio
+    async def test_spools_and_hashes_in_chunks(self, tmp_path):
+        """Test that the upload is written to disk with its size and SHA-256"""
+        content = b"%PDF-1.4 " + b"x" * 5000
+        upload_file = UploadFile(file=io.BytesIO(content), filename="report.pdf")
+
+        with (
+            patch("services.upload.UPLOAD_CHUNK_SIZE", 1024),
+            patch("services.upload.UPLOAD_SPOOL_DIR", str(tmp_path)),
+        ):
+            upload = await spool_upload(upload_file, max_size=10_000)
+
+        assert upload.size == len(content)
+        assert upload.sha256 == hashlib.sha256(content).hexdigest()
+        assert upload.path.read_bytes() == content
+
+        upload.cleanup()
+        assert not upload.path.exists()
+
+    @pytest.mark.asyncio
+    async def test_rejects_once_limit_is_crossed(self, tmp_path):
+        """Test that reading stops at the size limit and the partial file is removed"""
+        stream = io.BytesIO(b"x" * 10_000)
+        upload_file = UploadFile(file=stream, filename="report.pdf")
+
+        with (
+            patch("services.upload.UPLOAD_CHUNK_SIZE", 1024),
+            patch("services.upload.UPLOAD_SPOOL_DIR", str(tmp_path)),
+            pytest.raises(UploadTooLargeError),
+        ):
+            await spool_upload(upload_file, max_size=2048)
+
+        # Only the chunks up to the limit were read
+        assert stream.tell() == 3072
+        assert not any(tmp_path.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_rejects_known_size_without_reading(self):
+        """Test that an upload with a known size above the limit is rejected immediately"""
+        stream = io.BytesIO(b"x" * 10_000)
+        upload_file = UploadFile(file=stream, filename="report.pdf", size=10_000)
+
+        with pytest.raises(UploadTooLargeError):
+            await spool_upload(upload_file, max_size=2048)
+
+        assert stream.tell() == 0
+
+
+class TestParsePdfUploadLimits:
+    @patch("controllers.appointments.MAX_FILE_SIZE", 1024)
+    def test_file_too_large(self):
+        """Test uploading a file above the size limit - should return 413 error"""
+        files = {"file": ("big.pdf", io.BytesIO(b"x" * 4096), "application/pdf")}
+
+        response = client.post("/parse-pdf", files=files)
+
+        assert response.status_code == 413
+        assert "File too large" in response.json()["detail"]
+
+    def test_empty_file(self):
+        """Test uploading an empty file - should return 400 error"""
+        files = {"file": ("empty.pdf", io.BytesIO(b""), "application/pdf")}
+
+        response = client.post("/parse-pdf", files=files)
+
+        assert response.status_code == 400
+        assert "File is empty" in response.json()["detail"]
+
+    @patch.dict("controllers.appointments.UPLOAD_BODY_LIMITS", {"/parse-pdf": 1024})
+    @patch("controllers.appointments.spool_upload")
+    def test_oversized_body_is_rejected_before_parsing(self, mock_spool):
+        """Test that a request above the body limit gets 413 without reaching the endpoint"""
+        files = {"file": ("big.pdf", io.BytesIO(b"x" * 4096), "application/pdf")}
+
+        response = client.post("/parse-pdf", files=files)
+
+        assert response.status_code == 413
+        assert "Upload too large" in response.json()["detail"]
+        mock_spool.assert_not_called()
+
+
+class TestUploadSizeLimitMiddleware:
+    @pytest.mark.asyncio
+    async def test_chunked_body_is_cut_off_at_the_limit(self):
+        """Test that a body without Content-Length is stopped once it crosses the limit"""
+        received = []
+        sent = []
+
+        async def app(_scope, receive, send):
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    raise RuntimeError("client disconnected")
+                received.append(message["body"])
+                if not message.get("more_body"):
+                    break
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        chunks = iter([b"x" * 600] * 5)
+
+        async def receive():
+            return {"type": "http.request", "body": next(chunks), "more_body": True}
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = UploadSizeLimitMiddleware(app, {"/parse-pdf": 1024})
+        await middleware({"type": "http", "path": "/parse-pdf", "headers": []}, receive, send)
+
+        # The app got the chunk below the limit, the client the 413 and nothing else
+        assert received == [b"x" * 600]
+        assert [message.get("status") for message in sent] == [413, None]
+
+    @pytest.mark.asyncio
+    async def test_other_paths_are_not_limited(self):
+        """Test that requests to paths without a limit pass through untouched"""
+        calls = []
+
+        async def app(scope, _receive, _send):
+            calls.append(scope["path"])
+
+        middleware = UploadSizeLimitMiddleware(app, {"/parse-pdf": 1})
+        scope = {"type": "http", "path": "/jobs/1", "headers": [(b"content-length", b"99")]}
+        await middleware(scope, None, None)
+
+        assert calls == ["/jobs/1"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
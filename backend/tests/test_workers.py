@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from services import workers
+from services.workers import Stage
+
+
+class TestStage:
+    @pytest.mark.asyncio
+    async def test_runs_blocking_call_off_the_event_loop(self):
+        """Test that a blocking call does not stall other coroutines"""
+        stage = Stage("test", 2)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        await asyncio.gather(stage.run(time.sleep, 0.2), ticker())
+
+        assert ticks == 5
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        """Test that no more than `limit` calls run at the same time"""
+        stage = Stage("test", 2)
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def work():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+        await asyncio.gather(*(stage.run(work) for _ in range(6)))
+
+        assert peak == 2
+        assert stage.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_propagates_exceptions(self):
+        """Test that errors raised in the executor reach the caller"""
+        stage = Stage("test", 1)
+
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            await stage.run(fail)
+
+
+class TestExtractionProcessPool:
+    @patch("services.workers.EXTRACT_WORKERS", 1)
+    def test_worker_logs_reach_stdout(self, capfd):
+        """Test that records logged in an extraction worker process are written out"""
+        pool = workers._extraction_process_pool()
+        try:
+            # Loggers pickle by name, the call runs in the worker process
+            warn = logging.getLogger("services.pdf_extraction").warning
+            pool.submit(warn, "Logged in worker %s", "process").result(timeout=60)
+        finally:
+            pool.shutdown(wait=True)
+
+        assert "Logged in worker process" in capfd.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -23,25 +23,38 @@ function getAuthHeaders(): Record<string, string> {
 }
 
 /**
- * Fetch all parsed appointments from the backend
+ * Fetch all parsed appointments from the backend, following the paginated
+ * endpoint's X-Next-Cursor header until the last page
  */
 export async function fetchParsedAppointments(): Promise<ParsedAppointment[]> {
   const baseUrl = getApiBaseUrl();
-  const url = `${baseUrl}${API_ENDPOINTS.PARSED_APPOINTMENTS}`;
-
-  const response = await fetch(url, {
-    method: "GET",
-    headers: getAuthHeaders(),
-    // Don't cache in production to ensure fresh data
-    cache: "no-store",
-  });
-
-  if (!response.ok) {
-    throw new Error(
-      `Failed to fetch parsed appointments: ${response.status} ${response.statusText}`
-    );
-  }
-
-  const data = await response.json();
-  return data;
+  const appointments: ParsedAppointment[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const url = new URL(`${baseUrl}${API_ENDPOINTS.PARSED_APPOINTMENTS}`);
+    url.searchParams.set("limit", "200");
+    if (cursor) {
+      url.searchParams.set("cursor", cursor);
+    }
+
+    const response = await fetch(url, {
+      method: "GET",
+      headers: getAuthHeaders(),
+      // Revalidate with the page's ETag, unchanged pages come back as 304 without a body
+      cache: "no-cache",
+    });
+
+    if (!response.ok) {
+      throw new Error(
+        `Failed to fetch parsed appointments: ${response.status} ${response.statusText}`
+      );
+    }
+
+    const page: ParsedAppointment[] = await response.json();
+    appointments.push(...page);
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return appointments;
 }